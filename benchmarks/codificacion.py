@@ -0,0 +1,131 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+
+Benchmark: codificación JSON frente a la codificación compacta de mensajes.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.codificacion [repeticiones]
+"""
+import base64
+import json
+import random
+import sys
+import timeit
+
+from src.codificacion import codificar, desempaquetar, empaquetar
+from src.config import possible_products, possible_varieties, predefined_ethics
+
+
+def _catalogo():
+    catalogo = {}
+    for producto in possible_products:
+        variedad = random.choice(possible_varieties[producto])
+        detalle = predefined_ethics[variedad].copy()
+        detalle["stock"] = random.randint(300, 500)
+        detalle["variedad"] = variedad
+        catalogo[producto] = detalle
+    return catalogo
+
+
+def _venta(i):
+    comprados = {}
+    for producto in random.sample(possible_products, k=4):
+        comprados[random.choice(possible_varieties[producto])] = random.randint(1, 6)
+    return {
+        "cliente_id": f"CLIENTE_{i}",
+        "accion": "compra",
+        "productos_comprados": comprados,
+        "timestamp": "2025-06-03 12:00:00",
+        "tipo": "venta",
+    }
+
+
+def mensajes_representativos():
+    """Un ejemplo de cada tipo de mensaje con tamaños realistas."""
+    catalogo = _catalogo()
+    lote = [_venta(i) for i in range(50)]
+    resumen = {}
+    for venta in lote:
+        for var, qty in venta["productos_comprados"].items():
+            resumen[var] = resumen.get(var, 0) + qty
+    return {
+        "Peticion_Cliente (petición)": {
+            "tipo": "Peticion_Cliente",
+            "payload": {"info": "Hola desde el cliente!"},
+            "version": 42,
+        },
+        "Peticion_Cliente (oferta completa)": {
+            "tipo": "Peticion_Cliente",
+            "version": 42,
+            "productos": catalogo,
+            "ubicacion": [37, 81],
+        },
+        "Peticion_Cliente (delta)": {
+            "tipo": "Peticion_Cliente",
+            "version": 45,
+            "desde": 42,
+            "delta": True,
+            "productos": {p: catalogo[p] for p in possible_products[:3]},
+        },
+        "venta": _venta(1),
+        "ventas_super_normal": {
+            "tipo": "ventas_super_normal",
+            "supermercado_id": "SUPERMERCADO_1",
+            "venta": _venta(2),
+        },
+        "ventas_super_normal (lote 50)": {
+            "tipo": "ventas_super_normal",
+            "supermercado_id": "SUPERMERCADO_1",
+            "ventas": lote,
+            "resumen": resumen,
+        },
+        "metricas_smart (3 entradas)": {
+            "tipo": "metricas_smart",
+            "metricas": [
+                {
+                    "origen": f"smart{i}@servidor",
+                    "ronda": 7,
+                    "num_ventas": 50,
+                    "ventas_por_variedad": resumen,
+                    "version_catalogo": 3,
+                    **({"catalogo": catalogo} if i == 0 else {}),
+                }
+                for i in range(3)
+            ],
+        },
+    }
+
+
+def _json_ida_vuelta(datos):
+    return json.loads(json.dumps(datos))
+
+
+def _compacta_ida_vuelta(datos):
+    cuerpo = base64.b64encode(empaquetar(datos)).decode("ascii")
+    return desempaquetar(base64.b64decode(cuerpo))
+
+
+def main(repeticiones=20000):
+    random.seed(0)
+    print(f"{'mensaje':38} {'bytes json':>10} {'bytes comp':>10} "
+          f"{'µs json':>9} {'µs comp':>9}")
+    for nombre, datos in mensajes_representativos().items():
+        cuerpo_json, _ = codificar(datos, "json")
+        cuerpo_comp, usada = codificar(datos, "compacta")
+        assert usada == "compacta", nombre
+
+        n = max(1, repeticiones // (50 if "50" in nombre else 1))
+        t_json = timeit.timeit(lambda: _json_ida_vuelta(datos), number=n) / n
+        t_comp = timeit.timeit(lambda: _compacta_ida_vuelta(datos), number=n) / n
+        print(f"{nombre:38} {len(cuerpo_json):>10} {len(cuerpo_comp):>10} "
+              f"{t_json * 1e6:>9.1f} {t_comp * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
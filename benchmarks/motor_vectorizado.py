@@ -0,0 +1,106 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+
+Motor de puntuación vectorizado (referencia para benchmarks/puntuacion.py).
+
+La puntuación es la de src/puntuacion.py. Los datos son tensores densos
+pequeños: clientes × criterios y supermercados × productos × criterios. Como
+la suma es lineal, primero se reduce cada supermercado a un vector de
+criterios (solo productos con stock) y la puntuación ética de todos los
+clientes es un único producto matricial.
+"""
+import numpy as np
+
+from src.config import WEIGHT_DISTANCE, WEIGHT_ETHICAL, possible_products
+from src.identificadores import PRODUCTO_ID
+from src.puntuacion import CRITERIO_ID, CRITERIOS
+
+
+def preferencias(valores_eticos):
+    """Vector (criterios,) con las preferencias éticas de un cliente."""
+    return np.array([valores_eticos.get(c, 0) for c in CRITERIOS], dtype=float)
+
+
+class TablaSupermercados:
+    """
+    Ofertas conocidas en forma de arrays:
+    • ``jids``: lista de supermercados, en el orden de las filas.
+    • ``valores``: (supermercados, productos, criterios).
+    • ``stock``: (supermercados, productos).
+    • ``ubicaciones``: (supermercados, 2).
+    """
+
+    def __init__(self, jids, valores, stock, ubicaciones):
+        self.jids = list(jids)
+        self.valores = valores
+        self.stock = stock
+        self.ubicaciones = ubicaciones
+        # Σ de criterios de los productos con stock: (supermercados, criterios)
+        self.criterios = np.einsum("spc,sp->sc", valores, stock > 0)
+
+    @classmethod
+    def desde_ofertas(cls, ofertas):
+        """
+        Construye la tabla a partir de las creencias "supermercados" de un
+        cliente: { jid: {"productos": {...}, "ubicacion": (x, y)} }.
+        """
+        n = len(ofertas)
+        valores = np.zeros((n, len(possible_products), len(CRITERIOS)))
+        stock = np.zeros((n, len(possible_products)))
+        ubicaciones = np.zeros((n, 2))
+        for s, data in enumerate(ofertas.values()):
+            ubicaciones[s] = data.get("ubicacion", (0, 0))
+            for prod, det in data.get("productos", {}).items():
+                p = PRODUCTO_ID[prod]
+                stock[s, p] = det.get("stock", 0)
+                for criterio, valor in det.items():
+                    c = CRITERIO_ID.get(criterio)
+                    if c is not None:
+                        valores[s, p, c] = valor
+        return cls(ofertas.keys(), valores, stock, ubicaciones)
+
+
+def puntuar(preferencias_clientes, ubicaciones_clientes, tabla, usar_ubicacion=True,
+            peso_etico=None, peso_distancia=None):
+    """
+    Matriz de puntuaciones (clientes, supermercados) en una sola pasada.
+
+    Parámetros:
+        preferencias_clientes (ndarray): (clientes, criterios).
+        ubicaciones_clientes (ndarray): (clientes, 2).
+        tabla (TablaSupermercados): ofertas a puntuar.
+        usar_ubicacion (bool | ndarray): si la distancia cuenta, global o por cliente.
+        peso_etico, peso_distancia (float): por defecto WEIGHT_ETHICAL y WEIGHT_DISTANCE.
+    """
+    peso_etico = WEIGHT_ETHICAL if peso_etico is None else peso_etico
+    peso_distancia = WEIGHT_DISTANCE if peso_distancia is None else peso_distancia
+    total = peso_etico + peso_distancia
+    n_clientes = len(preferencias_clientes)
+    if total <= 0:
+        return np.zeros((n_clientes, len(tabla.jids)))
+
+    puntuacion = (peso_etico / total) * (preferencias_clientes @ tabla.criterios.T)
+    if peso_distancia:
+        diferencia = ubicaciones_clientes[:, None, :] - tabla.ubicaciones[None, :, :]
+        distancia = np.sqrt((diferencia ** 2).sum(axis=2))
+        distancia *= np.reshape(np.asarray(usar_ubicacion, dtype=float), (-1, 1))
+        puntuacion -= (peso_distancia / total) * distancia
+    return puntuacion
+
+
+def mejores_supermercados(preferencias_clientes, ubicaciones_clientes, tabla,
+                          usar_ubicacion=True):
+    """
+    Mejor supermercado de cada cliente (en empate, el primero, igual que el
+    bucle original). Retorna una lista de JIDs, o de None si no hay ofertas.
+    """
+    if not tabla.jids:
+        return [None] * len(preferencias_clientes)
+    puntuacion = puntuar(preferencias_clientes, ubicaciones_clientes, tabla, usar_ubicacion)
+    return [tabla.jids[s] for s in puntuacion.argmax(axis=1)]
@@ -0,0 +1,176 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+
+Benchmark: mensajes por segundo a través del proceso coordinador de
+src/particiones.py según el número de procesos de clientes.
+
+Cada proceso hijo tiene un cliente que envía peticiones a un supermercado
+del proceso principal, como mucho ``ventana`` sin responder a la vez; el
+supermercado responde a cada una con una oferta completa. Ambos lados usan
+TransporteParticionado, así que se mide el camino real: pickle, cola de
+multiprocessing, hilo lector y entrega en el bucle del principal. "0
+procesos" es la referencia sin particiones (todo en el bus en memoria).
+
+Todos los supermercados viven en el proceso principal, así que cada mensaje
+entre procesos pasa por él; la columna "µs CPU principal" es lo que cuesta
+cada mensaje en ese proceso (hilo lector, entrega y reenvío). Ese coste no
+se reparte al añadir procesos: el máximo es ~1e6 / µs CPU principal
+mensajes por segundo, tenga la máquina los núcleos que tenga.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.particiones [mensajes por proceso] [procesos...]
+"""
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+
+from spade.message import Message
+
+from benchmarks.codificacion import mensajes_representativos
+from src.particiones import COORDINADOR, TransporteParticionado
+from src.transporte import TransporteLocal
+
+SUPERMERCADO = "supermercado@bench"
+VENTANA = 64
+
+
+class _Agente:
+    """Lo mínimo que TransporteLocal necesita de un agente."""
+
+    def __init__(self, jid, al_recibir):
+        self.jid = jid
+        self.al_recibir = al_recibir
+
+    def set_container(self, contenedor):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def dispatch(self, msg):
+        self.al_recibir(msg)
+        return True
+
+
+def _mensaje(destino, remitente, cuerpo):
+    msg = Message(to=destino, sender=remitente, body=cuerpo)
+    msg.set_metadata("tipo", "Peticion_Cliente")
+    return msg
+
+
+def _supermercado(transporte, oferta):
+    """Supermercado eco: responde a cada petición con ``oferta``."""
+    return _Agente(SUPERMERCADO, lambda msg: transporte.entregar(
+        _mensaje(str(msg.sender), SUPERMERCADO, oferta)
+    ))
+
+
+async def _cliente(transporte, jid, mensajes, peticion):
+    """Envía ``mensajes`` peticiones en ventanas de VENTANA y espera las respuestas."""
+    recibidas = 0
+    hueco = asyncio.Event()
+
+    def al_recibir(msg):
+        nonlocal recibidas
+        recibidas += 1
+        hueco.set()
+
+    transporte.registrar(_Agente(jid, al_recibir))
+    enviadas = 0
+    while recibidas < mensajes:
+        hueco.clear()
+        while enviadas < mensajes and enviadas - recibidas < VENTANA:
+            transporte.entregar(_mensaje(SUPERMERCADO, jid, peticion))
+            enviadas += 1
+        # En el bus en memoria la respuesta llega dentro de entregar
+        if recibidas < mensajes:
+            await hueco.wait()
+
+
+def _proceso(indice, colas, mensajes, peticion, inicio):
+    asyncio.run(_hijo(indice, colas, mensajes, peticion, inicio))
+
+
+async def _hijo(indice, colas, mensajes, peticion, inicio):
+    transporte = TransporteParticionado(colas, lambda jid: COORDINADOR)
+    transporte.escuchar(colas[indice])
+    colas[COORDINADOR].put(("aviso", "listo"))
+    await asyncio.to_thread(inicio.wait)
+    await _cliente(transporte, f"cliente{indice}@bench/{indice}", mensajes, peticion)
+    colas[COORDINADOR].put(("aviso", "fin"))
+
+
+async def _sin_particiones(mensajes, peticion, oferta):
+    transporte = TransporteLocal()
+    transporte.registrar(_supermercado(transporte, oferta))
+    t = time.perf_counter()
+    await _cliente(transporte, "cliente@bench/0", mensajes, peticion)
+    return time.perf_counter() - t
+
+
+async def _con_particiones(procesos, mensajes, peticion, oferta):
+    contexto = multiprocessing.get_context("spawn")
+    colas = {i: contexto.Queue() for i in range(procesos + 1)}
+    inicio = contexto.Event()
+    particion = {f"cliente{i}@bench/{i}": i for i in range(1, procesos + 1)}
+    transporte = TransporteParticionado(colas, particion.get)
+    transporte.registrar(_supermercado(transporte, oferta))
+
+    bucle = asyncio.get_running_loop()
+    listos, terminados = bucle.create_future(), bucle.create_future()
+    avisos = {"listo": 0, "fin": 0}
+
+    def al_avisar(tipo):
+        avisos[tipo] += 1
+        if avisos[tipo] == procesos:
+            (listos if tipo == "listo" else terminados).set_result(None)
+
+    transporte.escuchar(colas[COORDINADOR], al_avisar)
+    hijos = [
+        contexto.Process(target=_proceso, args=(i, colas, mensajes, peticion, inicio), daemon=True)
+        for i in range(1, procesos + 1)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    await listos
+    t, cpu = time.perf_counter(), time.process_time()
+    inicio.set()
+    await terminados
+    duracion, cpu = time.perf_counter() - t, time.process_time() - cpu
+    colas[COORDINADOR].put(None)
+    for hijo in hijos:
+        await asyncio.to_thread(hijo.join)
+    return duracion, cpu
+
+
+def main(mensajes=5000, procesos=(0, 1, 2, 4)):
+    ejemplos = mensajes_representativos()
+    peticion = json.dumps(ejemplos["Peticion_Cliente (petición)"])
+    oferta = json.dumps(ejemplos["Peticion_Cliente (oferta completa)"])
+    print(f"{mensajes} peticiones por proceso, ventana {VENTANA}, "
+          f"{multiprocessing.cpu_count()} CPU")
+    print(f"{'procesos':>8} {'peticiones':>10} {'s':>8} {'msg/s':>10} {'µs CPU principal':>17}")
+    for n in procesos:
+        if n == 0:
+            total = mensajes
+            duracion = asyncio.run(_sin_particiones(mensajes, peticion, oferta))
+            cpu = duracion
+        else:
+            total = mensajes * n
+            duracion, cpu = asyncio.run(_con_particiones(n, mensajes, peticion, oferta))
+        # Cada petición son dos mensajes: la petición y la oferta
+        print(f"{n:>8} {total:>10} {duracion:>8.2f} {2 * total / duracion:>10.0f} "
+              f"{cpu / (2 * total) * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:]]
+    main(*argumentos[:1], *([tuple(argumentos[1:])] if len(argumentos) > 1 else []))
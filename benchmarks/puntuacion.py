@@ -0,0 +1,152 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+
+Benchmark: bucle original de calcular_mejor_supermercado frente al motor
+vectorizado de benchmarks/motor_vectorizado.py y a la tabla de variedades por cliente
+(TablaVariedades), y coste de una decisión posterior con RankingSupermercados
+cuando solo ha cambiado una oferta (lo que hace ClienteAgent). Con
+WEIGHT_DISTANCE > 0 el ranking solo puntúa las ofertas cuya cota puede
+ganar; se anota cuántas puntúa de media la primera decisión.
+
+El bucle se mide sobre una muestra de clientes y se extrapola (recorrer
+10k × 1k en Python lleva demasiado); la muestra sirve también para comprobar
+que ambos eligen el mismo supermercado.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.puntuacion [clientes] [supermercados] [muestra]
+"""
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+from src.config import (
+    WEIGHT_DISTANCE,
+    WEIGHT_ETHICAL,
+    possible_products,
+    possible_varieties,
+    predefined_ethics,
+)
+from benchmarks.motor_vectorizado import TablaSupermercados, mejores_supermercados, preferencias
+from src.puntuacion import CRITERIOS, RankingSupermercados, TablaVariedades
+
+
+def _ofertas(n):
+    ofertas = {}
+    for s in range(n):
+        productos = {}
+        for producto in possible_products:
+            variedad = random.choice(possible_varieties[producto])
+            detalle = predefined_ethics[variedad].copy()
+            detalle["stock"] = random.choice([0, random.randint(1, 500)])
+            detalle["variedad"] = variedad
+            productos[producto] = detalle
+        ofertas[f"super{s}@servidor"] = {
+            "productos": productos,
+            "ubicacion": (random.randint(0, 100), random.randint(0, 100)),
+        }
+    return ofertas
+
+
+def _clientes(n):
+    return [
+        ({c: round(random.uniform(0, 1), 2) for c in CRITERIOS},
+         (random.randint(0, 100), random.randint(0, 100)))
+        for _ in range(n)
+    ]
+
+
+def mejor_supermercado_bucle(valores_eticos, ubicacion_cliente, ofertas):
+    """Copia del bucle original de ClienteAgent.calcular_mejor_supermercado."""
+    best_supermercado = None
+    best_score = -float("inf")
+    total_priority = WEIGHT_ETHICAL + WEIGHT_DISTANCE
+    for supermercado, data in ofertas.items():
+        ubicacion = data.get("ubicacion", (0, 0))
+        distance = math.sqrt(
+            (ubicacion_cliente[0] - ubicacion[0]) ** 2
+            + (ubicacion_cliente[1] - ubicacion[1]) ** 2
+        )
+        ethical_score = 0
+        for prod, det in data.get("productos", {}).items():
+            if det.get("stock", 0) > 0:
+                for criterio, valor_producto in det.items():
+                    if criterio in ("stock", "variedad"):
+                        continue
+                    ethical_score += valores_eticos.get(criterio, 0) * valor_producto
+        if total_priority > 0:
+            score_final = (
+                (WEIGHT_ETHICAL / total_priority) * ethical_score
+                - (WEIGHT_DISTANCE / total_priority) * distance
+            )
+        else:
+            score_final = 0
+        if score_final > best_score:
+            best_score = score_final
+            best_supermercado = supermercado
+    return best_supermercado
+
+
+def main(n_clientes=10000, n_supermercados=1000, muestra=20):
+    random.seed(0)
+    ofertas = _ofertas(n_supermercados)
+    clientes = _clientes(n_clientes)
+
+    t = time.perf_counter()
+    elegidos_bucle = [mejor_supermercado_bucle(v, u, ofertas) for v, u in clientes[:muestra]]
+    t_bucle = (time.perf_counter() - t) / muestra * n_clientes
+
+    t = time.perf_counter()
+    tabla = TablaSupermercados.desde_ofertas(ofertas)
+    t_tabla = time.perf_counter() - t
+
+    t = time.perf_counter()
+    prefs = np.array([preferencias(v) for v, _ in clientes])
+    ubicaciones = np.array([u for _, u in clientes], dtype=float)
+    elegidos = mejores_supermercados(prefs, ubicaciones, tabla)
+    t_motor = time.perf_counter() - t
+
+    # Primera decisión de cada cliente: tabla de variedades y ranking completo
+    t = time.perf_counter()
+    tablas = [TablaVariedades(v) for v, _ in clientes[:muestra]]
+    rankings = [RankingSupermercados() for _ in tablas]
+    elegidos_tabla = [
+        ranking.mejor(tabla, u, ofertas)
+        for ranking, tabla, (_, u) in zip(rankings, tablas, clientes)
+    ]
+    t_variedades = (time.perf_counter() - t) / muestra * n_clientes
+    puntuadas = sum(ranking.puntuadas for ranking in rankings) / muestra
+
+    cambiado = next(iter(ofertas))
+    t = time.perf_counter()
+    for ranking, tabla, (_, u) in zip(rankings, tablas, clientes):
+        ranking.marcar(cambiado)
+        ranking.mejor(tabla, u, ofertas)
+    t_incremental = (time.perf_counter() - t) / muestra * n_clientes
+
+    coinciden = sum(a == b for a, b in zip(elegidos_bucle, elegidos))
+    coinciden_tabla = sum(a == b for a, b in zip(elegidos_bucle, elegidos_tabla))
+    print(f"{n_clientes} clientes × {n_supermercados} supermercados")
+    print(f"  bucle (extrapolado de {muestra}): {t_bucle:9.2f} s")
+    print(f"  construir tabla:               {t_tabla:9.3f} s")
+    print(f"  motor vectorizado:             {t_motor:9.3f} s")
+    print(f"  aceleración:                   {t_bucle / (t_tabla + t_motor):9.0f}×")
+    # Un cliente decide solo: con el motor construiría la tabla de ofertas en cada compra
+    print(f"  motor, un cliente cada vez:    {t_tabla * n_clientes:9.2f} s")
+    print(f"  tabla de variedades (extrap.): {t_variedades:9.2f} s "
+          f"({puntuadas:.0f} de {n_supermercados} ofertas puntuadas por cliente)")
+    print(f"  siguiente decisión, 1 cambio:  {t_incremental:9.3f} s")
+    print(f"  misma elección en la muestra:  {coinciden}/{muestra} (motor), "
+          f"{coinciden_tabla}/{muestra} (tabla)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
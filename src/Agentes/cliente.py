@@ -8,136 +8,116 @@ Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICE
 en la raíz del repositorio.
 """
 import asyncio
-import datetime
-import json
 import math
-import random
 
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, OneShotBehaviour, PeriodicBehaviour
 from spade.message import Message
 
+from ..codificacion import preparar_mensaje
 from ..config import (
     clientes_ubicaciones,
     clients_finished,
     decisiones,
-    decisiones_lock,
+    CADUCIDAD_OFERTAS,
     MAX_PURCHASES,
+    MODO_OFERTAS,
+    SONDEO_ANTIGUEDAD_MAX,
+    SONDEO_CANDIDATOS,
+    SONDEO_EXPLORACION,
     THRESHOLD_INDISPENSABLE,
-    WEIGHT_DISTANCE,
-    WEIGHT_ETHICAL,
 )
-from ..logger import logging
+from ..aleatorio import generador
+from ..eventos import registrar_decision
+from ..logger import log_ofertas, log_ventas, logging
+from ..puntuacion import RankingSupermercados, TablaVariedades
+from ..reloj import ComportamientoPeriodico, ahora
 from ..BDI.Creencias import Creencias
 from ..BDI.Deseo import Deseo
 from ..BDI.Intenciones import Intencion
+from ..BDI.Planes import BibliotecaPlanes, CuentasPlanes
+from .despacho import AgenteDespacho, ManejadorMensajes
+from .ofertas import CacheOfertas, SondeoAdaptativo
 
 
-class CicloBDIBehaviour(PeriodicBehaviour):
+def anotar_decision(agente, decision):
+    """
+    Añade una decisión al búfer propio del cliente (se fusiona con los de
+    los demás en el historial global, ver registros.BuferRegistros) y al
+    registro de eventos. No necesita cerrojo.
+    """
+    agente.decisiones_propias.append(decision)
+    registrar_decision(decision)
+
+
+class CicloBDIBehaviour(ComportamientoPeriodico):
     """
     Un único behaviour periódico que implementa el ciclo BDI:
     1) Revisión de creencias
     2) Solicitar ofertas
     3) Deliberación → seleccionar un Deseo existente → crear Intención
-    4) Planificación/Ejecución → lanzar el behaviour correspondiente
+    4) Planificación/Ejecución → ejecutar su plan (ver PLANES_CLIENTE)
     """
 
     async def run(self):
         agent = self.agent
 
+        # 0) Compras anotadas cuyo mensaje no llegó a salir (al reanudar)
+        if agent.compras_pendientes:
+            await agent.reenviar_compras(self)
+
         # 1) Revisión de creencias: limpiar ofertas caducadas
         await agent.revisar_creencias()
 
         # 2) Solicitar ofertas de supermercados
-        for sup_jid in agent.supermercados_recursos:
-            payload = {"info": "Hola desde el cliente!"}
-            msg = Message(to=str(sup_jid))
-            msg.body = json.dumps(
-                {"tipo": "Peticion_Cliente", "payload": payload}
-            )
-            await self.send(msg)
+        #    (en modo suscripción basta con suscribirse una vez: los
+        #    supermercados publican su oferta cuando cambia su catálogo)
+        if MODO_OFERTAS == "suscripcion":
+            if not agent.suscrito and agent.cliente_id not in clients_finished:
+                for sup_jid in agent.supermercados_recursos:
+                    msg = Message(to=str(sup_jid))
+                    preparar_mensaje(msg, {"tipo": "Suscripcion_Ofertas"})
+                    await self.send(msg)
+                agent.suscrito = True
+        else:
+            # Se indica la versión de catálogo conocida para recibir solo cambios
+            ofertas = agent.creencias.obtener("supermercados") or {}
+            for sup_jid in agent.supermercados_a_sondear():
+                payload = {"info": "Hola desde el cliente!"}
+                version = ofertas.get(str(sup_jid), {}).get("version")
+                msg = Message(to=str(sup_jid))
+                preparar_mensaje(
+                    msg,
+                    {"tipo": "Peticion_Cliente", "payload": payload, "version": version}
+                )
+                await self.send(msg)
 
-        # 3) Deliberación: decidir cuál Deseo no está satisfecho
-        num_compras = agent.creencias.obtener("numero_compras") or 0
+        # 3) Deliberación: el primer Deseo insatisfecho (en orden de prioridad)
+        #    según la tabla de opciones de la biblioteca de planes
         inventario = agent.creencias.obtener("productos_obtenidos") or {}
+        contexto = {
+            "num_compras": agent.creencias.obtener("numero_compras") or 0,
+            # faltantes de imprescindibles y total de inventario
+            "faltantes": [
+                p
+                for p in agent.indispensables
+                if inventario.get(p, 0) < THRESHOLD_INDISPENSABLE
+            ],
+            "total_inventario": sum(inventario.values()),
+        }
+        intencion = PLANES_CLIENTE.deliberar(agent, agent.desires, contexto)
 
-        # calcular faltantes de imprescindibles y total de inventario
-        faltantes = [
-            p
-            for p in agent.indispensables
-            if inventario.get(p, 0) < THRESHOLD_INDISPENSABLE
-        ]
-        total_inventario = sum(inventario.values())
-
-        deseo_seleccionado = None
-        plan_name = None
-
-        # Recorrer deseos en orden de prioridad
-        for deseo in agent.desires:
-            if deseo.nombre == "mantener_indispensables":
-                # Deseo insatisfecho si hay imprescindibles por debajo del umbral
-                if num_compras < MAX_PURCHASES and faltantes:
-                    # En lugar de payload, usamos "parametros"
-                    deseo.parametros = {"productos": faltantes}
-                    plan_name = "compra_indispensable"
-                    deseo_seleccionado = deseo
-                    break
-
-            elif deseo.nombre == "cumplir_inventario_basico":
-                # Deseo insatisfecho si total de inventario < mínimo
-                min_total = deseo.parametros.get("min_total", 0)
-                if num_compras < MAX_PURCHASES and total_inventario < min_total:
-                    deseo.parametros = {}  # borramos parámetros previos
-                    plan_name = "compra_normal"
-                    deseo_seleccionado = deseo
-                    break
-
-            elif deseo.nombre == "limitar_compras":
-                # Deseo insatisfecho si ya superamos el número máximo de compras
-                maximo = deseo.parametros.get("maximo", 0)
-                if num_compras >= maximo:
-                    deseo.parametros = {}
-                    plan_name = "finalizar"
-                    deseo_seleccionado = deseo
-                    break
-
-            elif deseo.nombre == "finalizar_consumo":
-                # Si llegamos aquí, todos los deseos anteriores están satisfechos
-                if total_inventario > 0:
-                    # Aún queda inventario para consumir
-                    deseo.parametros = {}
-                    plan_name = "consumo"
-                else:
-                    # No queda inventario: finalizar
-                    deseo.parametros = {}
-                    plan_name = "finalizar"
-                deseo_seleccionado = deseo
-                break
-
-        # Si no se encontró ningún deseo (caso extremo), creamos uno por defecto
-        if deseo_seleccionado is None:
-            # Por seguridad, finalizamos
-            deseo_seleccionado = Deseo("finalizar_consumo", {})
-            plan_name = "finalizar"
+        # Si no se encontró ningún deseo (caso extremo), por seguridad, finalizamos
+        if intencion is None:
+            intencion = Intencion(Deseo("finalizar_consumo", {}), "finalizar")
 
         # 4) Crear la Intención a partir del Deseo seleccionado
-        agent.intencion = Intencion(deseo_seleccionado, plan_name)
+        agent.intencion = intencion
 
-        # 5) Planificación/Ejecución: lanzar el behaviour según plan_name
-        if plan_name == "finalizar":
-            agent.add_behaviour(HandleFinalizacionBehaviour())
+        # 5) Planificación/Ejecución: el plan se ejecuta aquí mismo, dentro
+        #    de este behaviour, sin crear uno nuevo en cada ciclo
+        await PLANES_CLIENTE.ejecutar(self, intencion, agent.planes)
 
-        elif plan_name == "compra_indispensable":
-            agent.add_behaviour(CompraIndispensableBehaviour(faltantes))
 
-        elif plan_name == "compra_normal":
-            agent.add_behaviour(CompraNormalBehaviour())
-
-        else:  # "consumo"
-            agent.add_behaviour(ConsumoBehaviour())
-
-            
-class ClienteAgent(Agent):
+class ClienteAgent(AgenteDespacho):
     """
     Agente cliente para simular el ciclo BDI de compra:
     - Mantiene creencias sobre supermercados y propio inventario
@@ -145,6 +125,9 @@ class ClienteAgent(Agent):
     - Interactúa con supermercados enviando peticiones y mensajes de compra
     """
 
+    ESTADO = ("rng", "ubicacion", "usar_ubicacion", "creencias", "indispensables",
+              "desires", "intencion", "sondeo", "creation_time")
+
     def __init__(
         self,
         jid,
@@ -165,38 +148,42 @@ class ClienteAgent(Agent):
             possible_products (list): Lista de nombres de productos posibles.
             desires (list, opcional): Deseos iniciales; si es None, se generan por defecto.
         """
-        x = random.randint(0, 100)
-        y = random.randint(0, 100)
+        self.rng = generador(cliente_id)
+        x = self.rng.randint(0, 100)
+        y = self.rng.randint(0, 100)
         full_jid = f"{jid}/{cliente_id}"
         super().__init__(full_jid, password)
         self.cliente_id = cliente_id
         self.full_jid = full_jid
         self.ubicacion = (x, y)
         self.usar_ubicacion = True
-        initial_products = random.sample(possible_products, k=2)
+        initial_products = self.rng.sample(possible_products, k=2)
         self.possible_products = possible_products
         self.supermercados_recursos = supermercados_recursos
         clientes_ubicaciones[self.cliente_id] = self.ubicacion
-        self.creation_time = datetime.datetime.now()
-        self.creencias = Creencias()
-        self.creencias.actualizar("supermercados", {})
+        self.creation_time = ahora()
+        self.creencias = Creencias(cliente_id)
+        # En modo suscripción las ofertas siguen vigentes hasta que se publique otra
+        self.creencias.actualizar("supermercados", CacheOfertas(
+            None if MODO_OFERTAS == "suscripcion" else CADUCIDAD_OFERTAS
+        ))
         self.creencias.actualizar("numero_compras", 0)
         self.creencias.actualizar(
             "productos_obtenidos", {p: 0 for p in possible_products}
         )
         valores_eticos = {
-            "huella_ecologica": round(random.uniform(0, 1), 2),
-            "producto_ecologico": round(random.uniform(0, 1), 2),
-            "pocos_intermediarios": round(random.uniform(0, 1), 2),
-            "alta_calidad": round(random.uniform(0, 1), 2),
-            "origen_nacional": round(random.uniform(0, 1), 2),
-            "origen_local": round(random.uniform(0, 1), 2),
-            "origen_pais_desarrollo": round(random.uniform(0, 1), 2),
+            "huella_ecologica": round(self.rng.uniform(0, 1), 2),
+            "producto_ecologico": round(self.rng.uniform(0, 1), 2),
+            "pocos_intermediarios": round(self.rng.uniform(0, 1), 2),
+            "alta_calidad": round(self.rng.uniform(0, 1), 2),
+            "origen_nacional": round(self.rng.uniform(0, 1), 2),
+            "origen_local": round(self.rng.uniform(0, 1), 2),
+            "origen_pais_desarrollo": round(self.rng.uniform(0, 1), 2),
         }
         self.creencias.actualizar("valores_eticos", valores_eticos)
-        compro_lo_de_siempre = random.choice([True, False])
+        compro_lo_de_siempre = self.rng.choice([True, False])
         self.creencias.actualizar("compro_lo_de_siempre", compro_lo_de_siempre)
-        self.indispensables = random.sample(possible_products, k=3)
+        self.indispensables = self.rng.sample(possible_products, k=3)
         self.desires = desires or [
             Deseo("mantener_indispensables", {"umbral": THRESHOLD_INDISPENSABLE}),
             Deseo("cumplir_inventario_basico", {"min_total": 8}),
@@ -205,22 +192,110 @@ class ClienteAgent(Agent):
         ]
         self.intentions = []
         self.pensando = False
+        # Ciclo de vida de los planes ejecutados por el ciclo BDI
+        self.planes = CuentasPlanes()
+        self.suscrito = False
+        self.compras_pendientes = []
+        # Decisiones de este cliente aún sin fusionar en el historial global
+        self.decisiones_propias = decisiones.bufer()
+        self._tabla_variedades = None
+        # Puntuación de las ofertas en creencias y mejor supermercado; se
+        # entera de los cambios de ofertas por suscripción (ver ofertas_cambiadas)
+        self.ranking = RankingSupermercados()
+        self.creencias.suscribir("supermercados", self.ofertas_cambiadas)
+        self._version_lista = None   # versiones de las entradas de la lista corta
+        # Política de sondeo de ofertas y sus contadores
+        self.sondeo = SondeoAdaptativo(
+            SONDEO_CANDIDATOS, SONDEO_EXPLORACION, SONDEO_ANTIGUEDAD_MAX
+        )
         self.creencias_lock = asyncio.Lock()
 
+    def fila_informe(self):
+        """Fila del cliente en la hoja "Agentes" de los resultados."""
+        return {
+            "Tipo": "Cliente",
+            "ID": self.cliente_id,
+            "Ubicacion": str(self.ubicacion),
+            "Creencias": str(self.creencias.data),
+            "Deseos": ", ".join(str(d) for d in self.desires),
+            "Hora de creacion": self.creation_time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def estado(self):
+        estado = super().estado()
+        # Compras ya anotadas cuyo mensaje al supermercado no ha salido aún
+        estado["compras_pendientes"] = list(self.compras_pendientes)
+        return estado
+
+    def restaurar(self, estado):
+        super().restaurar(estado)
+        # Se reenvían en el primer ciclo BDI tras reanudar
+        self.compras_pendientes = estado["compras_pendientes"]
+        self.ranking = RankingSupermercados()
+        self.creencias.suscribir("supermercados", self.ofertas_cambiadas)
+        self._version_lista = None
+        # La suscripción a ofertas se rehace al arrancar de nuevo
+        self.suscrito = False
+
+    def ofertas_cambiadas(self, clave, ofertas, version, jids):
+        """
+        Suscripción a la creencia "supermercados": las ofertas que llegan,
+        cambian o caducan se marcan o se retiran del ranking; si se sustituye
+        la caché entera, el ranking se rehace.
+        """
+        if jids is None:
+            self.ranking.invalidar()
+            return
+        for jid in jids:
+            if jid in ofertas:
+                self.ranking.marcar(jid)
+            else:
+                self.ranking.quitar(jid)
+
+    async def enviar_compra(self, comportamiento, decision):
+        """
+        Envía al supermercado el mensaje "venta" de ``decision`` desde
+        ``comportamiento``. Mientras sale, la decisión queda en
+        compras_pendientes (así la recogen las instantáneas).
+        """
+        self.compras_pendientes.append(decision)
+        msg = Message(to=str(decision["supermercado_jid"]))
+        preparar_mensaje(
+            msg,
+            {
+                "cliente_id": self.cliente_id,
+                "accion": decision["accion"],
+                "productos_comprados": decision.get("productos_comprados", {}),
+                "timestamp": decision["timestamp"],
+                "tipo": "venta",
+            }
+        )
+        await comportamiento.send(msg)
+        self.compras_pendientes.remove(decision)
+        log_ventas.info(
+            self.cliente_id, "Envió mensaje de compra a %s con %d variedades",
+            str(decision["supermercado_jid"]), len(decision.get("productos_comprados", {})),
+        )
+
+    async def reenviar_compras(self, comportamiento):
+        """Envía las compras pendientes restauradas de una instantánea."""
+        pendientes, self.compras_pendientes = self.compras_pendientes, []
+        for decision in pendientes:
+            await self.enviar_compra(comportamiento, decision)
+
     async def revisar_creencias(self):
         """
         Protege la lectura-escritura de self.creencias con el lock:
-        - Elimina datos de supermercados cuya información tenga más de 30 segundos
+        - Elimina las ofertas de supermercados sin actualizar desde hace
+          CADUCIDAD_OFERTAS segundos
+          (en modo suscripción las ofertas siguen vigentes hasta que se publique otra)
         """
+        if MODO_OFERTAS == "suscripcion":
+            return
         async with self.creencias_lock:
-            actuales = self.creencias.obtener("supermercados") or {}
-            frescos = {}
-            now = datetime.datetime.now()
-            for sup_jid, datos in actuales.items():
-                ts = datos.get("timestamp")
-                if ts is None or (now - ts).total_seconds() < 30:
-                    frescos[sup_jid] = datos
-            self.creencias.actualizar("supermercados", frescos)
+            caducadas = self.creencias.obtener("supermercados").caducar(ahora())
+            if caducadas:
+                self.creencias.tocar("supermercados", *caducadas)
 
     def calcular_distancia(self, ubicacion_super):
         """
@@ -241,56 +316,51 @@ class ClienteAgent(Agent):
         Determina el supermercado óptimo según:
         - Preferencias éticas del cliente (ponderadas por WEIGHT_ETHICAL).
         - Distancia al supermercado (ponderada por WEIGHT_DISTANCE).
+        La parte ética es una suma de consultas a la tabla de variedades del
+        cliente (ver tabla_variedades), y solo se repuntúan las ofertas que
+        han cambiado desde la última decisión (ver RankingSupermercados).
 
         Retorna:
             str: JID del supermercado con mejor puntuación.
         """
-        best_supermercado = None
-        best_score = -float("inf")
-        valores_eticos = self.creencias.obtener("valores_eticos") or {}
-
-        priority_ethical = WEIGHT_ETHICAL
-        priority_distance = WEIGHT_DISTANCE
-        total_priority = priority_ethical + priority_distance
-
-        for supermercado, data in self.creencias.obtener("supermercados").items():
-            productos = data.get("productos", {})
-            ubicacion = data.get("ubicacion", (0, 0))
-
-            # Calcular distancia solo si el cliente usa ubicación
-            distance = self.calcular_distancia(ubicacion) if self.usar_ubicacion else 0
-
-            # Calcular la puntuación ética según los valores del cliente
-            ethical_score = 0
-            for prod, det in productos.items():
-                if det.get("stock", 0) > 0:
-                    for criterio, valor_producto in det.items():
-                        if criterio in ("stock", "variedad"):
-                            continue
-                        valor_cliente = valores_eticos.get(criterio, 0)
-                        ethical_score += valor_cliente * valor_producto
-
-            # Puntuación final: proporción de ética menos proporción de distancia
-            if total_priority > 0:
-                score_final = (
-                    (priority_ethical / total_priority) * ethical_score
-                    - (priority_distance / total_priority) * distance
-                )
-            else:
-                score_final = 0
+        return self.ranking.mejor(
+            self.tabla_variedades(),
+            self.ubicacion,
+            self.creencias.obtener("supermercados") or {},
+            self.usar_ubicacion,
+        )
 
-            if score_final > best_score:
-                best_score = score_final
-                best_supermercado = supermercado
+    def supermercados_a_sondear(self):
+        """
+        Supermercados a los que pedir oferta en este ciclo: con sondeo
+        adaptativo, la lista corta se renueva con el ranking actual (solo si
+        las ofertas o las preferencias han cambiado desde la última vez).
+        """
+        version = (self.creencias.version("supermercados"), self.creencias.version("valores_eticos"))
+        if self.sondeo.candidatos is not None and version != self._version_lista:
+            self.calcular_mejor_supermercado()
+            self.sondeo.lista = self.ranking.mejores(self.sondeo.candidatos)
+            self._version_lista = version
+        return self.sondeo.a_sondear(
+            [str(jid) for jid in self.supermercados_recursos], ahora(), self.rng
+        )
 
-        return best_supermercado
+    def tabla_variedades(self):
+        """
+        Tabla { variedad: puntuación ética } para las preferencias del
+        cliente; se recalcula solo si cambian sus valores éticos o el catálogo.
+        """
+        valores_eticos = self.creencias.obtener("valores_eticos") or {}
+        if self._tabla_variedades is None or not self._tabla_variedades.vigente(valores_eticos):
+            self._tabla_variedades = TablaVariedades(valores_eticos)
+        return self._tabla_variedades
 
     async def setup(self):
         logging.info(f"[{self.cliente_id}] Iniciado en {self.ubicacion}.")
         self.add_behaviour(CicloBDIBehaviour(period=5))
         self.add_behaviour(self.RecibirMensaje())
 
-    class RecibirMensaje(CyclicBehaviour):
+    class RecibirMensaje(ManejadorMensajes):
         """
         Ciclo principal BDI para el cliente:
         • Revisión de creencias: limpia ofertas caducadas.
@@ -299,266 +369,300 @@ class ClienteAgent(Agent):
         • Planificación/Ejecución: lanza el behaviour correspondiente.
         """
 
-        async def run(self):
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
-
-            try:
-                body = msg.body or ""
-                data = json.loads(body)
-                if data.get("tipo") == "Peticion_Cliente":
-                    creencias = self.agent.creencias.obtener("supermercados") or {}
-                    creencias[str(msg.sender)] = {
-                        "productos": data.get("productos", {}),
-                        "ubicacion": data.get("ubicacion", (0, 0)),
-                        "timestamp": datetime.datetime.now(),
-                    }
-                    self.agent.creencias.actualizar("supermercados", creencias)
-                    logging.info(
-                        f"[{self.agent.cliente_id}] Oferta de {msg.sender} recibida."
-                    )
-            except json.JSONDecodeError:
-                pass
-
-
-class HandleFinalizacionBehaviour(OneShotBehaviour):
+        tipos = ("Peticion_Cliente",)
+
+        async def manejar(self, msg, data):
+            if data.get("tipo") == "Peticion_Cliente":
+                sender = str(msg.sender)
+                # Misma sección crítica que la revisión de creencias y las compras
+                async with self.agent.creencias_lock:
+                    ofertas = self.agent.creencias.obtener("supermercados")
+                    actual = ofertas.get(sender)
+                    falta_base = False
+                    cambiadas = []
+                    if data.get("sin_cambios") or data.get("delta"):
+                        # Respuesta relativa a la versión que conocemos
+                        base = data.get("desde", data.get("version"))
+                        if actual is None or (actual.get("version") or 0) < base:
+                            falta_base = True
+                        else:
+                            actual["productos"].update(data.get("productos", {}))
+                            actual["version"] = data.get("version")
+                            ofertas.refrescar(sender, ahora())
+                            if data.get("delta"):
+                                cambiadas.append(sender)
+                    else:
+                        ofertas.guardar(sender, {
+                            "productos": data.get("productos", {}),
+                            "ubicacion": data.get("ubicacion", (0, 0)),
+                            "version": data.get("version"),
+                        }, ahora())
+                        cambiadas.append(sender)
+                    if not falta_base:
+                        self.agent.creencias.tocar("supermercados", *cambiadas)
+                if falta_base:
+                    # No tenemos la base: pedir el catálogo completo
+                    peticion = Message(to=sender)
+                    preparar_mensaje(peticion, {"tipo": "Peticion_Cliente"})
+                    await self.send(peticion)
+                    return
+                log_ofertas.info(self.agent.cliente_id, "Oferta de %s recibida.", sender)
+
+
+# -----------------------------------------------------------------------------
+# Biblioteca de planes del cliente
+# -----------------------------------------------------------------------------
+# Opciones: cuándo está insatisfecho cada deseo (mismo orden de prioridad que
+# agent.desires) y qué plan lo atiende. ``contexto`` lo calcula el ciclo BDI.
+PLANES_CLIENTE = BibliotecaPlanes()
+
+
+@PLANES_CLIENTE.opcion("mantener_indispensables")
+def _opcion_indispensables(agente, deseo, contexto):
+    # Deseo insatisfecho si hay imprescindibles por debajo del umbral
+    if contexto["num_compras"] < MAX_PURCHASES and contexto["faltantes"]:
+        # En lugar de payload, usamos "parametros"
+        deseo.parametros = {"productos": contexto["faltantes"]}
+        return "compra_indispensable"
+    return None
+
+
+@PLANES_CLIENTE.opcion("cumplir_inventario_basico")
+def _opcion_inventario_basico(agente, deseo, contexto):
+    # Deseo insatisfecho si total de inventario < mínimo
+    min_total = deseo.parametros.get("min_total", 0)
+    if contexto["num_compras"] < MAX_PURCHASES and contexto["total_inventario"] < min_total:
+        deseo.parametros = {}  # borramos parámetros previos
+        return "compra_normal"
+    return None
+
+
+@PLANES_CLIENTE.opcion("limitar_compras")
+def _opcion_limitar_compras(agente, deseo, contexto):
+    # Deseo insatisfecho si ya superamos el número máximo de compras
+    maximo = deseo.parametros.get("maximo", 0)
+    if contexto["num_compras"] >= maximo:
+        deseo.parametros = {}
+        return "finalizar"
+    return None
+
+
+@PLANES_CLIENTE.opcion("finalizar_consumo")
+def _opcion_finalizar_consumo(agente, deseo, contexto):
+    # Si llegamos aquí, todos los deseos anteriores están satisfechos
+    deseo.parametros = {}
+    if contexto["total_inventario"] > 0:
+        # Aún queda inventario para consumir
+        return "consumo"
+    # No queda inventario: finalizar
+    return "finalizar"
+
+
+@PLANES_CLIENTE.plan("finalizar")
+async def finalizar(ciclo, intencion):
     """
-    Behaviour que procesa la finalización del cliente:
+    Plan de finalización del cliente:
+    • Consumo final si le queda inventario.
     • Marca al cliente como "terminado".
-    • Envía mensaje de finalización o realiza limpieza de recursos si es necesario.
+    • Se da de baja del canal de ofertas si estaba suscrito.
     """
-
-    async def run(self):
-        inventario = self.agent.creencias.obtener("productos_obtenidos") or {}
-
-        # Consumo final si queda algo
-        if sum(inventario.values()) > 0:
-            consumo = {}
-            inventario_previo = dict(inventario)
-            for prod, qty in inventario.items():
-                if qty > 0:
-                    consumo[prod] = 1
-                    inventario[prod] -= 1
-            self.agent.creencias.actualizar("productos_obtenidos", inventario)
-            decision = {
-                "cliente_id": self.agent.cliente_id,
-                "accion": "consumo",
-                "productos_consumidos": consumo,
-                "inventario_previo": inventario_previo,
-                "timestamp": datetime.datetime.now().strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                ),
-                "numero_compra": self.agent.creencias.obtener("numero_compras"),
-            }
-            async with decisiones_lock:
-                decisiones.append(decision)
-
-        # Registro de final
-        final_decision = {
-            "cliente_id": self.agent.cliente_id,
-            "accion": "final",
-            "mensaje": (
-                "Ha terminado (consumo final)"
-                if sum(inventario.values()) >= 0
-                else "Ha terminado (sin inventario)"
+    agente = ciclo.agent
+    inventario = agente.creencias.obtener("productos_obtenidos") or {}
+
+    # Consumo final si queda algo
+    if sum(inventario.values()) > 0:
+        consumo = {}
+        inventario_previo = dict(inventario)
+        for prod, qty in inventario.items():
+            if qty > 0:
+                consumo[prod] = 1
+                inventario[prod] -= 1
+        agente.creencias.actualizar("productos_obtenidos", inventario)
+        decision = {
+            "cliente_id": agente.cliente_id,
+            "accion": "consumo",
+            "productos_consumidos": consumo,
+            "inventario_previo": inventario_previo,
+            "timestamp": ahora().strftime(
+                "%Y-%m-%d %H:%M:%S"
             ),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "numero_compra": self.agent.creencias.obtener("numero_compras"),
+            "numero_compra": agente.creencias.obtener("numero_compras"),
         }
-        async with decisiones_lock:
-            decisiones.append(final_decision)
-            if self.agent.cliente_id not in clients_finished:
-                clients_finished.append(self.agent.cliente_id)
+        anotar_decision(agente, decision)
+
+    # Registro de final
+    final_decision = {
+        "cliente_id": agente.cliente_id,
+        "accion": "final",
+        "mensaje": (
+            "Ha terminado (consumo final)"
+            if sum(inventario.values()) >= 0
+            else "Ha terminado (sin inventario)"
+        ),
+        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_compra": agente.creencias.obtener("numero_compras"),
+    }
+    anotar_decision(agente, final_decision)
+    clients_finished.add(agente.cliente_id)
+
+    # Darse de baja del canal de ofertas
+    if agente.suscrito:
+        for sup_jid in agente.supermercados_recursos:
+            msg = Message(to=str(sup_jid))
+            preparar_mensaje(msg, {"tipo": "Baja_Suscripcion"})
+            await ciclo.send(msg)
+        agente.suscrito = False
 
 
-class CompraIndispensableBehaviour(OneShotBehaviour):
+@PLANES_CLIENTE.plan("compra_indispensable")
+async def compra_indispensable(ciclo, intencion):
     """
-    Behaviour para realizar compras indispensables:
+    Plan de compra de indispensables:
     • Consulta ofertas recibidas en creencias.
-    • Selecciona el supermercado con el mejor precio para cada producto faltante.
-    • Envía mensajes de compra a los supermercados seleccionados.
-    • Actualiza creencias con la decisión tomada.
+    • Elige el mejor supermercado y compra los productos faltantes
+      (parámetro "productos" del deseo).
+    • Actualiza creencias, registra la decisión y envía la compra.
     """
-
-    def __init__(self, faltantes):
-        super().__init__()
-        self.faltantes = faltantes
-
-    async def run(self):
-        # 0) Evitar exceso y leer número de compras bajo lock
-        async with self.agent.creencias_lock:
-            num_cmp = self.agent.creencias.obtener("numero_compras") or 0
-            if num_cmp >= MAX_PURCHASES:
-                return
-
-            # 1) Elegir supermercado
-            best_super = self.agent.calcular_mejor_supermercado()
-            if not best_super:
-                return
-
-            creencias_sup = self.agent.creencias.obtener("supermercados")
-            sup_data = creencias_sup.get(best_super, {})
-            productos_sup = sup_data.get("productos", {})
-            inventario = self.agent.creencias.obtener("productos_obtenidos") or {}
-
-            # 2) Preparar la compra
-            new_purchase = {}
-            for prod in self.faltantes:
-                det = productos_sup.get(prod, {})
-                stock_disp = det.get("stock", 0)
-                if stock_disp > 0:
-                    qty = min(random.randint(2, 6), stock_disp)
+    agente = ciclo.agent
+    faltantes = intencion.deseo.parametros["productos"]
+    # 0) Evitar exceso y leer número de compras bajo lock
+    async with agente.creencias_lock:
+        num_cmp = agente.creencias.obtener("numero_compras") or 0
+        if num_cmp >= MAX_PURCHASES:
+            return
+
+        # 1) Elegir supermercado
+        best_super = agente.calcular_mejor_supermercado()
+        if not best_super:
+            return
+        creencias_sup = agente.creencias.obtener("supermercados")
+        sup_data = creencias_sup.get(best_super, {})
+        agente.sondeo.anotar_compra(best_super, sup_data.get("timestamp"), ahora())
+        productos_sup = sup_data.get("productos", {})
+        inventario = agente.creencias.obtener("productos_obtenidos") or {}
+
+        # 2) Preparar la compra
+        new_purchase = {}
+        for prod in faltantes:
+            det = productos_sup.get(prod, {})
+            stock_disp = det.get("stock", 0)
+            if stock_disp > 0:
+                qty = min(agente.rng.randint(2, 6), stock_disp)
+                var = det.get("variedad")
+                if var:
+                    new_purchase[var] = new_purchase.get(var, 0) + qty
+                    productos_sup[prod]["stock"] -= qty
+                    inventario[prod] += qty
+
+        # El stock conocido de ese supermercado ha cambiado
+        agente.creencias.tocar("supermercados", best_super)
+
+        # 3) Actualizar creencias del cliente
+        current_comp = num_cmp + 1
+        agente.creencias.actualizar("productos_obtenidos", inventario)
+        agente.creencias.actualizar("numero_compras", current_comp)
+
+    # 4) Construir y guardar la decisión
+    decision = {
+        "cliente_id": agente.cliente_id,
+        "accion": "compra_indispensable",
+        "supermercado_elegido": best_super.split("/")[-1],
+        "supermercado_jid": best_super,
+        "productos_comprados": new_purchase,
+        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_compra": current_comp,
+        "indispensables_faltantes": faltantes,
+    }
+    anotar_decision(agente, decision)
+
+    # 5) Enviar mensaje al supermercado
+    await agente.enviar_compra(ciclo, decision)
+
+
+@PLANES_CLIENTE.plan("compra_normal")
+async def compra_normal(ciclo, intencion):
+    """
+    Plan de compra normal (no indispensable):
+    • Recopila ofertas actuales de creencias.
+    • Elige el mejor supermercado y productos adicionales.
+    • Actualiza creencias, registra la decisión y envía la compra.
+    """
+    agente = ciclo.agent
+    # 0) Evitar exceso y leer número de compras bajo lock
+    async with agente.creencias_lock:
+        num_cmp = agente.creencias.obtener("numero_compras") or 0
+        if num_cmp >= MAX_PURCHASES:
+            return
+
+        # 1) Elegir supermercado
+        best_super = agente.calcular_mejor_supermercado()
+        if not best_super:
+            return
+        creencias_sup = agente.creencias.obtener("supermercados")
+        sup_data = creencias_sup.get(best_super, {})
+        agente.sondeo.anotar_compra(best_super, sup_data.get("timestamp"), ahora())
+        productos_sup = sup_data.get("productos", {})
+        inventario = agente.creencias.obtener("productos_obtenidos") or {}
+
+        # 2) Preparar la compra
+        new_purchase = {}
+        for prod, det in productos_sup.items():
+            stock_disp = det.get("stock", 0)
+            if stock_disp > 0:
+                qty = min(agente.rng.randint(0, 5), stock_disp)
+                if qty > 0:
                     var = det.get("variedad")
                     if var:
                         new_purchase[var] = new_purchase.get(var, 0) + qty
                         productos_sup[prod]["stock"] -= qty
                         inventario[prod] += qty
 
-            # 3) Actualizar creencias del cliente
-            current_comp = num_cmp + 1
-            self.agent.creencias.actualizar("productos_obtenidos", inventario)
-            self.agent.creencias.actualizar("numero_compras", current_comp)
+        # El stock conocido de ese supermercado ha cambiado
+        agente.creencias.tocar("supermercados", best_super)
 
-        # 4) Construir y guardar la decisión
-        decision = {
-            "cliente_id": self.agent.cliente_id,
-            "accion": "compra_indispensable",
-            "supermercado_elegido": best_super.split("/")[-1],
-            "supermercado_jid": best_super,
-            "productos_comprados": new_purchase,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "numero_compra": current_comp,
-            "indispensables_faltantes": self.faltantes,
-        }
-        async with decisiones_lock:
-            decisiones.append(decision)
+        # 3) Actualizar creencias del cliente
+        current_comp = num_cmp + 1
+        agente.creencias.actualizar("productos_obtenidos", inventario)
+        agente.creencias.actualizar("numero_compras", current_comp)
 
-        # 5) Enviar mensaje al supermercado
-        self.agent.add_behaviour(EnviarMensajeCompra(decision))
+    # 4) Construir y guardar la decisión
+    decision = {
+        "cliente_id": agente.cliente_id,
+        "accion": "compra",
+        "supermercado_elegido": best_super.split("/")[-1],
+        "supermercado_jid": best_super,
+        "productos_comprados": new_purchase,
+        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_compra": current_comp,
+    }
+    anotar_decision(agente, decision)
 
+    # 5) Enviar mensaje al supermercado
+    await agente.enviar_compra(ciclo, decision)
 
-class CompraNormalBehaviour(OneShotBehaviour):
-    """
-    Behaviour para realizar compras normales (no indispensables):
-    • Recopila ofertas actuales de creencias.
-    • Evalúa y selecciona productos adicionales según preferencias.
-    • Envía mensajes de compra a supermercados seleccionados.
-    • Actualiza creencias con la decisión y registra la compra.
-    """
 
-    async def run(self):
-        # 0) Evitar exceso y leer número de compras bajo lock
-        async with self.agent.creencias_lock:
-            num_cmp = self.agent.creencias.obtener("numero_compras") or 0
-            if num_cmp >= MAX_PURCHASES:
-                return
-
-            # 1) Elegir supermercado
-            best_super = self.agent.calcular_mejor_supermercado()
-            if not best_super:
-                return
-
-            creencias_sup = self.agent.creencias.obtener("supermercados")
-            sup_data = creencias_sup.get(best_super, {})
-            productos_sup = sup_data.get("productos", {})
-            inventario = self.agent.creencias.obtener("productos_obtenidos") or {}
-
-            # 2) Preparar la compra
-            new_purchase = {}
-            for prod, det in productos_sup.items():
-                stock_disp = det.get("stock", 0)
-                if stock_disp > 0:
-                    qty = min(random.randint(0, 5), stock_disp)
-                    if qty > 0:
-                        var = det.get("variedad")
-                        if var:
-                            new_purchase[var] = new_purchase.get(var, 0) + qty
-                            productos_sup[prod]["stock"] -= qty
-                            inventario[prod] += qty
-
-            # 3) Actualizar creencias del cliente
-            current_comp = num_cmp + 1
-            self.agent.creencias.actualizar("productos_obtenidos", inventario)
-            self.agent.creencias.actualizar("numero_compras", current_comp)
-
-        # 4) Construir y guardar la decisión
-        decision = {
-            "cliente_id": self.agent.cliente_id,
-            "accion": "compra",
-            "supermercado_elegido": best_super.split("/")[-1],
-            "supermercado_jid": best_super,
-            "productos_comprados": new_purchase,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "numero_compra": current_comp,
-        }
-        async with decisiones_lock:
-            decisiones.append(decision)
-
-        # 5) Enviar mensaje al supermercado
-        self.agent.add_behaviour(EnviarMensajeCompra(decision))
-
-
-class ConsumoBehaviour(OneShotBehaviour):
+@PLANES_CLIENTE.plan("consumo")
+async def consumo(ciclo, intencion):
     """
-    Behaviour para simular consumo de productos:
-    • Reduce cantidades en inventario personal.
-    • Actualiza creencias con el nuevo estado de inventario.
-    • Registra el evento de consumo en el log.
+    Plan de consumo: reduce el inventario personal, actualiza creencias y
+    registra el consumo.
     """
-
-    async def run(self):
-        # 1) Consumir del inventario bajo lock
-        async with self.agent.creencias_lock:
-            inventario = self.agent.creencias.obtener("productos_obtenidos") or {}
-            consumo = {p: 1 for p, q in inventario.items() if q > 0}
-            for prod in consumo:
-                inventario[prod] -= 1
-            self.agent.creencias.actualizar("productos_obtenidos", inventario)
-            current_comp = self.agent.creencias.obtener("numero_compras")
-
-        # 2) Construir y guardar la decisión
-        decision = {
-            "cliente_id": self.agent.cliente_id,
-            "accion": "consumo",
-            "productos_consumidos": consumo,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "numero_compra": current_comp,
-        }
-        async with decisiones_lock:
-            decisiones.append(decision)
-
-
-class EnviarMensajeCompra(OneShotBehaviour):
-    """
-    Inicializa y envía un comportamiento de un solo disparo para la compra.
-
-    Parámetros:
-        decision (dict): Datos de la decisión (productos, JID destino, timestamp…).
-    """
-
-    def __init__(self, decision):
-        super().__init__()
-        self.decision = decision
-
-    async def run(self):
-        """
-        Construye y envía el mensaje de tipo “venta” al supermercado
-        usando la información en self.decision.
-        """
-        msg = Message(to=str(self.decision["supermercado_jid"]))
-        msg.body = json.dumps(
-            {
-                "cliente_id": self.agent.cliente_id,
-                "accion": self.decision["accion"],
-                "productos_comprados": self.decision.get("productos_comprados", {}),
-                "timestamp": self.decision["timestamp"],
-                "tipo": "venta",
-            }
-        )
-        await self.send(msg)
-        logging.info(
-            f"[{self.agent.cliente_id}] Envió mensaje de compra a "
-            f"{self.decision['supermercado_jid']} con productos: "
-            f"{self.decision.get('productos_comprados', {})}"
-        )
+    agente = ciclo.agent
+    # 1) Consumir del inventario bajo lock
+    async with agente.creencias_lock:
+        inventario = agente.creencias.obtener("productos_obtenidos") or {}
+        consumo = {p: 1 for p, q in inventario.items() if q > 0}
+        for prod in consumo:
+            inventario[prod] -= 1
+        agente.creencias.actualizar("productos_obtenidos", inventario)
+        current_comp = agente.creencias.obtener("numero_compras")
+
+    # 2) Construir y guardar la decisión
+    decision = {
+        "cliente_id": agente.cliente_id,
+        "accion": "consumo",
+        "productos_consumidos": consumo,
+        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_compra": current_comp,
+    }
+    anotar_decision(agente, decision)
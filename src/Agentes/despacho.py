@@ -0,0 +1,196 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import asyncio
+from collections import Counter
+
+from spade.agent import Agent
+from spade.behaviour import CyclicBehaviour
+
+from ..codificacion import METADATO_TIPO, leer_mensaje
+from ..eventos import registrar_mensaje
+from ..logger import logging
+
+# -----------------------------------------------------------------------------
+# Enrutado de mensajes por tipo
+# -----------------------------------------------------------------------------
+# SPADE deja cada mensaje en el buzón de todos los behaviours sin plantilla:
+# con varios receptores cada uno decodificaba el cuerpo y descartaba lo que no
+# era suyo, y los behaviours periódicos acumulaban copias que nadie leía. Aquí
+# el agente enruta cada mensaje una sola vez: mira el tipo en el metadato
+# "tipo" (sin tocar el cuerpo) y lo deja en la bandeja del único
+# ManejadorMensajes registrado para ese tipo.
+
+
+class ManejadorMensajes(CyclicBehaviour):
+    """
+    Behaviour receptor de uno o varios tipos de mensaje:
+    • ``tipos`` indica qué tipos atiende.
+    • ``manejar(msg, data)`` procesa cada mensaje ya decodificado.
+    Los mensajes llegan a su ``bandeja`` desde el Despachador del agente,
+    nunca por el buzón general de SPADE.
+    """
+
+    tipos = ()
+
+    def __init__(self):
+        super().__init__()
+        self.bandeja = asyncio.Queue()
+
+    async def run(self):
+        try:
+            msg, data = await asyncio.wait_for(self.bandeja.get(), timeout=10)
+        except asyncio.TimeoutError:
+            return
+        # Solo se decodifica aquí si el Despachador no lo hizo ya
+        if data is None:
+            data = leer_mensaje(msg)
+        tipo = msg.get_metadata(METADATO_TIPO)
+        if not isinstance(data, dict):
+            self.agent.despachador.descartar(tipo, msg)
+            return
+        await self.manejar(msg, data)
+        self.agent.despachador.procesados[tipo or data.get("tipo")] += 1
+
+    async def manejar(self, msg, data):
+        raise NotImplementedError
+
+
+class Despachador:
+    """
+    Tabla { tipo de mensaje: ManejadorMensajes } de un agente, con contadores
+    por tipo de mensajes recibidos, procesados y descartados.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.manejadores = {}
+        self.recibidos = Counter()
+        self.procesados = Counter()
+        self.descartados = Counter()
+
+    def registrar(self, manejador):
+        for tipo in manejador.tipos:
+            self.manejadores[tipo] = manejador
+
+    def descartar(self, tipo, msg):
+        self.descartados[tipo] += 1
+        logging.warning(
+            f"[{self.nombre}] Mensaje descartado (tipo={tipo}) de {msg.sender}"
+        )
+
+    def despachar(self, msg):
+        """
+        Enruta ``msg`` a la bandeja de su manejador.
+
+        Retorna:
+            bool: True si el mensaje quedó en alguna bandeja.
+        """
+        tipo = msg.get_metadata(METADATO_TIPO)
+        data = None
+        if tipo is None:
+            # Mensaje sin etiquetar (p.ej. de un agente externo): se lee el
+            # cuerpo una vez y el resultado viaja con el mensaje
+            data = leer_mensaje(msg)
+            tipo = data.get("tipo") if isinstance(data, dict) else None
+        self.recibidos[tipo] += 1
+
+        manejador = self.manejadores.get(tipo)
+        if manejador is None or manejador.is_killed():
+            self.descartar(tipo, msg)
+            return False
+        manejador.bandeja.put_nowait((msg, data))
+        return True
+
+    def resumen(self):
+        """{ tipo: (recibidos, procesados, descartados) } para el informe final."""
+        tipos = set(self.recibidos) | set(self.descartados)
+        return {
+            tipo: (self.recibidos[tipo], self.procesados[tipo], self.descartados[tipo])
+            for tipo in tipos
+        }
+
+
+class AgenteDespacho(Agent):
+    """
+    Agente SPADE cuyo ``dispatch`` pasa por un Despachador. Sirve igual para
+    el transporte XMPP (SPADE llama a ``dispatch`` al recibir) y para el
+    transporte local.
+
+    ``ESTADO`` enumera los atributos que forman el estado de simulación del
+    agente (lo que guardan y restauran las instantáneas).
+    """
+
+    ESTADO = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.despachador = Despachador(str(self.jid))
+        self.mensajes_pendientes = []
+
+    def estado(self):
+        """
+        Estado del agente para una instantánea: los atributos de ``ESTADO`` y
+        los mensajes recibidos que aún esperan en las bandejas.
+        """
+        estado = {nombre: getattr(self, nombre, None) for nombre in self.ESTADO}
+        pendientes = []
+        for manejador in set(self.despachador.manejadores.values()):
+            cola = []
+            while not manejador.bandeja.empty():
+                cola.append(manejador.bandeja.get_nowait())
+            for elemento in cola:
+                manejador.bandeja.put_nowait(elemento)
+            pendientes.extend(msg for msg, _ in cola)
+        estado["mensajes_pendientes"] = pendientes
+        return estado
+
+    def restaurar(self, estado):
+        """Restaura un estado de ``estado()`` (antes de arrancar el agente)."""
+        for nombre in self.ESTADO:
+            setattr(self, nombre, estado[nombre])
+        self.mensajes_pendientes = estado["mensajes_pendientes"]
+
+    def reanudar(self):
+        """Ya arrancado el agente restaurado, reentrega sus mensajes pendientes."""
+        pendientes, self.mensajes_pendientes = self.mensajes_pendientes, []
+        for msg in pendientes:
+            self.despachador.despachar(msg)
+
+    def add_behaviour(self, behaviour, template=None):
+        super().add_behaviour(behaviour, template)
+        if isinstance(behaviour, ManejadorMensajes):
+            self.despachador.registrar(behaviour)
+
+    def dispatch(self, msg):
+        registrar_mensaje(msg)
+        return self.despachador.despachar(msg)
+
+
+def sumar_resumenes(resumenes):
+    """
+    Suma varios resúmenes { tipo: (recibidos, procesados, descartados) }.
+    """
+    total = {}
+    for resumen in resumenes:
+        for tipo, cuentas in resumen.items():
+            previas = total.get(tipo, (0, 0, 0))
+            total[tipo] = tuple(a + b for a, b in zip(previas, cuentas))
+    return total
+
+
+def resumen_despacho(agentes, otros=()):
+    """
+    Suma los contadores de despacho de varios agentes (y de los resúmenes
+    ``otros`` llegados de otros procesos).
+
+    Retorna:
+        dict: { tipo: (recibidos, procesados, descartados) }
+    """
+    return sumar_resumenes([a.despachador.resumen() for a in agentes] + list(otros))
@@ -0,0 +1,242 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+from collections import deque
+
+from spade.message import Message
+
+from ..codificacion import asignar_cuerpo, codificar
+from ..logger import log_ofertas
+from ..reloj import ComportamientoPeriodico
+
+
+class CacheOfertas(dict):
+    """
+    Ofertas conocidas por un cliente, { jid: {"productos", "ubicacion",
+    "version", "timestamp"} }, que caducan ``ttl`` segundos después de su
+    última actualización (None: no caducan).
+
+    Cada actualización añade (momento, jid) al final de una cola; como el
+    reloj no retrocede, la cola queda ordenada por antigüedad y ``caducar``
+    solo mira su principio. Las entradas de actualizaciones ya superadas se
+    descartan al llegar a él. Insertar y caducar cuestan O(1) amortizado, sin
+    reconstruir el diccionario en cada ciclo.
+    Las operaciones no ceden el control al bucle de eventos: son atómicas
+    respecto a los demás behaviours del agente.
+    """
+
+    def __init__(self, ttl=None):
+        super().__init__()
+        self.ttl = ttl
+        self.caducidades = deque()
+
+    def guardar(self, jid, datos, momento):
+        """Guarda (o sustituye) la oferta completa de ``jid``."""
+        datos["timestamp"] = momento
+        self[jid] = datos
+        self._programar(jid, momento)
+
+    def refrescar(self, jid, momento):
+        """La oferta de ``jid`` sigue vigente (o se acaba de completar con un delta)."""
+        self[jid]["timestamp"] = momento
+        self._programar(jid, momento)
+
+    def _programar(self, jid, momento):
+        if self.ttl is not None:
+            self.caducidades.append((momento, jid))
+
+    def caducar(self, momento):
+        """Elimina las ofertas sin actualizar desde hace ``ttl`` segundos y devuelve sus jids."""
+        caducadas = []
+        while self.caducidades and (momento - self.caducidades[0][0]).total_seconds() >= self.ttl:
+            instante, jid = self.caducidades.popleft()
+            datos = self.get(jid)
+            if datos is not None and datos.get("timestamp") == instante:
+                del self[jid]
+                caducadas.append(jid)
+        return caducadas
+
+
+class SondeoAdaptativo:
+    """
+    A qué supermercados pide oferta un cliente en cada ciclo (modo
+    MODO_OFERTAS = "sondeo").
+
+    Con ``candidatos`` None pregunta a todos. Si no, pregunta siempre a su
+    lista corta (``lista``: los ``candidatos`` supermercados mejor puntuados)
+    y al resto solo si nunca les ha preguntado, si su última petición tiene
+    ``antiguedad_max`` segundos o más, o con probabilidad ``exploracion``
+    para descubrir cambios de catálogo.
+
+    Contadores: peticiones enviadas y omitidas y, para medir lo que cuesta
+    el ahorro en calidad de decisión, con qué ofertas se compra: cuántas
+    compras se decidieron con la oferta de un supermercado al que no se
+    preguntó en el último ciclo (una oferta vieja, que una petición a todos
+    habría renovado) y la antigüedad de la oferta ganadora (media y máxima).
+    """
+
+    def __init__(self, candidatos=None, exploracion=0.0, antiguedad_max=None):
+        self.candidatos = candidatos
+        self.exploracion = exploracion
+        self.antiguedad_max = antiguedad_max
+        self.lista = []
+        self.ultimo_sondeo = {}       # { jid: momento de la última petición }
+        self.sondeados = set()        # supermercados preguntados en el último ciclo
+        self.enviadas = 0
+        self.omitidas = 0
+        self.compras = 0
+        self.sin_sondear = 0
+        self.edad_total = 0.0          # antigüedad (s) de las ofertas ganadoras
+        self.edad_max = 0.0
+
+    def a_sondear(self, supermercados, momento, rng):
+        """Supermercados de ``supermercados`` a los que preguntar en ``momento``."""
+        if self.candidatos is None:
+            seleccion = list(supermercados)
+        else:
+            lista = set(self.lista)
+            seleccion = []
+            for jid in supermercados:
+                ultimo = self.ultimo_sondeo.get(jid)
+                if (
+                    jid in lista
+                    or ultimo is None
+                    or (self.antiguedad_max is not None
+                        and (momento - ultimo).total_seconds() >= self.antiguedad_max)
+                    or rng.random() < self.exploracion
+                ):
+                    seleccion.append(jid)
+            for jid in seleccion:
+                self.ultimo_sondeo[jid] = momento
+        self.sondeados = set(seleccion)
+        self.enviadas += len(seleccion)
+        self.omitidas += len(supermercados) - len(seleccion)
+        return seleccion
+
+    def anotar_compra(self, supermercado, recibida, momento):
+        """
+        Compra en ``supermercado`` en ``momento`` con su oferta recibida en
+        ``recibida``: cuenta si no se le preguntó en el último ciclo y la
+        antigüedad de la oferta.
+        """
+        self.compras += 1
+        if supermercado not in self.sondeados:
+            self.sin_sondear += 1
+        if recibida is not None:
+            antiguedad = (momento - recibida).total_seconds()
+            self.edad_total += antiguedad
+            self.edad_max = max(self.edad_max, antiguedad)
+
+    def resumen(self):
+        """Contadores para el informe final."""
+        return {
+            "enviadas": self.enviadas,
+            "omitidas": self.omitidas,
+            "compras": self.compras,
+            "sin_sondear": self.sin_sondear,
+            "antiguedad_total": self.edad_total,
+            "antiguedad_max": self.edad_max,
+        }
+
+
+class VersionesCatalogo:
+    """
+    Versión monótona del catálogo de un supermercado.
+
+    Cada cambio de stock o de variedad incrementa ``version`` y anota en
+    ``cambios`` la versión en la que cambió cada producto. Con ello el
+    supermercado puede responder a un cliente que ya conoce la versión ``v``:
+    • "sin_cambios" si ``v`` es la versión actual,
+    • un delta con solo los productos modificados después de ``v``,
+    • el catálogo completo si ``v`` es desconocida.
+    """
+
+    def __init__(self):
+        self.version = 1
+        self.cambios = {}             # { producto: versión de su último cambio }
+        self.respuestas = {"completa": 0, "delta": 0, "sin_cambios": 0}
+
+    def marcar(self, *productos):
+        """Registra una nueva versión en la que cambian ``productos``."""
+        if not productos:
+            return
+        self.version += 1
+        for producto in productos:
+            self.cambios[producto] = self.version
+
+    def construir_oferta(self, productos, ubicacion, version_cliente=None):
+        """
+        Construye el cuerpo de la oferta para un cliente que conoce
+        ``version_cliente`` (None si no tiene ninguna).
+        """
+        if version_cliente == self.version:
+            self.respuestas["sin_cambios"] += 1
+            return {
+                "tipo": "Peticion_Cliente",
+                "version": self.version,
+                "sin_cambios": True
+            }
+        if isinstance(version_cliente, int) and 0 < version_cliente < self.version:
+            self.respuestas["delta"] += 1
+            return {
+                "tipo": "Peticion_Cliente",
+                "version": self.version,
+                "desde": version_cliente,
+                "delta": True,
+                "productos": {
+                    p: productos[p]
+                    for p, v in self.cambios.items()
+                    if v > version_cliente and p in productos
+                }
+            }
+        self.respuestas["completa"] += 1
+        return {
+            "tipo": "Peticion_Cliente",
+            "version": self.version,
+            "productos": productos,
+            "ubicacion": ubicacion
+        }
+
+
+class PublicarOfertas(ComportamientoPeriodico):
+    """
+    Canal publicación/suscripción de ofertas, común a supermercados normales
+    e inteligentes (modo MODO_OFERTAS = "suscripcion"):
+    • El agente incrementa ``versiones`` cuando cambia stock o variedades.
+    • En cada periodo, si la versión ha avanzado desde la última publicación,
+      serializa una sola vez el delta desde esa publicación y lo envía a
+      todos los clientes de ``suscriptores``.
+    Así el número de mensajes depende de los cambios de catálogo y no de
+    clientes × supermercados.
+    """
+
+    def __init__(self, period):
+        super().__init__(period=period)
+        self.version_publicada = None
+
+    async def run(self):
+        agent = self.agent
+        version = agent.versiones.version
+        if version == self.version_publicada:
+            return
+        desde = self.version_publicada
+        self.version_publicada = version
+        if not agent.suscriptores or desde is None:
+            # Los nuevos suscriptores reciben el catálogo completo al darse de alta
+            return
+
+        oferta = agent.construir_oferta(desde)
+        cuerpo, codificacion = codificar(oferta)
+        for cliente_jid in list(agent.suscriptores):
+            msg = Message(to=cliente_jid)
+            asignar_cuerpo(msg, cuerpo, codificacion, oferta["tipo"])
+            await self.send(msg)
+        log_ofertas.info(
+            agent.supermercado_id, "Oferta publicada a %d suscriptores.", len(agent.suscriptores)
+        )
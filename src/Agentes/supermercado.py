@@ -7,28 +7,37 @@ Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
 Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
 en la raíz del repositorio.
 """
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
+from spade.behaviour import CyclicBehaviour
 from spade.message import Message
 from ..config import (
     ENABLE_VARIETY_CHANGE,
+    INTERVALO_PUBLICACION_OFERTAS,
+    MODO_OFERTAS,
     VARIETY_CHANGE_INTERVAL,
+    VENTAS_LOTE_INTERVALO,
+    VENTAS_LOTE_TAMANO,
     possible_products,
     possible_varieties,
-    predefined_ethics,
     supermercados_ubicaciones
 )
-import random
+from ..aleatorio import generador
 from ..BDI.Creencias import Creencias
+from ..codificacion import asignar_cuerpo, codificacion_de, codificar, preparar_mensaje
+from ..inventario import Inventario
 from ..BDI.Deseo import Deseo
 from ..BDI.Intenciones import Intencion
-from ..logger import logging
-import json
-import datetime
+from ..logger import log_mensajes, log_ofertas, log_surtido, log_ventas, logging
+from ..reloj import ComportamientoPeriodico, ahora, en_hilo
+from .despacho import AgenteDespacho, ManejadorMensajes
+from .ofertas import PublicarOfertas, VersionesCatalogo
 import asyncio
+from collections import deque
 
 
-class SupermercadoAgent(Agent):
+class SupermercadoAgent(AgenteDespacho):
+    ESTADO = ("rng", "ubicacion", "creencias", "desires", "intencion", "ventas_delta",
+              "ventas_registradas_hist", "last_variety_change", "suscriptores", "versiones", "creation_time")
+
     def __init__(
         self,
         jid,
@@ -38,7 +47,8 @@ class SupermercadoAgent(Agent):
         smart_super_jids: list[str],
         desires=None
     ):
-        x, y = random.randint(0, 100), random.randint(0, 100)
+        self.rng = generador(supermercado_id)
+        x, y = self.rng.randint(0, 100), self.rng.randint(0, 100)
         full_jid = f"{jid}/{supermercado_id}"
         super().__init__(full_jid, password)
         self.supermercado_id = supermercado_id
@@ -51,17 +61,23 @@ class SupermercadoAgent(Agent):
         supermercados_ubicaciones[self.supermercado_id] = self.ubicacion
 
         # Creencias: clientes, ventas e inventario
-        self.creencias = Creencias()
+        self.creencias = Creencias(supermercado_id)
         self.creencias.actualizar("clientes", {})
         self.creencias.actualizar("ventas", [])
         self.creencias.actualizar("inventario", inventario)
 
-        # Registros de ventas
-        self.ventas_delta = []
+        # Registros de ventas (cola pendiente de enviar al smart y aviso de lote lleno)
+        self.ventas_delta = deque()
+        self.lote_ventas_lleno = asyncio.Event()
         self.ventas_registradas_hist = []
-        self.creation_time = datetime.datetime.now()
+        self.creation_time = ahora()
         # Registro del último cambio de variedades
-        self.last_variety_change = datetime.datetime.now()
+        self.last_variety_change = ahora()
+
+        # Suscripción de ofertas (MODO_OFERTAS = "suscripcion")
+        self.suscriptores = set()
+        # Versión del catálogo para respuestas "sin cambios" y deltas
+        self.versiones = VersionesCatalogo()
 
         # Deseos iniciales
         if desires is None:
@@ -79,7 +95,7 @@ class SupermercadoAgent(Agent):
         # Intención actual (None si no hay)
         self.intencion = None
 
-    class BDIBehaviour(PeriodicBehaviour):
+    class BDIBehaviour(ComportamientoPeriodico):
         """
         Ciclo BDI para SupermercadoAgent:
         1) ACTUALIZAR CRENCIAS (ventas/clientes/inventario)
@@ -93,30 +109,37 @@ class SupermercadoAgent(Agent):
         """
         def __init__(self, period):
             super().__init__(period=period)
+            # Productos con poco stock y versión del inventario con la que se calcularon
+            self.bajo_stock = []
+            self.version_inventario = None
 
         async def run(self):
             agent = self.agent
-            ahora = datetime.datetime.now()
+            momento = ahora()
 
             # ---------------------------------------------
             # FASE 1: ACTUALIZAR CRENCIAS (ya se actualizan en otros comportamientos)
             clientes = agent.creencias.obtener("clientes") or {}
             ventas = agent.creencias.obtener("ventas") or []
-            inventario = agent.creencias.obtener("inventario") or {}
+            inventario = agent.creencias.obtener("inventario")
 
             # ---------------------------------------------
             # FASE 2: DELIBERAR (verificar deseos insatisfechos)
             agent.intencion = None
 
-            # 2.1 Revisar "tener_stock"
-            low_stock = [p for p, d in inventario.items() if d["stock"] < 100]
+            # 2.1 Revisar "tener_stock" (solo se recalcula si el inventario ha cambiado)
+            version = agent.creencias.version("inventario")
+            if version != self.version_inventario:
+                self.bajo_stock = inventario.bajo_stock(100)
+                self.version_inventario = version
+            low_stock = self.bajo_stock
             if any(d.nombre == "tener_stock" for d in agent.desires) and low_stock:
                 deseo_ts = next(d for d in agent.desires if d.nombre == "tener_stock")
                 agent.intencion = Intencion(deseo_ts, "rotar_variedades")
 
             # 2.2 Si no se elige "tener_stock", revisar "rotar_variedades"
             if agent.intencion is None and ENABLE_VARIETY_CHANGE:
-                tiempo_pasado = (ahora - agent.last_variety_change).total_seconds()
+                tiempo_pasado = (momento - agent.last_variety_change).total_seconds()
                 if any(d.nombre == "rotar_variedades" for d in agent.desires) and tiempo_pasado >= VARIETY_CHANGE_INTERVAL:
                     deseo_rv = next(d for d in agent.desires if d.nombre == "rotar_variedades")
                     agent.intencion = Intencion(deseo_rv, "rotar_variedades")
@@ -129,29 +152,50 @@ class SupermercadoAgent(Agent):
                 deseo_act = agent.intencion.deseo
 
                 if plan == "rotar_variedades":
-                    logging.info(f"[{agent.supermercado_id}] Intención: rotar_variedades")
-                    await asyncio.to_thread(agent.cambiar_variedades)
+                    log_surtido.info(agent.supermercado_id, "Intención: rotar_variedades")
+                    await en_hilo(agent.cambiar_variedades)
 
                     # Si la intención venía de "rotar_variedades", actualizar timestamp
                     if deseo_act.nombre == "rotar_variedades":
-                        agent.last_variety_change = datetime.datetime.now()
+                        agent.last_variety_change = ahora()
 
             # ---------------------------------------------
             # FASE 4: REINICIO DEL CICLO
             # ---------------------------------------------
             return
 
+    def fila_informe(self):
+        """Fila del supermercado en la hoja "Agentes" de los resultados."""
+        return {
+            "Tipo": "Supermercado",
+            "ID": self.supermercado_id,
+            "Ubicacion": str(supermercados_ubicaciones[self.supermercado_id]),
+            "Creencias": str(self.creencias.data),
+            "Deseos": ", ".join(str(d) for d in self.desires),
+            "Hora de creacion": self.creation_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "Ventas registradas": str(self.ventas_registradas_hist)
+        }
+
+    def construir_oferta(self, version_cliente=None):
+        """
+        Cuerpo del mensaje de oferta con el inventario y la ubicación, o solo
+        lo modificado desde ``version_cliente`` si el cliente indica la suya.
+        """
+        return self.versiones.construir_oferta(
+            self.creencias.obtener("inventario") or {},
+            self.ubicacion,
+            version_cliente
+        )
+
     def generar_criterios_productos(self):
-        resultado = {}
+        """Inventario inicial: una variedad al azar por producto y su stock."""
+        resultado = Inventario()
         for producto in possible_products:
             variedad = (
-                random.choice(possible_varieties[producto])
+                self.rng.choice(possible_varieties[producto])
                 if producto in possible_varieties else producto
             )
-            detalle = predefined_ethics[variedad].copy()
-            detalle["stock"] = random.randint(300, 500)
-            detalle["variedad"] = variedad
-            resultado[producto] = detalle
+            resultado.poner(producto, variedad, self.rng.randint(300, 500))
         return resultado
 
     def cambiar_variedades(self):
@@ -159,100 +203,136 @@ class SupermercadoAgent(Agent):
         Cambia a una variedad distinta para cada producto en el inventario,
         conservando el stock, y lo registra en el logger.
         """
-        inventario = self.creencias.obtener("inventario") or {}
-        for producto, datos in list(inventario.items()):
+        inventario = self.creencias.obtener("inventario")
+        cambiados = []
+        for producto in inventario:
             if producto in possible_varieties:
-                current = datos["variedad"]
+                current = inventario.variedad(producto)
                 opciones = [v for v in possible_varieties[producto] if v != current]
-                nueva = random.choice(opciones) if opciones else current
-
-                detalle = predefined_ethics[nueva].copy()
-                detalle["stock"] = datos["stock"]
-                detalle["variedad"] = nueva
+                nueva = self.rng.choice(opciones) if opciones else current
 
-                inventario[producto] = detalle
-                logging.info(
-                    f"[{self.supermercado_id}] Cambió {producto} "
-                    f"de {current} a {nueva}"
+                inventario.cambiar_variedad(producto, nueva)
+                cambiados.append(producto)
+                log_surtido.info(
+                    self.supermercado_id, "Cambió %s de %s a %s", producto, current, nueva
                 )
 
         self.creencias.actualizar("inventario", inventario)
+        self.versiones.marcar(*cambiados)
 
-    class RotarVariedadesPeriodic(PeriodicBehaviour):
+    class RotarVariedadesPeriodic(ComportamientoPeriodico):
         """
         Si ENABLE_VARIETY_CHANGE es True, cada VARIETY_CHANGE_INTERVAL segundos
         invoca cambiar_variedades() para todos los productos.
         """
         async def run(self):
-            await asyncio.to_thread(self.agent.cambiar_variedades)
+            await en_hilo(self.agent.cambiar_variedades)
 
-    class RecibirMensaje(CyclicBehaviour):
-        async def run(self):
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
+    class RecibirMensaje(ManejadorMensajes):
+        """
+        Ventas de clientes, peticiones de oferta y altas/bajas de suscripción.
+        """
+        tipos = ("venta", "Peticion_Cliente", "Suscripcion_Ofertas", "Baja_Suscripcion")
 
-            # Intentar parsear JSON
+        async def manejar(self, msg, data):
             body = msg.body or ""
-            data = None
-            try:
-                data = json.loads(body)
-            except (json.JSONDecodeError, TypeError):
-                data = None
 
             # Venta
-            if isinstance(data, dict) and data.get("tipo") == "venta":
+            if data.get("tipo") == "venta":
                 productos_comprados = data.get("productos_comprados", {})
-                inventario = self.agent.creencias.obtener("inventario") or {}
+                inventario = self.agent.creencias.obtener("inventario")
+                vendidos = []
                 for var, qty in productos_comprados.items():
-                    base = var.split("_")[0]
-                    if base in inventario:
-                        inventario[base]["stock"] = max(
-                            0, inventario[base]["stock"] - qty
-                        )
+                    # Producto de la variedad por el registro de identificadores
+                    base = inventario.vender(var, qty)
+                    if base is not None:
+                        vendidos.append(base)
                 self.agent.creencias.actualizar("inventario", inventario)
+                self.agent.versiones.marcar(*vendidos)
                 # Registrar venta
                 self.agent.ventas_delta.append(data)
+                if len(self.agent.ventas_delta) >= VENTAS_LOTE_TAMANO:
+                    self.agent.lote_ventas_lleno.set()
                 self.agent.ventas_registradas_hist.append(data)
                 self.agent.creencias.actualizar(
                     "ventas", self.agent.ventas_registradas_hist
                 )
-                logging.info(f"[{self.agent.supermercado_id}] Venta: {data}")
+                log_ventas.info(
+                    self.agent.supermercado_id, "Venta de %s: %d variedades",
+                    data.get("cliente_id"), len(productos_comprados),
+                )
                 if ENABLE_VARIETY_CHANGE and len(self.agent.ventas_registradas_hist) % 30 == 0:
                     self.agent.cambiar_variedades()
                 return
 
-            # Consulta de cliente o mensaje no JSON
-            logging.info(f"[{self.agent.supermercado_id}] Mensaje de {msg.sender}: {body}")
+            # Alta/baja en el canal de ofertas
+            if data.get("tipo") == "Baja_Suscripcion":
+                self.agent.suscriptores.discard(str(msg.sender))
+                return
+            if data.get("tipo") == "Suscripcion_Ofertas":
+                self.agent.suscriptores.add(str(msg.sender))
+
+            # Consulta de cliente
+            log_mensajes.info(
+                self.agent.supermercado_id, "Mensaje de %s (%s)", str(msg.sender), data.get("tipo")
+            )
             clientes_cre = self.agent.creencias.obtener("clientes")
             clientes_cre[str(msg.sender)] = body
             self.agent.creencias.actualizar("clientes", clientes_cre)
 
             # Responder oferta
+            version_cliente = data.get("version")
             respuesta = Message(to=str(msg.sender))
-            inventario = self.agent.creencias.obtener("inventario") or {}
-            respuesta.body = json.dumps({
-                "tipo": "Peticion_Cliente",
-                "productos": inventario,
-                "ubicacion": self.agent.ubicacion
-            })
+            # Se responde con la misma codificación que usó el cliente
+            preparar_mensaje(
+                respuesta,
+                self.agent.construir_oferta(version_cliente),
+                codificacion_de(msg)
+            )
             await self.send(respuesta)
-            logging.info(f"[{self.agent.supermercado_id}] Enviado oferta a {msg.sender}.")
+            log_ofertas.info(self.agent.supermercado_id, "Enviado oferta a %s.", str(msg.sender))
 
     class EnviarVentasAlSmart(CyclicBehaviour):
+        """
+        Reenvía las ventas a los supermercados inteligentes en lotes:
+        • Espera a que la cola alcance VENTAS_LOTE_TAMANO o a que pasen
+          VENTAS_LOTE_INTERVALO segundos.
+        • Cada lote lleva la lista de ventas y un resumen agregado
+          { variedad: cantidad } y se codifica una sola vez para todos los peers.
+        """
         async def run(self):
-            await asyncio.sleep(1)
-            while self.agent.ventas_delta:
-                venta = self.agent.ventas_delta.pop(0)
-                for peer in self.agent.smart_super_jids:
+            agent = self.agent
+            try:
+                await asyncio.wait_for(
+                    agent.lote_ventas_lleno.wait(), timeout=VENTAS_LOTE_INTERVALO
+                )
+            except asyncio.TimeoutError:
+                pass
+            agent.lote_ventas_lleno.clear()
+
+            while agent.ventas_delta:
+                n = min(VENTAS_LOTE_TAMANO, len(agent.ventas_delta))
+                lote = [agent.ventas_delta.popleft() for _ in range(n)]
+                resumen = {}
+                for venta in lote:
+                    for var, qty in venta.get("productos_comprados", {}).items():
+                        resumen[var] = resumen.get(var, 0) + qty
+
+                cuerpo, codificacion = codificar({
+                    "tipo": "ventas_super_normal",
+                    "supermercado_id": agent.supermercado_id,
+                    "ventas": lote,
+                    "resumen": resumen
+                })
+                for peer in agent.smart_super_jids:
                     msg = Message(to=str(peer))
-                    msg.body = json.dumps({
-                        "tipo": "ventas_super_normal",
-                        "supermercado_id": self.agent.supermercado_id,
-                        "venta": venta
-                    })
+                    asignar_cuerpo(msg, cuerpo, codificacion, "ventas_super_normal")
                     await self.send(msg)
-                    logging.info(f"[{self.agent.supermercado_id}] Enviando al Smart (ventas_super_normal): {msg.body}")
+                log_ventas.info(
+                    agent.supermercado_id,
+                    "Enviando al Smart (ventas_super_normal): lote de %d ventas, %d variedades",
+                    len(lote), len(resumen),
+                )
 
     async def setup(self):
         logging.info(f"[{self.supermercado_id}] Iniciado en {self.ubicacion}.")
@@ -271,3 +351,7 @@ class SupermercadoAgent(Agent):
             self.add_behaviour(
                 self.RotarVariedadesPeriodic(period=VARIETY_CHANGE_INTERVAL)
             )
+
+        # 5) Publicación de ofertas a suscriptores
+        if MODO_OFERTAS == "suscripcion":
+            self.add_behaviour(PublicarOfertas(period=INTERVALO_PUBLICACION_OFERTAS))
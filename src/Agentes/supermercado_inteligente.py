@@ -7,31 +7,38 @@ Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
 Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
 en la raíz del repositorio.
 """
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
-
 from spade.message import Message
-from ..logger import logging
+from ..logger import log_mensajes, log_metricas, log_ofertas, log_surtido, log_ventas, logging
+from ..reloj import ComportamientoPeriodico, ahora, en_hilo
 from ..config import (
     CERCANO_THRESHOLD,
+    GOSSIP_FANOUT,
+    TOPOLOGIA_METRICAS,
+    INTERVALO_PUBLICACION_OFERTAS,
+    MODO_OFERTAS,
     cambios_productos_log,
     productos_inteligentes_log,
     evaluacion_cambios_log,
     atraccion_eventos_log,
     possible_products,
     possible_varieties,
-    predefined_ethics
 )
-import random
-import datetime
+from ..aleatorio import generador
 from ..BDI.Creencias import Creencias
 from ..BDI.Deseo import Deseo
 from ..BDI.Intenciones import Intencion
-import json, math
+from ..codificacion import codificacion_de, preparar_mensaje
+from ..espacial import indice_supermercados
+from ..inventario import Inventario, producto_de
+from .despacho import AgenteDespacho, ManejadorMensajes
+from .ofertas import PublicarOfertas, VersionesCatalogo
 import copy
-import asyncio
 
-class SupermercadoInteligente(Agent):
+class SupermercadoInteligente(AgenteDespacho):
+    ESTADO = ("rng", "creencias", "productos", "desires", "intencion", "ventas_recibidas",
+              "suscriptores", "versiones", "ronda_metricas", "metricas_conocidas",
+              "catalogos_enviados", "creation_time")
+
     def __init__(
         self,
         jid,
@@ -43,9 +50,10 @@ class SupermercadoInteligente(Agent):
     ):
         super().__init__(jid, password)
         self.supermercado_id = jid
-        self.creation_time = datetime.datetime.now()
+        self.rng = generador(str(jid))
+        self.creation_time = ahora()
         self.modo_adaptativo = modo_adaptativo
-        self.creencias = Creencias()
+        self.creencias = Creencias(self.supermercado_id)
         
         # Inicializar y almacenar ubicación en creencias
         ubic = self._init_ubicacion()
@@ -67,13 +75,24 @@ class SupermercadoInteligente(Agent):
         peers = peer_smart_jids or []
         self.creencias.actualizar("peer_smart_jids", peers)
 
+        # Suscripción de ofertas (MODO_OFERTAS = "suscripcion")
+        self.suscriptores = set()
+        # Versión del catálogo para respuestas "sin cambios" y deltas
+        self.versiones = VersionesCatalogo()
+
+        # Métricas agregadas entre inteligentes
+        self.ronda_metricas = 0
+        self.metricas_conocidas = {}     # { origen: última entrada recibida (sin catálogo) }
+        self.catalogos_enviados = {}     # { (destino, origen): versión de catálogo enviada }
+        self._vecinos = None             # (índice, supermercados a menos de CERCANO_THRESHOLD)
+
     def _init_ubicacion(self):
-        ubic = (random.randint(0,100), random.randint(0,100))
+        ubic = (self.rng.randint(0,100), self.rng.randint(0,100))
         self.creencias.actualizar("ubicacion", ubic)
         return ubic
 
     def _init_inventario(self, productos):
-        inventario = productos or self.generar_criterios_productos()
+        inventario = Inventario.desde_dict(productos) if productos else self.generar_criterios_productos()
         self.productos = inventario
         self.creencias.actualizar("productos", inventario)
 
@@ -95,22 +114,96 @@ class SupermercadoInteligente(Agent):
         else:
             self.desires = desires
 
+    def fila_informe(self):
+        """Fila del supermercado inteligente en la hoja "Agentes" de los resultados."""
+        return {
+            "Tipo": "SupermercadoInteligente",
+            "ID": str(self.jid),
+            "Ubicacion": str(self.creencias.obtener("ubicacion")),
+            "Creencias": str(self.creencias.data),
+            "Deseos": ", ".join(str(d) for d in self.desires),
+            "Hora de creacion": self.creation_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "Ventas recibidas": str(self.ventas_recibidas)
+        }
+
+    def construir_oferta(self, version_cliente=None):
+        """
+        Cuerpo del mensaje de oferta con el catálogo y la ubicación, o solo
+        lo modificado desde ``version_cliente`` si el cliente indica la suya.
+        """
+        return self.versiones.construir_oferta(
+            self.productos,
+            self.creencias.obtener("ubicacion"),
+            version_cliente
+        )
+
+    def entrada_metricas(self):
+        """
+        Resumen compacto de las ventas recientes propias:
+        contador, suma por variedad y versión del catálogo.
+        """
+        recientes = self.creencias.obtener("ventas_recientes") or []
+        por_variedad = {}
+        for venta in recientes:
+            comprados = venta.get("productos") or venta.get("productos_comprados") or {}
+            for var, qty in comprados.items():
+                por_variedad[var] = por_variedad.get(var, 0) + qty
+        return {
+            "origen": str(self.supermercado_id),
+            "ronda": self.ronda_metricas,
+            "num_ventas": len(recientes),
+            "ventas_por_variedad": por_variedad,
+            "version_catalogo": self.versiones.version
+        }
+
+    def agregador_metricas(self):
+        """Agregador de la topología "agregador": el menor JID entre los inteligentes."""
+        peers = self.creencias.obtener("peer_smart_jids") or []
+        return min([str(self.supermercado_id)] + [str(p) for p in peers])
+
+    def entrada_para(self, destino, entrada):
+        """
+        Añade el catálogo a ``entrada`` solo si ``destino`` todavía no ha
+        recibido de este agente esa versión del catálogo de su origen.
+        """
+        origen = entrada["origen"]
+        version = entrada["version_catalogo"]
+        if self.catalogos_enviados.get((destino, origen)) == version:
+            return entrada
+        if origen == str(self.supermercado_id):
+            catalogo = self.creencias.obtener("productos")
+        else:
+            catalogo = self.creencias.obtener(f"catalogo_peer_{origen}")
+        if catalogo is None:
+            return entrada
+        self.catalogos_enviados[(destino, origen)] = version
+        return dict(entrada, catalogo=catalogo)
+
+    def vecinos(self):
+        """
+        IDs de los supermercados normales a menos de CERCANO_THRESHOLD, con
+        una consulta por radio al índice espacial (se calcula una vez). Con
+        el valor por defecto (200, más que la diagonal del mapa) lo son todos.
+        """
+        indice = indice_supermercados()
+        if self._vecinos is None or self._vecinos[0] is not indice:
+            cercanos = indice.en_radio(self.creencias.obtener("ubicacion"), CERCANO_THRESHOLD)
+            self._vecinos = (indice, set(cercanos))
+        return self._vecinos[1]
+
     def generar_criterios_productos(self):
         """
         Crea para cada producto un criterio ético aleatorio y stock inicial.
-        Devuelve un dict:
+        Devuelve un Inventario, que se consulta como:
           { producto: { 'variedad': ..., 'stock': ..., <criterios éticos> } }
         """
-        resultado = {}
+        resultado = Inventario()
         for producto in possible_products:
             variedad = (
-                random.choice(possible_varieties[producto])
+                self.rng.choice(possible_varieties[producto])
                 if producto in possible_varieties else producto
             )
-            detalle = predefined_ethics[variedad].copy()
-            detalle["stock"] = random.randint(300, 500)
-            detalle["variedad"] = variedad
-            resultado[producto] = detalle
+            resultado.poner(producto, variedad, self.rng.randint(300, 500))
         return resultado
 
     def rotar_surtido(self):
@@ -118,66 +211,90 @@ class SupermercadoInteligente(Agent):
         Rota aleatoriamente la variedad de cada producto,
         conservando el stock actual.
         """
-        for prod, datos in list(self.productos.items()):
+        rotados = []
+        for prod in self.productos:
             if prod in possible_varieties:
-                current = datos["variedad"]
+                current = self.productos.variedad(prod)
                 opciones = [v for v in possible_varieties[prod] if v != current]
-                nueva = random.choice(opciones) if opciones else current
-                nuevo_detalle = predefined_ethics[nueva].copy()
-                nuevo_detalle["stock"] = datos["stock"]
-                nuevo_detalle["variedad"] = nueva
-                self.productos[prod] = nuevo_detalle
-                logging.info(f"[{self.supermercado_id}] Rotó {prod}: {current} -> {nueva}")
-
-    class RecibirMensaje(CyclicBehaviour):
+                nueva = self.rng.choice(opciones) if opciones else current
+                self.productos.cambiar_variedad(prod, nueva)
+                rotados.append(prod)
+                log_surtido.info(self.supermercado_id, "Rotó %s: %s -> %s", prod, current, nueva)
+        self.versiones.marcar(*rotados)
+
+    class RecibirMensaje(ManejadorMensajes):
         """
         Ciclo permanente de escucha en SupermercadoInteligente:
         • Mensajes de ventas de supermercados normales (tipo "ventas_super_normal").
         • Mensajes de petición de cliente (tipo "Peticion_Cliente").
+        • Ventas de clientes y altas/bajas de suscripción.
         """
-        async def run(self):
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
-
-            # Intentar parsear JSON
-            try:
-                data = json.loads(msg.body)
-            except (json.JSONDecodeError, TypeError):
-                data = {}
-            if data.get("tipo") == "metricas_smart":
-                return
+        tipos = (
+            "ventas_super_normal",
+            "Peticion_Cliente",
+            "Suscripcion_Ofertas",
+            "Baja_Suscripcion",
+            "venta",
+        )
+
+        async def manejar(self, msg, data):
             # -- Venta de supermercado normal --
             if data.get("tipo") == "ventas_super_normal":
                 sender = str(msg.sender).split("/")[-1]
-                venta = data.get("venta") or data.get("productos_comprados")
-                wrapper = {"supermercado_id": sender, "ventas": [venta]}
+                if "ventas" in data:
+                    # Lote completo: se incorpora en un solo paso con su resumen
+                    ventas = data["ventas"]
+                    wrapper = {
+                        "supermercado_id": sender,
+                        "ventas": ventas,
+                        "resumen": data.get("resumen", {})
+                    }
+                else:
+                    venta = data.get("venta") or data.get("productos_comprados")
+                    ventas = [venta]
+                    wrapper = {"supermercado_id": sender, "ventas": ventas}
                 # Actualizar listas y creencias
                 self.agent.ventas_recibidas.append(wrapper)
                 recientes = self.agent.creencias.obtener("ventas_recientes") or []
-                recientes.append(venta)
+                recientes.extend(ventas)
 
                 self.agent.creencias.actualizar("ventas_recibidas", self.agent.ventas_recibidas)
-                logging.info(f"[{self.agent.supermercado_id}] Venta normal recibida de {sender}: {venta}")
+                log_ventas.info(
+                    self.agent.supermercado_id, "Ventas normales recibidas de %s: %d ventas",
+                    sender, len(ventas),
+                )
+                return
+
+            # -- Alta/baja en el canal de ofertas --
+            if data.get("tipo") == "Baja_Suscripcion":
+                self.agent.suscriptores.discard(str(msg.sender))
                 return
+            if data.get("tipo") == "Suscripcion_Ofertas":
+                self.agent.suscriptores.add(str(msg.sender))
 
-            # -- Petición de cliente --
-            if data.get("tipo") == "Peticion_Cliente":
+            # -- Petición de cliente (o alta de suscripción: se envía la oferta inicial) --
+            if data.get("tipo") in ("Peticion_Cliente", "Suscripcion_Ofertas"):
                 sender = str(msg.sender)
-                logging.info(f"[{self.agent.supermercado_id}] Peticion_Cliente recibida de {sender}: {data}")
+                log_mensajes.info(
+                    self.agent.supermercado_id, "Peticion_Cliente recibida de %s (versión %s)",
+                    sender, data.get("version"),
+                )
                 clientes = self.agent.creencias.obtener("clientes") or {}
-                clientes[sender] = {"request": data.get("payload", msg.body), "timestamp": datetime.datetime.now()}
+                clientes[sender] = {"request": data.get("payload", msg.body), "timestamp": ahora()}
                 self.agent.creencias.actualizar("clientes", clientes)
 
                 # Enviar oferta al cliente
                 resp = Message(to=sender)
-                resp.body = json.dumps({
-                    "tipo": "Peticion_Cliente",
-                    "productos": self.agent.productos,
-                    "ubicacion": self.agent.creencias.obtener("ubicacion")
-                })
+                # Se responde con la misma codificación que usó el cliente
+                preparar_mensaje(
+                    resp,
+                    self.agent.construir_oferta(data.get("version")),
+                    codificacion_de(msg)
+                )
                 await self.send(resp)
-                logging.info(f"[{self.agent.supermercado_id}] Oferta enviada a {sender} (Peticion_Cliente).")
+                log_ofertas.info(
+                    self.agent.supermercado_id, "Oferta enviada a %s (Peticion_Cliente).", sender
+                )
                 return
             elif data.get("tipo") == "venta":
                 # Extraer los datos de la venta
@@ -192,63 +309,88 @@ class SupermercadoInteligente(Agent):
                 recientes.append(venta)
                 self.agent.creencias.actualizar("ventas_recientes", recientes)
 
-                logging.info(
-                    f"[{self.agent.supermercado_id}] Venta inteligente recibida de "
-                    f"{venta['cliente_id']}: {venta['productos']}"
+                log_ventas.info(
+                    self.agent.supermercado_id, "Venta inteligente recibida de %s: %d variedades",
+                    venta["cliente_id"], len(venta["productos"]),
                 )
                 return
-            # -- Otro mensaje --
-            logging.info(f"[{self.agent.supermercado_id}] Mensaje desconocido de {msg.sender}: {msg.body}")
 
-    class EnviarMetricasSmart(PeriodicBehaviour):
+    class EnviarMetricasSmart(ComportamientoPeriodico):
         """
         Ciclo periódico de envío de métricas desde SupermercadoInteligente a sus peers:
-        • Cada vez que se ejecuta, obtiene métricas locales (ventas recientes, max ventas).
-        • Envía un mensaje a cada JID en peer_smart_jids con los datos actuales.
+        • Cada vez que se ejecuta, resume sus ventas recientes en una entrada
+          compacta (contador, suma por variedad, versión del catálogo).
+        • El catálogo solo viaja cuando el destino no conoce esa versión.
+        • Los destinos dependen de TOPOLOGIA_METRICAS:
+          - "todos": la entrada propia a cada peer (S² mensajes por ronda).
+          - "agregador": la entrada propia al agregador, que reenvía la
+            tabla combinada a todos (≈ 2·S mensajes por ronda).
+          - "gossip": todas las entradas conocidas a GOSSIP_FANOUT peers
+            aleatorios (S·fanout mensajes por ronda).
         """
         def __init__(self, period):
             super().__init__(period=period)
 
         async def run(self):
             agent = self.agent
-            datos = {
-                "tipo": "metricas_smart",
-                "ventas_recientes": agent.creencias.obtener("ventas_recientes") or [],
-                "catalogo": agent.creencias.obtener("productos")
-            }
-            peers = agent.creencias.obtener("peer_smart_jids") or []
-            for peer in peers:
-                msg = Message(to=str(peer))
-                msg.body = json.dumps(datos)
+            agent.ronda_metricas += 1
+            propia = agent.entrada_metricas()
+            yo = propia["origen"]
+            agent.metricas_conocidas[yo] = propia
+            peers = [str(p) for p in agent.creencias.obtener("peer_smart_jids") or []]
+
+            if TOPOLOGIA_METRICAS == "agregador":
+                agregador = agent.agregador_metricas()
+                if yo == agregador:
+                    destinos, entradas = peers, list(agent.metricas_conocidas.values())
+                else:
+                    destinos, entradas = [agregador], [propia]
+            elif TOPOLOGIA_METRICAS == "gossip":
+                destinos = agent.rng.sample(peers, min(GOSSIP_FANOUT, len(peers)))
+                entradas = list(agent.metricas_conocidas.values())
+            else:
+                destinos, entradas = peers, [propia]
+
+            for peer in destinos:
+                msg = Message(to=peer)
+                preparar_mensaje(msg, {
+                    "tipo": "metricas_smart",
+                    "metricas": [
+                        agent.entrada_para(peer, e) for e in entradas if e["origen"] != peer
+                    ]
+                })
                 await self.send(msg)
-                logging.info(f"[{agent.supermercado_id}] Métricas enviadas a {peer}")
+                log_metricas.info(
+                    agent.supermercado_id, "Métricas enviadas a %s (%d entradas)", str(peer), len(entradas)
+                )
 
-    class RecibirMetricasSmart(CyclicBehaviour):
+    class RecibirMetricasSmart(ManejadorMensajes):
         """
         Ciclo permanente de recepción de métricas de peers de SupermercadoInteligente:
-        • Espera mensajes de tipo "metricas_smart".
+        • Recibe los mensajes de tipo "metricas_smart".
         • Al recibir, actualiza las creencias con las métricas del peer.
         """
-        async def run(self):
-            msg = await self.receive(timeout=5)
-            if not msg:
-                return
-            try:
-                data = json.loads(msg.body)
-            except json.JSONDecodeError:
-                return
-            if data.get("tipo") != "metricas_smart":
-                return
-            peer = str(msg.sender).split("/")[0]
-            ventas = data.get("ventas_recientes", [])
-            cat = data.get("catalogo")
+        tipos = ("metricas_smart",)
+
+        async def manejar(self, msg, data):
             agent = self.agent
-            agent.creencias.actualizar(f"ventas_per_{peer}", ventas)
-            if cat is not None:
-                agent.creencias.actualizar(f"catalogo_peer_{peer}", cat)
-            logging.info(f"[{agent.supermercado_id}] Métricas y catálogo recibidos de {peer}")
+            yo = str(agent.supermercado_id)
+            for entrada in data.get("metricas", []):
+                peer = entrada["origen"]
+                previa = agent.metricas_conocidas.get(peer)
+                if peer == yo or (previa and previa["ronda"] >= entrada["ronda"]):
+                    continue
+                cat = entrada.pop("catalogo", None)
+                agent.metricas_conocidas[peer] = entrada
+                agent.creencias.actualizar(f"ventas_per_{peer}", entrada["num_ventas"])
+                if cat is not None:
+                    agent.creencias.actualizar(f"catalogo_peer_{peer}", Inventario.desde_dict(cat))
+                log_metricas.info(
+                    agent.supermercado_id, "Métricas recibidas de %s (ronda %d, %d ventas)",
+                    peer, entrada["ronda"], entrada["num_ventas"],
+                )
 
-    class BDIBehaviour(PeriodicBehaviour):
+    class BDIBehaviour(ComportamientoPeriodico):
         """
         Ciclo BDI principal para SupermercadoInteligente:
         1) CAPTAR Y ACTUALIZAR CRENCIAS
@@ -277,8 +419,8 @@ class SupermercadoInteligente(Agent):
                 sales_counts = {agent.supermercado_id: ventas_propias}
                 peers = agent.creencias.obtener("peer_smart_jids") or []
                 for peer in peers:
-                    ventas_peer = agent.creencias.obtener(f"ventas_per_{peer}") or []
-                    sales_counts[peer] = len(ventas_peer)
+                    # Las métricas de peers ya llegan como contador de ventas recientes
+                    sales_counts[peer] = agent.creencias.obtener(f"ventas_per_{peer}") or 0
 
                 # (b) Determinar quién es el “mejor vendedor”
                 best_jid, best_count = max(sales_counts.items(), key=lambda kv: kv[1])
@@ -290,16 +432,22 @@ class SupermercadoInteligente(Agent):
                             agent.intencion = Intencion(deseo, "adaptarse_catalogo")
                             break
 
+                    # El catálogo adoptado pasa a ser el que se oferta (agent.productos
+                    # y la creencia son el mismo Inventario); sin catálogo del peer
+                    # todavía, se mantiene el propio
                     peer_catalog = agent.creencias.obtener(f"catalogo_peer_{best_jid}") or {}
-                    agent.creencias.actualizar("productos", copy.deepcopy(peer_catalog))
-                    agent.creencias.actualizar("catalogo_exitoso", copy.deepcopy(peer_catalog))
-                    logging.info(
-                        f"[{agent.supermercado_id}] Adopta catálogo de {best_jid} "
-                        f"({best_count} vs {ventas_propias})"
+                    if peer_catalog:
+                        agent.productos = Inventario.desde_dict(peer_catalog)
+                        agent.creencias.actualizar("productos", agent.productos)
+                        agent.versiones.marcar(*peer_catalog)
+                        agent.creencias.actualizar("catalogo_exitoso", Inventario.desde_dict(peer_catalog))
+                    log_surtido.info(
+                        agent.supermercado_id, "Adopta catálogo de %s (%d vs %d)",
+                        best_jid, best_count, ventas_propias,
                     )
 
                     entry = {
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
                         "agente": agent.supermercado_id,
                         "ventas_propias": ventas_propias,
                         "ventas_origen": best_count,
@@ -314,11 +462,11 @@ class SupermercadoInteligente(Agent):
                             agent.intencion = Intencion(deseo, "rota_surtido")
                             break
 
-                    await asyncio.to_thread(agent.rotar_surtido)
-                    logging.info(f"[{agent.supermercado_id}] Ninguna venta; rota surtido")
+                    await en_hilo(agent.rotar_surtido)
+                    log_surtido.info(agent.supermercado_id, "Ninguna venta; rota surtido")
 
                     entry = {
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
                         "agente": agent.supermercado_id,
                         "ventas_propias": ventas_propias,
                         "ventas_origen": 0,
@@ -336,11 +484,11 @@ class SupermercadoInteligente(Agent):
                     maxv = agent.creencias.obtener("max_ventas") or 0
                     if ventas_propias > maxv:
                         agent.creencias.actualizar("max_ventas", ventas_propias)
-                        agent.creencias.actualizar("catalogo_exitoso", copy.deepcopy(agent.creencias.obtener("productos")))
-                        logging.info(f"[{agent.supermercado_id}] Mantiene catálogo propio ({ventas_propias})")
+                        agent.creencias.actualizar("catalogo_exitoso", Inventario.desde_dict(agent.creencias.obtener("productos")))
+                        log_surtido.info(agent.supermercado_id, "Mantiene catálogo propio (%d)", ventas_propias)
 
                         entry = {
-                            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
                             "agente": agent.supermercado_id,
                             "ventas_propias": ventas_propias,
                             "ventas_origen": 0,
@@ -358,42 +506,46 @@ class SupermercadoInteligente(Agent):
                 # ---------------------------------------------
                 nearby_sales = {}
                 ventas_recibidas = agent.creencias.obtener("ventas_recibidas") or []
-                ubicaciones = agent.creencias.obtener("supermercados_ubicaciones") or {}
-                mi_ubic = agent.creencias.obtener("ubicacion")
+                vecinos = agent.vecinos()
                 for info in ventas_recibidas:
-                    sid = info["supermercado_id"]
-                    loc = ubicaciones.get(sid)
-                    if loc and math.dist(mi_ubic, loc) <= CERCANO_THRESHOLD:
-                        for v in info["ventas"]:
-                            for var, qty in v.get("productos_comprados", {}).items():
-                                base = var.split("_")[0]
-                                nearby_sales.setdefault(base, {}).setdefault(var, 0)
-                                nearby_sales[base][var] += qty
+                    if info["supermercado_id"] in vecinos:
+                        # Los lotes traen el resumen por variedad ya agregado
+                        if "resumen" in info:
+                            totales = info["resumen"].items()
+                        else:
+                            totales = (
+                                item
+                                for v in info["ventas"]
+                                for item in v.get("productos_comprados", {}).items()
+                            )
+                        for var, qty in totales:
+                            base = producto_de(var)
+                            if base is None:
+                                continue
+                            nearby_sales.setdefault(base, {}).setdefault(var, 0)
+                            nearby_sales[base][var] += qty
 
                 # ---------------------------------------------
                 # FASE 2: DELIBERACIÓN (se forma el Deseo “adaptarse_supermercados” si hay cambios)
                 # ---------------------------------------------
-                productos = agent.creencias.obtener("productos") or {}
+                productos = agent.creencias.obtener("productos")
                 cambios = []
-                for prod, datos in productos.items():
-                    actual = datos["variedad"]
+                for prod in productos:
+                    actual = productos.variedad(prod)
                     best_var, best_qty = actual, nearby_sales.get(prod, {}).get(actual, 0)
                     for var, qty in nearby_sales.get(prod, {}).items():
                         if qty > best_qty:
                             best_var, best_qty = var, qty
                     if best_var != actual:
-                        old_stock = datos["stock"]
-                        nueva_info = predefined_ethics[best_var].copy()
-                        nueva_info["stock"] = old_stock
-                        nueva_info["variedad"] = best_var
-                        productos[prod] = nueva_info
+                        productos.cambiar_variedad(prod, best_var)
                         cambios.append((prod, actual, best_var, agent.supermercado_id))
-                        logging.info(
-                            f"[{agent.supermercado_id}] {prod}: {actual} → {best_var} "
-                            f"(ventas={best_qty})"
+                        log_surtido.info(
+                            agent.supermercado_id, "%s: %s → %s (ventas=%s)",
+                            prod, actual, best_var, best_qty,
                         )
 
                 if cambios:
+                    agent.versiones.marcar(*(c[0] for c in cambios))
                     for deseo in agent.desires:
                         if deseo.nombre == "adaptarse_supermercados":
                             deseo.payload = {"cambios": cambios}
@@ -402,20 +554,22 @@ class SupermercadoInteligente(Agent):
 
                     cambios_productos_log.extend(cambios)
                     productos_inteligentes_log.append({
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
                         "supermercado_id": agent.supermercado_id,
-                        "productos": copy.deepcopy(productos)
+                        "productos": productos.como_dict()
                     })
 
                     evaluacion_entry = {
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
                         "supermercado_id": agent.supermercado_id,
                         "ventas_evaluadas": copy.deepcopy(ventas_recibidas),
                         "nearby_sales": copy.deepcopy(nearby_sales),
                         "cambios": copy.deepcopy(cambios)
                     }
                     evaluacion_cambios_log.append(evaluacion_entry)
-                    logging.info(f"[{agent.supermercado_id}] Evaluación de cambios registrada: {evaluacion_entry}")
+                    log_surtido.info(
+                        agent.supermercado_id, "Evaluación de cambios registrada: %d cambios", len(cambios)
+                    )
 
                 agent.creencias.actualizar("productos", productos)
                 agent.creencias.actualizar("ventas_previas", len(recientes))
@@ -429,3 +583,6 @@ class SupermercadoInteligente(Agent):
         self.add_behaviour(self.RecibirMetricasSmart())
         # BDI principal
         self.add_behaviour(self.BDIBehaviour(period=10, modo=self.modo_adaptativo))
+        # Publicación de ofertas a suscriptores
+        if MODO_OFERTAS == "suscripcion":
+            self.add_behaviour(PublicarOfertas(period=INTERVALO_PUBLICACION_OFERTAS))
@@ -7,15 +7,120 @@ Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
 Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
 en la raíz del repositorio.
 """
+from .. import config
+from ..logger import logging
+from ..reloj import ahora
+
+_ESCALARES = (type(None), bool, int, float, str)
+_avisado_lleno = False
+
+
+def resumir(valor):
+    """
+    Resumen de un valor de creencia para el diario, sin copiarlo: los
+    escalares tal cual y de los contenedores solo el tipo y el tamaño.
+    """
+    if isinstance(valor, _ESCALARES):
+        return valor
+    if isinstance(valor, tuple) and len(valor) <= 4:
+        return str(valor)
+    if hasattr(valor, "__len__"):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+
+def anotar_cambio(agente, clave, version, valor):
+    """
+    Anota un cambio de creencia en historial_creencias (diario activado
+    con DIARIO_CREENCIAS), muestreado y con un máximo de entradas.
+    """
+    global _avisado_lleno
+    muestreo = config.DIARIO_CREENCIAS_MUESTREO or 1
+    if (version - 1) % muestreo:
+        return
+    maximo = config.DIARIO_CREENCIAS_MAXIMO
+    historial = config.historial_creencias
+    if maximo is not None and len(historial) >= maximo:
+        if not _avisado_lleno:
+            _avisado_lleno = True
+            logging.warning(
+                f"Diario de creencias lleno ({maximo} entradas): no se anotan más cambios"
+            )
+        return
+    historial.append({
+        "timestamp": ahora().strftime("%Y-%m-%d %H:%M:%S"),
+        "agente": agente,
+        "creencia": clave,
+        "version": version,
+        "valor": resumir(valor),
+    })
+
+
 class Creencias:
-    def __init__(self):
+    """
+    Base de creencias de un agente: { clave: valor } con un contador de
+    versión por clave.
+
+    • ``version(clave)`` cambia cada vez que se actualiza la clave: un
+      behaviour puede guardar la versión de sus entradas y saltarse el
+      trabajo si no han cambiado.
+    • ``suscribir(clave, funcion)`` llama a
+      ``funcion(clave, valor, version, claves)`` en cada cambio de ``clave``
+      (None: de cualquier clave), sin que nadie tenga que consultar.
+      ``claves`` son las entradas del valor que cambiaron en sitio (las
+      que se pasan a ``tocar``), o None si se guardó un valor entero.
+    • Con DIARIO_CREENCIAS, cada cambio se anota en historial_creencias.
+
+    Un valor mutable modificado en sitio cuenta como cambio al volver a
+    guardarlo con ``actualizar`` o al llamar a ``tocar``.
+    """
+
+    def __init__(self, propietario=None):
         self.data = {}
+        self.versiones = {}
+        self.suscriptores = {}
+        self.propietario = propietario
 
     def actualizar(self, key, value):
         self.data[key] = value
+        self._cambio(key, value, None)
+
+    def tocar(self, key, *claves):
+        """
+        El valor de ``key`` se ha modificado en sitio; ``claves``, qué
+        entradas suyas (ninguna si solo cambian datos que no las afectan).
+        """
+        self._cambio(key, self.data.get(key), claves)
+
+    def _cambio(self, key, value, claves):
+        version = self.versiones.get(key, 0) + 1
+        self.versiones[key] = version
+        if config.DIARIO_CREENCIAS:
+            anotar_cambio(self.propietario, key, version, value)
+        if self.suscriptores:
+            for funcion in self.suscriptores.get(key, ()) + self.suscriptores.get(None, ()):
+                funcion(key, value, version, claves)
 
     def obtener(self, key):
         return self.data.get(key, None)
 
+    def version(self, key):
+        """Versión de ``key`` (0 si nunca se ha guardado)."""
+        return self.versiones.get(key, 0)
+
+    def suscribir(self, key, funcion):
+        self.suscriptores[key] = self.suscriptores.get(key, ()) + (funcion,)
+
+    def cancelar(self, key, funcion):
+        self.suscriptores[key] = tuple(
+            f for f in self.suscriptores.get(key, ()) if f != funcion
+        )
+
+    def __getstate__(self):
+        # Las suscripciones son de agentes vivos: no van en las instantáneas
+        estado = self.__dict__.copy()
+        estado["suscriptores"] = {}
+        return estado
+
     def __repr__(self):
         return str(self.data)
@@ -0,0 +1,107 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import traceback
+
+from ..logger import logging
+from .Intenciones import Intencion
+
+
+class BibliotecaPlanes:
+    """
+    Biblioteca de planes de un tipo de agente, con dos tablas de despacho:
+    • opciones: { nombre del deseo: funcion(agente, deseo, contexto) } que
+      devuelve el nombre del plan si el deseo está insatisfecho (o None).
+    • planes: { nombre del plan: corrutina(comportamiento, intencion) }.
+
+    Los planes se ejecutan dentro del behaviour del ciclo BDI
+    (``comportamiento``, que aporta ``agent`` y ``send``), sin crear un
+    behaviour por ciclo. ``ejecutar`` lleva la cuenta de cada plan
+    (iniciados, terminados, fallidos) y un fallo no detiene el ciclo.
+    """
+
+    def __init__(self):
+        self.opciones = {}
+        self.planes = {}
+
+    def opcion(self, deseo):
+        """Decorador: registra la función de aplicabilidad de ``deseo``."""
+        def registrar(funcion):
+            self.opciones[deseo] = funcion
+            return funcion
+        return registrar
+
+    def plan(self, nombre):
+        """Decorador: registra el cuerpo del plan ``nombre``."""
+        def registrar(cuerpo):
+            self.planes[nombre] = cuerpo
+            return cuerpo
+        return registrar
+
+    def deliberar(self, agente, deseos, contexto):
+        """
+        Recorre ``deseos`` en orden de prioridad y devuelve la Intención del
+        primero insatisfecho, o None si ninguno lo está.
+        """
+        for deseo in deseos:
+            opcion = self.opciones.get(deseo.nombre)
+            if opcion is None:
+                continue
+            plan = opcion(agente, deseo, contexto)
+            if plan is not None:
+                return Intencion(deseo, plan)
+        return None
+
+    async def ejecutar(self, comportamiento, intencion, cuentas):
+        """
+        Ejecuta el plan de ``intencion`` y anota su ciclo de vida en
+        ``cuentas`` (ver CuentasPlanes). Retorna True si terminó sin error.
+        """
+        cuentas.iniciar(intencion.plan)
+        try:
+            await self.planes[intencion.plan](comportamiento, intencion)
+        except Exception as exc:
+            cuentas.terminar(intencion.plan, fallido=True)
+            logging.error(f"Plan {intencion.plan} fallido: {exc!r}\n{traceback.format_exc()}")
+            return False
+        cuentas.terminar(intencion.plan)
+        return True
+
+
+class CuentasPlanes:
+    """
+    Ciclo de vida de los planes de un agente: { plan: [iniciados,
+    terminados, fallidos] } y cuántos hay en curso.
+    """
+
+    def __init__(self):
+        self.planes = {}
+        self.en_curso = 0
+
+    def iniciar(self, plan):
+        self.planes.setdefault(plan, [0, 0, 0])[0] += 1
+        self.en_curso += 1
+
+    def terminar(self, plan, fallido=False):
+        self.planes[plan][2 if fallido else 1] += 1
+        self.en_curso -= 1
+
+    def resumen(self):
+        """{ plan: (iniciados, terminados, fallidos) } para el informe final."""
+        return {plan: tuple(cuentas) for plan, cuentas in self.planes.items()}
+
+
+def sumar_cuentas(resumenes):
+    """Suma varios ``CuentasPlanes.resumen()``: { plan: (iniciados, terminados, fallidos) }."""
+    total = {}
+    for resumen in resumenes:
+        for plan, cuentas in resumen.items():
+            previas = total.get(plan, (0, 0, 0))
+            total[plan] = tuple(a + b for a, b in zip(previas, cuentas))
+    return total
@@ -0,0 +1,40 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import random
+
+from . import config
+
+# -----------------------------------------------------------------------------
+# Generadores aleatorios por agente
+# -----------------------------------------------------------------------------
+# Cada agente tiene su propio random.Random sembrado con (SEMILLA, nombre del
+# agente). Así sus sorteos no dependen del orden en que el bucle de eventos
+# ejecute a los demás agentes, y la misma semilla reproduce la misma población
+# (ubicaciones, preferencias, catálogos…) en cualquier proceso.
+
+
+def fijar_semilla(semilla=None):
+    """
+    Fija la semilla de la simulación (config.SEMILLA). Si no se indica ninguna
+    ni hay una en config, se elige al azar; se devuelve para poder registrarla.
+    """
+    if semilla is None:
+        semilla = config.SEMILLA
+    if semilla is None:
+        semilla = random.SystemRandom().randrange(2 ** 32)
+    config.SEMILLA = semilla
+    return semilla
+
+
+def generador(nombre):
+    """random.Random propio del agente ``nombre`` para la semilla actual."""
+    if config.SEMILLA is None:
+        return random.Random()
+    return random.Random(f"{config.SEMILLA}:{nombre}")
@@ -0,0 +1,200 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+
+Barrido de parámetros: ejecuta en paralelo una simulación por combinación de
+parámetros y réplica, y consolida sus indicadores en una tabla.
+
+Uso (desde la raíz del repositorio):
+    python -m src.barrido -p WEIGHT_DISTANCE=0,0.5,1 -p adaptativo=atraccion_clientes,reevaluacion_productos \\
+        --replicas 3 --procesos 8
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+# Este módulo no importa nada del paquete a nivel de módulo: cada escenario
+# corre en un proceso nuevo que primero cambia de directorio (log.txt,
+# capturas y CSV se crean en el directorio actual al importar main/logger) y
+# aplica sus parámetros antes de importar los agentes.
+
+
+def _valor(texto):
+    """Interpreta un valor de la línea de órdenes (número, booleano o texto)."""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def combinaciones(rejilla):
+    """Producto cartesiano { nombre: [valores] } -> lista de dicts."""
+    nombres = list(rejilla)
+    return [dict(zip(nombres, valores)) for valores in itertools.product(*rejilla.values())]
+
+
+def indicadores(decisiones, inteligentes, supermercados):
+    """
+    KPIs de una simulación a partir de su registro de decisiones.
+
+    Retorna:
+        tuple: (dict de indicadores, { supermercado: compras })
+    """
+    compras = [d for d in decisiones if d["accion"] in ("compra", "compra_indispensable")]
+    inteligentes = set(inteligentes)
+
+    def cuota_inteligentes(ronda):
+        clientes = {d["cliente_id"] for d in compras if d["numero_compra"] == ronda}
+        en_smart = {
+            d["cliente_id"] for d in compras
+            if d["numero_compra"] == ronda and d["supermercado_jid"] in inteligentes
+        }
+        return len(en_smart) / len(clientes) if clientes else 0.0
+
+    ultima = max((d["numero_compra"] for d in compras), default=1)
+    por_supermercado = {jid: 0 for jid in list(inteligentes) + list(supermercados)}
+    for d in compras:
+        por_supermercado[d["supermercado_jid"]] = por_supermercado.get(d["supermercado_jid"], 0) + 1
+
+    return {
+        "compras": len(compras),
+        "ultima_ronda": ultima,
+        "cuota_smart_ronda1": cuota_inteligentes(1),
+        "cuota_smart_final": cuota_inteligentes(ultima),
+        "compras_por_supermercado": len(compras) / max(len(por_supermercado), 1),
+        "compras_smart": sum(por_supermercado[j] for j in inteligentes),
+    }, por_supermercado
+
+
+def _ejecutar_escenario(escenario, replica, parametros, semilla, directorio, virtual):
+    """Ejecuta una simulación aislada (en su propio proceso)."""
+    os.makedirs(directorio, exist_ok=True)
+    os.chdir(directorio)
+
+    from . import config
+    from .particiones import aplicar_config
+    aplicar_config({**parametros, "SEMILLA": semilla})
+    from .main import main
+    from .reloj import ejecutar
+
+    inicio = time.perf_counter()
+    resultado = ejecutar(main("local"), virtual=virtual)
+    duracion = time.perf_counter() - inicio
+
+    kpis, por_supermercado = indicadores(
+        config.decisiones, resultado["inteligentes"], resultado["supermercados"]
+    )
+    fila = {"escenario": escenario, "replica": replica, "semilla": semilla, **parametros}
+    fila.update(kpis)
+    # Peticiones de oferta ahorradas y compras fuera de la lista corta
+    for clave, valor in (resultado["sondeo"] or {}).items():
+        fila[f"sondeo_{clave}"] = valor
+    fila["duracion_s"] = round(duracion, 2)
+    ventas = [
+        {"escenario": escenario, "replica": replica, "supermercado": jid, "compras": n}
+        for jid, n in por_supermercado.items()
+    ]
+    return fila, ventas
+
+
+def barrer(rejilla, replicas=1, procesos=None, semilla=0, salida=None, virtual=True):
+    """
+    Ejecuta todas las combinaciones de ``rejilla`` × ``replicas`` en un pool
+    de ``procesos`` procesos y escribe en ``salida``:
+    • resumen.csv: una fila por simulación con sus indicadores.
+    • resumen_escenarios.csv: media y desviación por escenario.
+    • compras_por_supermercado.csv: compras de cada supermercado.
+    """
+    from .logger import logging
+
+    salida = os.path.abspath(salida or os.path.join(
+        "barridos", datetime.now().strftime("%Y%m%d_%H%M%S")
+    ))
+    os.makedirs(salida, exist_ok=True)
+    escenarios = combinaciones(rejilla)
+    procesos = procesos or os.cpu_count()
+    logging.info(
+        f"Barrido: {len(escenarios)} escenarios × {replicas} réplicas en {procesos} procesos -> {salida}"
+    )
+
+    filas, ventas = [], []
+    # Un proceso nuevo por simulación: las listas globales de config empiezan vacías
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as pool:
+        futuros = {}
+        for e, parametros in enumerate(escenarios, start=1):
+            for r in range(1, replicas + 1):
+                directorio = os.path.join(salida, f"escenario_{e:03d}", f"replica_{r:02d}")
+                futuro = pool.submit(
+                    _ejecutar_escenario, e, r, parametros,
+                    semilla + 1000 * e + r, directorio, virtual,
+                )
+                futuros[futuro] = (e, r)
+        for futuro in as_completed(futuros):
+            e, r = futuros[futuro]
+            try:
+                fila, ventas_escenario = futuro.result()
+            except Exception as exc:
+                logging.error(f"Escenario {e} réplica {r} falló: {exc!r}")
+                continue
+            filas.append(fila)
+            ventas.extend(ventas_escenario)
+            logging.info(f"Escenario {e} réplica {r} terminado en {fila['duracion_s']} s")
+
+    df = pd.DataFrame(filas).sort_values(["escenario", "replica"])
+    df.to_csv(os.path.join(salida, "resumen.csv"), index=False)
+    pd.DataFrame(ventas).to_csv(os.path.join(salida, "compras_por_supermercado.csv"), index=False)
+
+    claves = ["escenario"] + list(rejilla)
+    metricas = ["cuota_smart_ronda1", "cuota_smart_final", "compras_por_supermercado", "duracion_s"]
+    if not df.empty:
+        agregado = df.groupby(claves, dropna=False)[metricas].agg(["mean", "std"])
+        agregado.columns = [f"{m}_{f}" for m, f in agregado.columns]
+        agregado.reset_index().to_csv(os.path.join(salida, "resumen_escenarios.csv"), index=False)
+    logging.info(f"Resumen del barrido guardado en: {salida}")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de la simulación")
+    parser.add_argument(
+        "-p", "--parametro",
+        action="append",
+        default=[],
+        metavar="NOMBRE=v1,v2,...",
+        help="Parámetro de config y valores a probar (se puede repetir)",
+    )
+    parser.add_argument("--replicas", type=int, default=1, help="Réplicas por escenario")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, núcleos)")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla base")
+    parser.add_argument("--salida", default=None, help="Directorio de resultados")
+    parser.add_argument(
+        "--tiempo-real",
+        action="store_true",
+        help="Usar el reloj de pared en lugar del tiempo virtual",
+    )
+    args = parser.parse_args()
+
+    from . import config
+    rejilla = {}
+    for parametro in args.parametro:
+        nombre, _, valores = parametro.partition("=")
+        if not hasattr(config, nombre) or not valores:
+            parser.error(f"Parámetro no válido: {parametro!r}")
+        rejilla[nombre] = [_valor(v) for v in valores.split(",")]
+    barrer(rejilla, args.replicas, args.procesos, args.semilla, args.salida, not args.tiempo_real)
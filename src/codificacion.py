@@ -0,0 +1,432 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import base64
+import json
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from .config import CODIFICACION_MENSAJES, predefined_ethics
+from .identificadores import PRODUCTO_ID, PRODUCTOS, VARIEDAD_ID, VARIEDADES
+
+# -----------------------------------------------------------------------------
+# Codificación compacta de mensajes
+# -----------------------------------------------------------------------------
+# Los mensajes "Peticion_Cliente", "venta", "ventas_super_normal" y
+# "metricas_smart" se empaquetan en registros binarios de esquema fijo con
+# identificadores enteros de producto/variedad (ver identificadores.py). Los
+# criterios éticos no viajan: se reconstruyen desde predefined_ethics a partir
+# de la variedad. El binario se envía en base64 porque el cuerpo XMPP es texto.
+#
+# La codificación se negocia por mensaje con el metadato "codificacion": si no
+# está presente el cuerpo es JSON, de modo que ambos formatos conviven y el
+# JSON sigue disponible para depurar. Cualquier mensaje que no encaje en el
+# esquema (tipo desconocido, variedad fuera del registro…) se envía en JSON.
+#
+# El tipo del mensaje viaja además en el metadato "tipo", para que el receptor
+# pueda enrutarlo sin decodificar el cuerpo (ver Agentes/despacho.py).
+
+METADATO = "codificacion"
+METADATO_TIPO = "tipo"
+COMPACTA = "compacta"
+
+# Códigos de registro (primer byte del cuerpo)
+_PETICION = 1
+_OFERTA_COMPLETA = 2
+_OFERTA_DELTA = 3
+_OFERTA_SIN_CAMBIOS = 4
+_VENTA = 5
+_VENTAS_SUPER_NORMAL = 6
+_METRICAS_SMART = 7
+_VENTAS_LOTE = 8
+
+ACCIONES = ["compra", "compra_indispensable"]
+ACCION_ID = {accion: i for i, accion in enumerate(ACCIONES)}
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_UBICACION = struct.Struct("<ff")
+_PRODUCTO = struct.Struct("<BBI")      # id producto, id variedad, stock
+_LINEA_VENTA = struct.Struct("<BI")    # id variedad, cantidad
+# Campos numéricos de un lote de ventas: array de u32 en little-endian
+_U32_ARRAY = "I" if array("I").itemsize == 4 else "L"
+_INVERTIR = sys.byteorder == "big"
+
+# Banderas de un registro de venta genérico
+_VENTA_CON_TIPO = 1          # el dict original incluía "tipo": "venta"
+_VENTA_CLAVE_CORTA = 2       # usa "productos" en lugar de "productos_comprados"
+
+
+class _Lector:
+    """Recorre un buffer binario desempaquetando campos en orden."""
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.pos = 0
+
+    def leer(self, formato):
+        valores = formato.unpack_from(self.datos, self.pos)
+        self.pos += formato.size
+        return valores
+
+    def u8(self):
+        return self.leer(_U8)[0]
+
+    def u32(self):
+        return self.leer(_U32)[0]
+
+    def texto(self):
+        (longitud,) = self.leer(_U16)
+        valor = self.datos[self.pos:self.pos + longitud].decode("utf-8")
+        self.pos += longitud
+        return valor
+
+
+def _texto(valor):
+    datos = str(valor).encode("utf-8")
+    return _U16.pack(len(datos)) + datos
+
+
+def _productos(productos):
+    campos = []
+    if hasattr(productos, "registros"):
+        # Inventario compacto: los ids ya están en sus arrays
+        for registro in productos.registros():
+            campos += registro
+    else:
+        for producto, detalle in productos.items():
+            campos += (PRODUCTO_ID[producto], VARIEDAD_ID[detalle["variedad"]], detalle["stock"])
+    # Un único pack por bloque (struct cachea el formato compilado)
+    return struct.pack(f"<B{'BBI' * len(productos)}", len(productos), *campos)
+
+
+def _leer_bloque(lector, formato):
+    """Lee un contador u8 seguido de ese número de registros ``formato``."""
+    n = lector.u8()
+    fin = lector.pos + formato.size * n
+    registros = formato.iter_unpack(lector.datos[lector.pos:fin])
+    lector.pos = fin
+    return registros
+
+
+def _leer_productos(lector):
+    productos = {}
+    for prod_id, var_id, stock in _leer_bloque(lector, _PRODUCTO):
+        variedad = VARIEDADES[var_id]
+        detalle = dict(predefined_ethics.get(variedad, {}))
+        detalle["stock"] = stock
+        detalle["variedad"] = variedad
+        productos[PRODUCTOS[prod_id]] = detalle
+    return productos
+
+
+def _lineas(comprados):
+    campos = []
+    for variedad, cantidad in comprados.items():
+        campos += (VARIEDAD_ID[variedad], cantidad)
+    return struct.pack(f"<B{'BI' * len(comprados)}", len(comprados), *campos)
+
+
+def _leer_lineas(lector):
+    return {
+        VARIEDADES[var_id]: cantidad
+        for var_id, cantidad in _leer_bloque(lector, _LINEA_VENTA)
+    }
+
+
+def _venta(venta):
+    """Registro de venta genérico (ventas de clientes y ventas_recientes)."""
+    banderas = 0
+    if venta.get("tipo") == "venta":
+        banderas |= _VENTA_CON_TIPO
+    if "productos" in venta:
+        banderas |= _VENTA_CLAVE_CORTA
+        comprados = venta["productos"]
+    else:
+        comprados = venta.get("productos_comprados", {})
+    return b"".join([
+        _U8.pack(banderas),
+        _texto(venta["cliente_id"]),
+        _U8.pack(ACCION_ID[venta["accion"]]),
+        _texto(venta["timestamp"]),
+        _lineas(comprados),
+    ])
+
+
+def _leer_venta(lector):
+    banderas = lector.u8()
+    venta = {
+        "cliente_id": lector.texto(),
+        "accion": ACCIONES[lector.u8()],
+    }
+    timestamp = lector.texto()
+    clave = "productos" if banderas & _VENTA_CLAVE_CORTA else "productos_comprados"
+    venta[clave] = _leer_lineas(lector)
+    venta["timestamp"] = timestamp
+    if banderas & _VENTA_CON_TIPO:
+        venta["tipo"] = "venta"
+    return venta
+
+
+def _ventas_lote(ventas):
+    """
+    Registros de venta de un lote en dos bloques: los textos (cliente y
+    timestamp de cada venta) unidos por NUL en un único utf-8, y todos los
+    campos numéricos en un array de u32. Ambos se convierten a bytes de una
+    vez; empaquetar venta a venta con _venta hace cientos de llamadas
+    pequeñas y resultaba más lento que el JSON.
+    """
+    textos = []
+    numeros = array(_U32_ARRAY)
+    for venta in ventas:
+        banderas = _VENTA_CON_TIPO if venta.get("tipo") == "venta" else 0
+        if "productos" in venta:
+            banderas |= _VENTA_CLAVE_CORTA
+            comprados = venta["productos"]
+        else:
+            comprados = venta.get("productos_comprados", {})
+        textos += (str(venta["cliente_id"]), str(venta["timestamp"]))
+        numeros.extend((banderas, ACCION_ID[venta["accion"]], len(comprados)))
+        for variedad, cantidad in comprados.items():
+            numeros.extend((VARIEDAD_ID[variedad], cantidad))
+    texto = "\0".join(textos).encode("utf-8")
+    if _INVERTIR:
+        numeros.byteswap()
+    return b"".join([
+        _U32.pack(len(ventas)), _U32.pack(len(texto)), texto,
+        _U32.pack(len(numeros)), numeros.tobytes(),
+    ])
+
+
+def _leer_ventas_lote(lector):
+    """Inverso de _ventas_lote."""
+    (n,) = lector.leer(_U32)
+    (longitud,) = lector.leer(_U32)
+    textos = lector.datos[lector.pos:lector.pos + longitud].decode("utf-8").split("\0")
+    lector.pos += longitud
+    (cuantos,) = lector.leer(_U32)
+    numeros = array(_U32_ARRAY)
+    fin = lector.pos + cuantos * numeros.itemsize
+    numeros.frombytes(lector.datos[lector.pos:fin])
+    lector.pos = fin
+    if _INVERTIR:
+        numeros.byteswap()
+    campos = iter(numeros)
+    ventas = []
+    for i in range(n):
+        banderas, accion, lineas = next(campos), next(campos), next(campos)
+        comprados = {VARIEDADES[next(campos)]: next(campos) for _ in range(lineas)}
+        venta = {"cliente_id": textos[2 * i], "accion": ACCIONES[accion]}
+        venta["productos" if banderas & _VENTA_CLAVE_CORTA else "productos_comprados"] = comprados
+        venta["timestamp"] = textos[2 * i + 1]
+        if banderas & _VENTA_CON_TIPO:
+            venta["tipo"] = "venta"
+        ventas.append(venta)
+    return ventas
+
+
+def _entrada_metricas(entrada):
+    """Entrada de métricas de un inteligente (el catálogo es opcional)."""
+    catalogo = entrada.get("catalogo")
+    return b"".join([
+        _texto(entrada["origen"]),
+        _U32.pack(entrada["ronda"]),
+        _U32.pack(entrada["num_ventas"]),
+        _lineas(entrada["ventas_por_variedad"]),
+        _U32.pack(entrada["version_catalogo"]),
+        _U8.pack(catalogo is not None),
+        _productos(catalogo) if catalogo is not None else b"",
+    ])
+
+
+def _leer_entrada_metricas(lector):
+    entrada = {
+        "origen": lector.texto(),
+        "ronda": lector.u32(),
+        "num_ventas": lector.u32(),
+        "ventas_por_variedad": _leer_lineas(lector),
+        "version_catalogo": lector.u32(),
+    }
+    if lector.u8():
+        entrada["catalogo"] = _leer_productos(lector)
+    return entrada
+
+
+def _version(valor):
+    return _U32.pack(valor or 0)
+
+
+def empaquetar(datos):
+    """
+    Convierte el dict de un mensaje en su registro binario.
+    Lanza ValueError si el mensaje no tiene esquema compacto.
+    """
+    tipo = datos.get("tipo")
+    if tipo == "Peticion_Cliente":
+        if datos.get("sin_cambios"):
+            return _U8.pack(_OFERTA_SIN_CAMBIOS) + _version(datos["version"])
+        if datos.get("delta"):
+            return b"".join([
+                _U8.pack(_OFERTA_DELTA),
+                _version(datos["version"]),
+                _version(datos["desde"]),
+                _productos(datos["productos"]),
+            ])
+        if "productos" in datos:
+            return b"".join([
+                _U8.pack(_OFERTA_COMPLETA),
+                _version(datos.get("version")),
+                _UBICACION.pack(*datos["ubicacion"]),
+                _productos(datos["productos"]),
+            ])
+        return _U8.pack(_PETICION) + _version(datos.get("version"))
+    if tipo == "venta":
+        return _U8.pack(_VENTA) + _venta(datos)
+    if tipo == "ventas_super_normal" and "ventas" in datos:
+        return b"".join([
+            _U8.pack(_VENTAS_LOTE),
+            _texto(datos["supermercado_id"]),
+            _ventas_lote(datos["ventas"]),
+            _lineas(datos["resumen"]),
+        ])
+    if tipo == "ventas_super_normal":
+        return b"".join([
+            _U8.pack(_VENTAS_SUPER_NORMAL),
+            _texto(datos["supermercado_id"]),
+            _venta(datos["venta"]),
+        ])
+    if tipo == "metricas_smart":
+        entradas = datos["metricas"]
+        return b"".join(
+            [_U8.pack(_METRICAS_SMART), _U16.pack(len(entradas))]
+            + [_entrada_metricas(e) for e in entradas]
+        )
+    raise ValueError(f"Tipo de mensaje sin codificación compacta: {tipo!r}")
+
+
+def desempaquetar(binario):
+    """Reconstruye el dict de un mensaje a partir de su registro binario."""
+    lector = _Lector(binario)
+    codigo = lector.u8()
+    if codigo == _PETICION:
+        version = lector.u32()
+        return {"tipo": "Peticion_Cliente", "version": version or None}
+    if codigo == _OFERTA_SIN_CAMBIOS:
+        return {"tipo": "Peticion_Cliente", "version": lector.u32(), "sin_cambios": True}
+    if codigo == _OFERTA_DELTA:
+        version = lector.u32()
+        desde = lector.u32()
+        return {
+            "tipo": "Peticion_Cliente",
+            "version": version,
+            "desde": desde,
+            "delta": True,
+            "productos": _leer_productos(lector),
+        }
+    if codigo == _OFERTA_COMPLETA:
+        version = lector.u32()
+        ubicacion = lector.leer(_UBICACION)
+        return {
+            "tipo": "Peticion_Cliente",
+            "version": version or None,
+            "productos": _leer_productos(lector),
+            "ubicacion": list(ubicacion),
+        }
+    if codigo == _VENTA:
+        return _leer_venta(lector)
+    if codigo == _VENTAS_SUPER_NORMAL:
+        supermercado_id = lector.texto()
+        return {
+            "tipo": "ventas_super_normal",
+            "supermercado_id": supermercado_id,
+            "venta": _leer_venta(lector),
+        }
+    if codigo == _VENTAS_LOTE:
+        supermercado_id = lector.texto()
+        ventas = _leer_ventas_lote(lector)
+        return {
+            "tipo": "ventas_super_normal",
+            "supermercado_id": supermercado_id,
+            "ventas": ventas,
+            "resumen": _leer_lineas(lector),
+        }
+    if codigo == _METRICAS_SMART:
+        (n,) = lector.leer(_U16)
+        return {
+            "tipo": "metricas_smart",
+            "metricas": [_leer_entrada_metricas(lector) for _ in range(n)],
+        }
+    raise ValueError(f"Código de registro desconocido: {codigo}")
+
+
+def codificar(datos, codificacion=None):
+    """
+    Serializa ``datos`` en la codificación pedida (por defecto,
+    CODIFICACION_MENSAJES).
+
+    Retorna:
+        tuple: (cuerpo del mensaje, codificación usada: "json" o "compacta").
+    """
+    if codificacion is None:
+        codificacion = CODIFICACION_MENSAJES
+    if codificacion == COMPACTA:
+        try:
+            binario = empaquetar(datos)
+            return base64.b64encode(binario).decode("ascii"), COMPACTA
+        except (KeyError, IndexError, TypeError, ValueError, struct.error):
+            pass
+    return json.dumps(datos, default=_a_json), "json"
+
+
+def _a_json(valor):
+    """Los inventarios compactos (Mapping) se serializan como su vista dict."""
+    if isinstance(valor, Mapping):
+        return dict(valor)
+    raise TypeError(f"{type(valor).__name__} no es serializable en JSON")
+
+
+def asignar_cuerpo(msg, cuerpo, codificacion, tipo=None):
+    """
+    Asigna un cuerpo ya codificado y marca en los metadatos su codificación
+    y, si se indica, el tipo de mensaje.
+    """
+    msg.body = cuerpo
+    if codificacion == COMPACTA:
+        msg.set_metadata(METADATO, COMPACTA)
+    if tipo is not None:
+        msg.set_metadata(METADATO_TIPO, str(tipo))
+    return msg
+
+
+def preparar_mensaje(msg, datos, codificacion=None):
+    """Codifica ``datos`` en el cuerpo de ``msg`` (JSON o compacto)."""
+    return asignar_cuerpo(msg, *codificar(datos, codificacion), datos.get("tipo"))
+
+
+def codificacion_de(msg):
+    """Codificación con la que llegó ``msg`` (para responder en la misma)."""
+    return COMPACTA if msg.get_metadata(METADATO) == COMPACTA else "json"
+
+
+def leer_mensaje(msg):
+    """
+    Decodifica el cuerpo de ``msg`` según su metadato de codificación.
+
+    Retorna:
+        dict | None: el contenido del mensaje, o None si no se puede leer.
+    """
+    try:
+        if msg.get_metadata(METADATO) == COMPACTA:
+            return desempaquetar(base64.b64decode(msg.body))
+        return json.loads(msg.body)
+    except (ValueError, TypeError, IndexError, struct.error):
+        return None
@@ -1,7 +1,5 @@
-import asyncio
-
-# Bloqueo para asegurar la exclusión mutua en decisiones concurrentes
-decisiones_lock = asyncio.Lock()
+from .orquestacion import Finalizados
+from .registros import RegistroTrozos
 
 # -----------------------------------------------------------------------------
 # Parámetros de comportamiento de cambio de variedades en supermercados normales
@@ -39,18 +37,130 @@ NUM_INTELIGENTES = 2
 # Número de clientes en la simulación
 NUM_CLIENTES = 50
 
+# Reloj de la simulación
+# False: reloj de pared. True: tiempo virtual (el reloj salta al siguiente
+# evento en vez de esperar; requiere TRANSPORTE = "local")
+TIEMPO_VIRTUAL = False
+# Fecha y hora (ISO) en que empieza una simulación con tiempo virtual: no
+# depende de cuándo se lanza, así que con la misma semilla las marcas de
+# tiempo (decisiones, registro de eventos, log.txt) coinciden entre ejecuciones
+INICIO_TIEMPO_VIRTUAL = "2025-01-01T09:00:00"
+
+# Número de procesos entre los que se reparten los clientes (1 = un solo proceso).
+# Los supermercados se ejecutan en el proceso principal; requiere TRANSPORTE = "local"
+PROCESOS_CLIENTES = 1
+
+# Arranque y parada de agentes: operaciones simultáneas como máximo y
+# segundos de espera por agente antes de darlo por fallido
+ARRANQUES_SIMULTANEOS = 50
+TIMEOUT_ARRANQUE = 60
+TIMEOUT_PARADA = 10
+
+# Segundos tras los que un cliente olvida la oferta de un supermercado que no
+# ha vuelto a responder (solo MODO_OFERTAS = "sondeo")
+CADUCIDAD_OFERTAS = 30
+
+# Semilla de la simulación (None: se elige al azar y se guarda en el registro
+# de eventos). Cada agente deriva de ella su propio generador aleatorio
+SEMILLA = None
+# Registro de eventos (semilla, decisiones y estado final) para reproducir los
+# informes con `python -m src.main --reproducir <fichero>`, p. ej.
+# "eventos.jsonl"; None lo desactiva. Se escribe en un hilo aparte
+REGISTRO_EVENTOS = None
+# Anotar también cada mensaje recibido (cuerpo incluido) en el registro de
+# eventos: solo para depurar, el registro crece con cada mensaje
+REGISTRAR_MENSAJES = False
+
+# Registros que crecen durante toda la simulación (decisiones y registros de
+# los inteligentes): se escriben por trozos de REGISTROS_TROZO registros en
+# DIRECTORIO_REGISTROS y los informes los leen de ahí. Con REGISTRO_EVENTOS
+# van junto al registro, en <registro>.registros, para poder reproducirlo.
+# None: se guardan en memoria
+DIRECTORIO_REGISTROS = "registros"
+REGISTROS_TROZO = 10000
+
+# Registro (log.txt y consola): lo escribe un hilo aparte, sin detener la
+# simulación. Las categorías de la ruta caliente ("mensajes", "ofertas",
+# "ventas", "surtido", "metricas") tienen nivel y muestreo propios:
+# • LOG_RUTA_CALIENTE = False las apaga del todo (para benchmarks).
+# • NIVELES_LOG: { id de agente o categoría: nivel }, p. ej.
+#   {"mensajes": "WARNING", "SUPERMERCADO_1": "INFO"}; el del agente manda.
+# • MUESTREO_LOG: { categoría: registros por segundo de simulación como
+#   máximo }; los que
+#   sobran se omiten y se anota cuántos
+LOG_RUTA_CALIENTE = True
+NIVELES_LOG = {}
+MUESTREO_LOG = {"mensajes": 200, "ofertas": 200, "ventas": 200, "metricas": 200}
+
+# Diario de cambios de creencias (hoja y CSV "cambios_de_creencias"): agente,
+# creencia, versión y un resumen del valor (sin copiarlo). False lo desactiva.
+# Se anota uno de cada DIARIO_CREENCIAS_MUESTREO cambios de cada creencia,
+# hasta DIARIO_CREENCIAS_MAXIMO entradas (None: sin límite)
+DIARIO_CREENCIAS = False
+DIARIO_CREENCIAS_MUESTREO = 1
+DIARIO_CREENCIAS_MAXIMO = 100000
+
+# Instantáneas periódicas del estado completo de la simulación, para reanudarla
+# con `python -m src.main --reanudar` tras una caída o interrupción (solo con
+# PROCESOS_CLIENTES = 1).
+# Segundos (de simulación) entre instantáneas; None las desactiva. Cada
+# captura detiene el bucle de eventos mientras serializa el estado (el log
+# anota cuánto), así que están desactivadas por defecto; p. ej. 300
+INTERVALO_INSTANTANEAS = None
+# Carpeta donde se guardan y número de instantáneas que se conservan
+DIRECTORIO_INSTANTANEAS = "instantaneas"
+CONSERVAR_INSTANTANEAS = 3
+
+# Transporte de mensajes entre agentes
+# Opciones: "xmpp" (servidor XMPP real) o "local" (bus en memoria, sin servidor)
+TRANSPORTE = "xmpp"
+
+# Canal de ofertas entre clientes y supermercados
+# Opciones: "sondeo" (petición/respuesta en cada ciclo) o "suscripcion"
+# (el cliente se suscribe una vez y el supermercado publica solo si cambia su catálogo)
+MODO_OFERTAS = "sondeo"
+# Sondeo adaptativo (MODO_OFERTAS = "sondeo"): cada cliente pregunta en cada
+# ciclo a sus SONDEO_CANDIDATOS supermercados mejor puntuados y al resto solo
+# con probabilidad SONDEO_EXPLORACION o si hace SONDEO_ANTIGUEDAD_MAX segundos
+# que no les pregunta (menos que CADUCIDAD_OFERTAS, para que sus ofertas no
+# caduquen). None (por defecto): preguntar a todos los supermercados en cada
+# ciclo; cambiar el valor cambia los resultados de la simulación (ver en
+# log.txt la antigüedad de las ofertas con las que se compra)
+SONDEO_CANDIDATOS = None
+SONDEO_EXPLORACION = 0.1
+SONDEO_ANTIGUEDAD_MAX = 20
+# Intervalo en segundos con el que un supermercado agrupa y publica sus cambios
+INTERVALO_PUBLICACION_OFERTAS = 1
+# Codificación de los mensajes de ofertas y ventas
+# Opciones: "json" (legible, para depurar) o "compacta" (registros binarios)
+CODIFICACION_MENSAJES = "json"
+
+# Envío por lotes de ventas de supermercados normales a los inteligentes
+# Número de ventas que fuerza el envío inmediato de un lote
+VENTAS_LOTE_TAMANO = 50
+# Segundos máximos que una venta espera en cola antes de enviarse
+VENTAS_LOTE_INTERVALO = 1
+
+# Intercambio de métricas entre supermercados inteligentes
+# Opciones: "todos" (cada uno a todos los peers), "agregador" (todos envían a un
+# agregador que reenvía la tabla combinada) o "gossip" (cada uno reenvía lo que
+# conoce a GOSSIP_FANOUT peers aleatorios)
+TOPOLOGIA_METRICAS = "todos"
+GOSSIP_FANOUT = 2
+
 # Modo adaptativo por defecto para supermercados inteligentes
 # Opciones: "atraccion_clientes" o "reevaluacion_productos"
 adaptativo = "atraccion_clientes"
 
 # Listas globales para llevar logs y estado de la simulación
-cambios_productos_log = []       # Registra cambios de variedades en inteligentes
-productos_inteligentes_log = []  # Captura inventario tras adaptación
-evaluacion_cambios_log = []      # Detalles de evaluación de ventas cercanas
-decisiones = []                  # Historial de decisiones de clientes
+# (los RegistroTrozos se escriben por trozos en DIRECTORIO_REGISTROS)
+cambios_productos_log = RegistroTrozos("cambios_productos_log")            # Registra cambios de variedades en inteligentes
+productos_inteligentes_log = RegistroTrozos("productos_inteligentes_log")  # Captura inventario tras adaptación
+evaluacion_cambios_log = RegistroTrozos("evaluacion_cambios_log")          # Detalles de evaluación de ventas cercanas
+decisiones = RegistroTrozos("decisiones")                                  # Historial de decisiones de clientes
 historial_creencias = []         # Registro de cambios de creencias
-clients_finished = []            # Clientes que han terminado su ciclo
-atraccion_eventos_log = []       # Eventos de atracción/adopción de catálogo
+clients_finished = Finalizados() # Clientes que han terminado su ciclo (awaitable)
+atraccion_eventos_log = RegistroTrozos("atraccion_eventos_log")            # Eventos de atracción/adopción de catálogo
 
 # -----------------------------------------------------------------------------
 # Definición de Productos, Variedades y Valores Éticos Predefinidos
@@ -0,0 +1,107 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import math
+from collections import defaultdict
+
+from . import config
+
+# -----------------------------------------------------------------------------
+# Índice espacial en rejilla
+# -----------------------------------------------------------------------------
+# Los agentes viven en el cuadrado [0, 100] × [0, 100]. Una rejilla uniforme
+# reparte los puntos en celdas de lado ``celda``: una consulta por radio solo
+# mira las celdas que toca el círculo y, si el círculo cubre todas las celdas
+# ocupadas, devuelve todos los puntos sin medir distancias. La usan los
+# supermercados inteligentes para conocer a sus vecinos
+# (SupermercadoInteligente.vecinos). Los clientes no la necesitan: la
+# ubicación viaja en cada oferta y RankingSupermercados poda con ella.
+
+CELDA = 10
+
+
+class IndiceEspacial:
+    """Puntos { clave: (x, y) } indexados en una rejilla."""
+
+    def __init__(self, puntos=None, celda=CELDA):
+        self.celda = celda
+        self.puntos = {}
+        self.celdas = defaultdict(dict)   # { (i, j): { clave: (x, y) } }
+        for clave, punto in (puntos or {}).items():
+            self.insertar(clave, punto)
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def __contains__(self, clave):
+        return clave in self.puntos
+
+    def _celda(self, punto):
+        return (math.floor(punto[0] / self.celda), math.floor(punto[1] / self.celda))
+
+    def insertar(self, clave, punto):
+        if clave in self.puntos:
+            self.quitar(clave)
+        punto = (punto[0], punto[1])
+        self.puntos[clave] = punto
+        self.celdas[self._celda(punto)][clave] = punto
+
+    def quitar(self, clave):
+        punto = self.puntos.pop(clave, None)
+        if punto is None:
+            return
+        celda = self._celda(punto)
+        del self.celdas[celda][clave]
+        if not self.celdas[celda]:
+            del self.celdas[celda]
+
+    def en_radio(self, centro, radio):
+        """Claves a distancia <= ``radio`` de ``centro``."""
+        if self.celdas and self._cubre(centro, radio):
+            return list(self.puntos)
+        i0, j0 = self._celda((centro[0] - radio, centro[1] - radio))
+        i1, j1 = self._celda((centro[0] + radio, centro[1] + radio))
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.celdas):
+            # Radio mayor que la zona ocupada: se recorren solo las celdas con puntos
+            candidatas = self.celdas.values()
+        else:
+            candidatas = (
+                self.celdas[(i, j)]
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+                if (i, j) in self.celdas
+            )
+        return [
+            clave
+            for puntos in candidatas
+            for clave, punto in puntos.items()
+            if math.dist(centro, punto) <= radio
+        ]
+
+    def _cubre(self, centro, radio):
+        """Si el círculo contiene todas las celdas ocupadas (sus esquinas)."""
+        filas = [i for i, _ in self.celdas]
+        columnas = [j for _, j in self.celdas]
+        x = max(abs(centro[0] - min(filas) * self.celda), abs(centro[0] - (max(filas) + 1) * self.celda))
+        y = max(abs(centro[1] - min(columnas) * self.celda), abs(centro[1] - (max(columnas) + 1) * self.celda))
+        return math.hypot(x, y) <= radio
+
+_indice_supermercados = None
+
+
+def indice_supermercados():
+    """
+    Índice de config.supermercados_ubicaciones (supermercados normales). Los
+    supermercados no se mueven: se reconstruye solo si se registran otros.
+    """
+    global _indice_supermercados
+    ubicaciones = config.supermercados_ubicaciones
+    if _indice_supermercados is None or len(_indice_supermercados) != len(ubicaciones):
+        _indice_supermercados = IndiceEspacial(ubicaciones)
+    return _indice_supermercados
@@ -0,0 +1,179 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import json
+import queue
+import threading
+
+from .codificacion import METADATO, METADATO_TIPO
+from .reloj import ahora
+
+# -----------------------------------------------------------------------------
+# Registro de eventos de la simulación
+# -----------------------------------------------------------------------------
+# Fichero JSON Lines de solo añadido, una línea por evento:
+#   • "inicio": semilla y parámetros de config.
+#   • "mensaje": cada mensaje que recibe un agente (remitente, destino, tipo,
+#     codificación y cuerpo tal cual viajó). Solo con REGISTRAR_MENSAJES.
+#   • "decision": cada decisión de un cliente, en el orden en que se anota.
+#     Solo si las decisiones no se escriben ya por trozos (ver
+#     registros.carpeta_registros); entonces el estado final guarda dónde
+#     están y qué ejecución los escribió.
+#   • "final": estado final necesario para los informes (filas de agentes,
+#     ventas, ubicaciones y registros globales).
+# Con él, ``reconstruir`` recupera las decisiones y el estado final y
+# main.exportar regenera todos los informes sin volver a simular.
+#
+# Quien registra solo encola el evento: un hilo aparte lo serializa a JSON y
+# lo escribe, como el log (ver logger.py). Los datos de un evento no deben
+# modificarse después de registrarlo.
+
+_registro = None
+
+
+class RegistroEventos:
+    def __init__(self, ruta, hasta=None, mensajes=False, decisiones=True):
+        self.ruta = ruta
+        self.mensajes = mensajes        # registrar los mensajes recibidos
+        self.decisiones = decisiones    # registrar las decisiones
+        self.secuencia = 0
+        previos = []
+        if hasta is not None:
+            # Reanudación: se conservan los eventos hasta la instantánea
+            previos = [e for e in leer_eventos(ruta) if e["seq"] <= hasta]
+        self.archivo = open(ruta, "w", encoding="utf-8")
+        for evento in previos:
+            self.archivo.write(json.dumps(evento, default=str) + "\n")
+            self.secuencia = evento["seq"]
+        self.cola = queue.SimpleQueue()
+        self.escritor = threading.Thread(target=self._escribir, name="eventos", daemon=True)
+        self.escritor.start()
+
+    def registrar(self, tipo, **datos):
+        self.secuencia += 1
+        self.cola.put((self.secuencia, ahora(), tipo, datos))
+
+    def _escribir(self):
+        while True:
+            evento = self.cola.get()
+            if evento is None:
+                return
+            if isinstance(evento, threading.Event):
+                # Marca de vaciar(): todo lo anterior ya está escrito
+                self.archivo.flush()
+                evento.set()
+                continue
+            secuencia, instante, tipo, datos = evento
+            linea = {"seq": secuencia, "t": instante.isoformat(), "tipo": tipo, **datos}
+            self.archivo.write(json.dumps(linea, default=str) + "\n")
+
+    def vaciar(self):
+        """Espera a que el hilo escritor haya escrito y volcado lo encolado."""
+        if not self.escritor.is_alive():
+            return      # registro ya cerrado: cerrar() lo escribió todo
+        escrito = threading.Event()
+        self.cola.put(escrito)
+        escrito.wait()
+
+    def cerrar(self):
+        self.cola.put(None)
+        self.escritor.join()
+        self.archivo.close()
+
+
+def abrir_registro(ruta, hasta=None, mensajes=False, decisiones=True):
+    """
+    Abre (y trunca) el registro de eventos de esta simulación. Con ``hasta``
+    conserva los eventos con secuencia <= hasta y continúa a partir de ellos.
+    ``mensajes`` y ``decisiones`` indican si se anotan esos eventos.
+    """
+    global _registro
+    cerrar_registro()
+    _registro = RegistroEventos(ruta, hasta, mensajes, decisiones)
+    return _registro
+
+
+def cerrar_registro():
+    global _registro
+    if _registro is not None:
+        _registro.cerrar()
+        _registro = None
+
+
+def secuencia_registro():
+    """
+    Secuencia del último evento anotado, sin esperar a que se escriba (None
+    si no hay registro abierto).
+    """
+    if _registro is None:
+        return None
+    return _registro.secuencia
+
+
+def vaciar_registro():
+    """
+    Vuelca a disco los eventos pendientes y devuelve la secuencia del último
+    (None si no hay registro abierto). Bloquea hasta que el hilo escritor
+    termina: no debe llamarse desde el bucle de eventos.
+    """
+    registro = _registro
+    if registro is None:
+        return None
+    registro.vaciar()
+    return registro.secuencia
+
+
+def registrar_evento(tipo, **datos):
+    """Añade un evento al registro abierto (no hace nada si no hay ninguno)."""
+    if _registro is not None:
+        _registro.registrar(tipo, **datos)
+
+
+def registrar_decision(decision):
+    """Anota una decisión, salvo que el registro no guarde decisiones."""
+    if _registro is not None and _registro.decisiones:
+        _registro.registrar("decision", decision=decision)
+
+
+def registrar_mensaje(msg):
+    if _registro is not None and _registro.mensajes:
+        _registro.registrar(
+            "mensaje",
+            remitente=str(msg.sender),
+            destino=str(msg.to),
+            tipo_mensaje=msg.get_metadata(METADATO_TIPO),
+            codificacion=msg.get_metadata(METADATO),
+            cuerpo=msg.body,
+        )
+
+
+def leer_eventos(ruta):
+    """Itera los eventos de un registro en orden."""
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def reconstruir(ruta):
+    """
+    Reconstruye una simulación a partir de su registro.
+
+    Retorna:
+        tuple: (evento "inicio" o None, decisiones, estado final o None)
+    """
+    inicio, decisiones, estado = None, [], None
+    for evento in leer_eventos(ruta):
+        if evento["tipo"] == "inicio":
+            inicio = evento
+        elif evento["tipo"] == "decision":
+            decisiones.append(evento["decision"])
+        elif evento["tipo"] == "final":
+            estado = evento["estado"]
+    return inicio, decisiones, estado
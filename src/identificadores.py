@@ -0,0 +1,35 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+from .config import possible_products, possible_varieties
+
+# -----------------------------------------------------------------------------
+# Registro de identificadores enteros para productos y variedades
+# -----------------------------------------------------------------------------
+# Se construye una sola vez a partir de possible_products / possible_varieties.
+# El orden es el de la configuración, así que es idéntico en todos los agentes.
+
+# Índice -> nombre
+PRODUCTOS = list(possible_products)
+VARIEDADES = [
+    variedad
+    for producto in possible_products
+    for variedad in possible_varieties.get(producto, [producto])
+]
+
+# Nombre -> índice
+PRODUCTO_ID = {producto: i for i, producto in enumerate(PRODUCTOS)}
+VARIEDAD_ID = {variedad: i for i, variedad in enumerate(VARIEDADES)}
+
+# Variedad -> índice de su producto (evita var.split("_")[0] en cada venta)
+PRODUCTO_DE_VARIEDAD = [
+    PRODUCTO_ID[producto]
+    for producto in possible_products
+    for _ in possible_varieties.get(producto, [producto])
+]
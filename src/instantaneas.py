@@ -0,0 +1,180 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import gzip
+import os
+import pickle
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .eventos import secuencia_registro, vaciar_registro
+from .logger import logging
+from .particiones import parametros_config
+from .registros import RegistroTrozos
+from .reloj import ahora, dormir_primero
+
+# -----------------------------------------------------------------------------
+# Instantáneas de la simulación
+# -----------------------------------------------------------------------------
+# Una instantánea contiene la semilla y los parámetros de config, las listas
+# y diccionarios globales de config (decisiones, ubicaciones, registros…) y el
+# estado de cada agente (AgenteDespacho.estado: creencias, inventarios,
+# ventas, generador aleatorio y mensajes pendientes).
+# Se serializa con pickle de una vez dentro del bucle de eventos, sin ceder el
+# control, así que es coherente; del registro de eventos solo se anota la
+# secuencia del último evento, sin esperar a que el hilo escritor lo escriba.
+# La compresión (gzip) y la escritura van en un hilo aparte y no detienen la
+# simulación: ese hilo espera antes a que el registro de eventos llegue a
+# disco hasta esa secuencia, así que una instantánea visible nunca apunta a
+# eventos sin escribir. La captura sí detiene el bucle, tanto más cuanto mayor
+# es el estado (no se copia por partes: cediendo el control entre agentes, los
+# mensajes en vuelo dejarían la instantánea incoherente); por eso están
+# desactivadas por defecto (INTERVALO_INSTANTANEAS) y cada una anota cuánto
+# detuvo el bucle. Cada fichero se escribe primero con otro nombre y se
+# renombra al terminar: nunca queda una instantánea a medias.
+
+# Estructuras globales de config que forman parte del estado
+GLOBALES = (
+    "decisiones",
+    "clients_finished",
+    "clientes_ubicaciones",
+    "supermercados_ubicaciones",
+    "historial_creencias",
+    "cambios_productos_log",
+    "productos_inteligentes_log",
+    "evaluacion_cambios_log",
+    "atraccion_eventos_log",
+)
+
+_PATRON = re.compile(r"instantanea_(\d+)\.pkl\.gz$")
+
+
+def _instantaneas(directorio):
+    """[(número, ruta)] de las instantáneas de ``directorio``, de la más antigua a la última."""
+    if not os.path.isdir(directorio):
+        return []
+    encontradas = []
+    for nombre in os.listdir(directorio):
+        coincidencia = _PATRON.match(nombre)
+        if coincidencia:
+            encontradas.append((int(coincidencia.group(1)), os.path.join(directorio, nombre)))
+    return sorted(encontradas)
+
+
+class GestorInstantaneas:
+    """
+    Guarda instantáneas numeradas en ``directorio`` y conserva las
+    ``conservar`` más recientes.
+    """
+
+    def __init__(self, directorio=None, conservar=None):
+        self.directorio = directorio or config.DIRECTORIO_INSTANTANEAS
+        self.conservar = conservar or config.CONSERVAR_INSTANTANEAS
+        os.makedirs(self.directorio, exist_ok=True)
+        existentes = _instantaneas(self.directorio)
+        self.numero = existentes[-1][0] if existentes else 0
+        self.escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instantaneas")
+        self.pendiente = None
+        self.detenido = []       # segundos que detuvo el bucle cada captura
+
+    def capturar(self, agentes):
+        """Serializa el estado completo de la simulación (bytes de pickle)."""
+        instantanea = {
+            "momento": ahora(),
+            "semilla": config.SEMILLA,
+            "config": parametros_config(),
+            "eventos": secuencia_registro(),
+            "globales": {nombre: getattr(config, nombre) for nombre in GLOBALES},
+            "agentes": {str(agente.jid): agente.estado() for agente in agentes},
+        }
+        return pickle.dumps(instantanea, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def guardar(self, agentes):
+        """
+        Captura el estado y lo escribe en segundo plano. Si la escritura
+        anterior no ha terminado, esta instantánea se omite.
+        """
+        if self.pendiente is not None and not self.pendiente.done():
+            logging.warning("Instantánea omitida: la anterior aún se está escribiendo")
+            return None
+        inicio = time.perf_counter()
+        datos = self.capturar(agentes)
+        detenido = time.perf_counter() - inicio
+        self.detenido.append(detenido)
+        self.numero += 1
+        ruta = os.path.join(self.directorio, f"instantanea_{self.numero:05d}.pkl.gz")
+        self.pendiente = self.escritor.submit(self._escribir, datos, ruta, detenido)
+        return ruta
+
+    def _escribir(self, datos, ruta, detenido):
+        temporal = ruta + ".tmp"
+        with gzip.open(temporal, "wb", compresslevel=3) as archivo:
+            archivo.write(datos)
+        # Los eventos hasta la secuencia de la instantánea, en disco antes de publicarla
+        vaciar_registro()
+        os.replace(temporal, ruta)
+        for _, antigua in _instantaneas(self.directorio)[:-self.conservar]:
+            os.remove(antigua)
+        logging.info(
+            f"Instantánea guardada en {ruta} ({os.path.getsize(ruta) / 1024:.0f} KiB; "
+            f"la captura detuvo el bucle {detenido * 1000:.1f} ms)"
+        )
+
+    async def periodicamente(self, agentes, intervalo=None):
+        """Guarda una instantánea cada ``intervalo`` segundos de simulación."""
+        intervalo = intervalo or config.INTERVALO_INSTANTANEAS
+        while True:
+            await dormir_primero(intervalo)
+            self.guardar(agentes)
+
+    def cerrar(self):
+        """Espera a que termine la última escritura."""
+        self.escritor.shutdown(wait=True)
+        if self.detenido:
+            logging.info(
+                f"Instantáneas: {len(self.detenido)} capturas, bucle detenido "
+                f"{sum(self.detenido) * 1000:.1f} ms en total "
+                f"(máximo {max(self.detenido) * 1000:.1f} ms)"
+            )
+
+
+def cargar_instantanea(ruta=None):
+    """
+    Lee una instantánea. ``ruta`` puede ser un fichero o una carpeta (se toma
+    la última); por defecto, la carpeta DIRECTORIO_INSTANTANEAS.
+    """
+    ruta = ruta or config.DIRECTORIO_INSTANTANEAS
+    if os.path.isdir(ruta):
+        existentes = _instantaneas(ruta)
+        if not existentes:
+            raise FileNotFoundError(f"No hay instantáneas en {ruta}")
+        ruta = existentes[-1][1]
+    with gzip.open(ruta, "rb") as archivo:
+        instantanea = pickle.load(archivo)
+    logging.info(f"Reanudando desde {ruta} (momento {instantanea['momento']})")
+    return instantanea
+
+
+def restaurar_globales(instantanea):
+    """
+    Restaura las estructuras globales de config sin sustituirlas: los
+    módulos que las importaron por nombre siguen viendo el mismo objeto.
+    """
+    for nombre, valor in instantanea["globales"].items():
+        actual = getattr(config, nombre)
+        if isinstance(actual, RegistroTrozos):
+            actual.restaurar(valor)
+            continue
+        actual.clear()
+        if isinstance(actual, dict):
+            actual.update(valor)
+        else:
+            actual.extend(valor)
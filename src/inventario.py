@@ -0,0 +1,120 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+from array import array
+from collections.abc import Mapping
+
+from .config import predefined_ethics
+from .identificadores import PRODUCTO_DE_VARIEDAD, PRODUCTO_ID, PRODUCTOS, VARIEDAD_ID, VARIEDADES
+
+# -----------------------------------------------------------------------------
+# Inventarios y catálogos compactos
+# -----------------------------------------------------------------------------
+# Criterios éticos de cada variedad (índice = id de variedad), compartidos por
+# todos los inventarios: ninguno guarda su propia copia.
+ETICA = [predefined_ethics.get(variedad, {}) for variedad in VARIEDADES]
+
+_SIN_VARIEDAD = -1
+
+
+def producto_de(variedad):
+    """Producto al que pertenece ``variedad`` (None si no está en el registro)."""
+    var_id = VARIEDAD_ID.get(variedad)
+    return None if var_id is None else PRODUCTOS[PRODUCTO_DE_VARIEDAD[var_id]]
+
+
+class Inventario(Mapping):
+    """
+    Inventario (o catálogo) de un supermercado en dos arrays indexados por
+    id de producto (identificadores.py): id de la variedad que vende y stock.
+
+    Se consulta como el dict de antes,
+    { producto: {<criterios éticos>, "stock": ..., "variedad": ...} },
+    construyendo cada detalle al vuelo; ``como_dict`` da la copia completa
+    (para exportar o registrar). Los cambios se hacen con ``poner``,
+    ``cambiar_variedad`` y ``vender``.
+    """
+
+    __slots__ = ("variedades", "stock")
+
+    def __init__(self):
+        n = len(PRODUCTOS)
+        self.variedades = array("h", [_SIN_VARIEDAD]) * n
+        self.stock = array("l", [0]) * n
+
+    @classmethod
+    def desde_dict(cls, productos):
+        """Inventario a partir de { producto: {"variedad", "stock", ...} } (o de otro Inventario)."""
+        inventario = cls()
+        for producto, detalle in productos.items():
+            inventario.poner(producto, detalle["variedad"], detalle["stock"])
+        return inventario
+
+    def poner(self, producto, variedad, stock):
+        p = PRODUCTO_ID[producto]
+        self.variedades[p] = VARIEDAD_ID[variedad]
+        self.stock[p] = stock
+
+    def variedad(self, producto):
+        return VARIEDADES[self.variedades[PRODUCTO_ID[producto]]]
+
+    def cambiar_variedad(self, producto, variedad):
+        """Pasa ``producto`` a ``variedad`` conservando su stock."""
+        self.variedades[PRODUCTO_ID[producto]] = VARIEDAD_ID[variedad]
+
+    def vender(self, variedad, cantidad):
+        """
+        Descuenta ``cantidad`` del producto de ``variedad`` (sin bajar de 0).
+        Retorna el producto, o None si la variedad o el producto no están.
+        """
+        var_id = VARIEDAD_ID.get(variedad)
+        if var_id is None:
+            return None
+        p = PRODUCTO_DE_VARIEDAD[var_id]
+        if self.variedades[p] == _SIN_VARIEDAD:
+            return None
+        self.stock[p] = max(0, self.stock[p] - cantidad)
+        return PRODUCTOS[p]
+
+    def bajo_stock(self, umbral):
+        """Productos con menos de ``umbral`` unidades."""
+        return [
+            PRODUCTOS[p] for p, stock in enumerate(self.stock)
+            if stock < umbral and self.variedades[p] != _SIN_VARIEDAD
+        ]
+
+    def registros(self):
+        """(id de producto, id de variedad, stock) de cada producto presente."""
+        return [
+            (p, v, self.stock[p]) for p, v in enumerate(self.variedades)
+            if v != _SIN_VARIEDAD
+        ]
+
+    def como_dict(self):
+        return {producto: self[producto] for producto in self}
+
+    def __getitem__(self, producto):
+        p = PRODUCTO_ID.get(producto)
+        if p is None or self.variedades[p] == _SIN_VARIEDAD:
+            raise KeyError(producto)
+        v = self.variedades[p]
+        return {**ETICA[v], "stock": self.stock[p], "variedad": VARIEDADES[v]}
+
+    def __contains__(self, producto):
+        p = PRODUCTO_ID.get(producto)
+        return p is not None and self.variedades[p] != _SIN_VARIEDAD
+
+    def __iter__(self):
+        return (PRODUCTOS[p] for p, v in enumerate(self.variedades) if v != _SIN_VARIEDAD)
+
+    def __len__(self):
+        return sum(v != _SIN_VARIEDAD for v in self.variedades)
+
+    def __repr__(self):
+        return repr(self.como_dict())
@@ -1,4 +1,9 @@
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import util
+
+from .reloj import ahora, segundos, tiempo_virtual
 
 # Configuración del logger: se escribe en "log.txt" con hora y mensaje
 logger = logging.getLogger()
@@ -9,8 +14,131 @@ formatter = logging.Formatter(
 file_handler = logging.FileHandler("log.txt")
 file_handler.setLevel(logging.INFO)
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.INFO)
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
\ No newline at end of file
+
+# Los registros se encolan y un hilo aparte los escribe en el fichero y la
+# consola: quien llama a logging no espera al disco ni a la terminal.
+_INMUTABLES = (type(None), bool, int, float, str, bytes)
+
+
+class ManejadorCola(QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que llama: el mensaje se compone
+    en el hilo escritor. Solo si algún argumento es mutable (un dict que el
+    agente puede cambiar después) se compone ya. Con reloj virtual, la hora
+    del registro es la de la simulación.
+    """
+
+    def prepare(self, record):
+        if tiempo_virtual():
+            record.created = ahora().timestamp()
+        if record.args and not all(isinstance(a, _INMUTABLES) for a in record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+cola_log = queue.SimpleQueue()
+logger.addHandler(ManejadorCola(cola_log))
+escritor_log = QueueListener(cola_log, file_handler, console_handler, respect_handler_level=True)
+escritor_log.start()
+# Al salir (también en procesos hijo de multiprocessing) se vacía la cola
+util.Finalize(escritor_log, escritor_log.stop, exitpriority=10)
+
+
+# -----------------------------------------------------------------------------
+# Categorías de la ruta caliente
+# -----------------------------------------------------------------------------
+_config = None
+CANALES = []
+
+
+def _parametros():
+    # config importa (indirectamente) este módulo: se lee al primer uso
+    global _config
+    if _config is None:
+        from . import config
+        _config = config
+    return _config
+
+
+class CanalLog:
+    """
+    Registro de una categoría de la ruta caliente ("mensajes", "ofertas",
+    "ventas", "surtido", "metricas"). Antes de formatear nada comprueba:
+    • LOG_RUTA_CALIENTE: False lo apaga del todo (benchmarks).
+    • El nivel del agente o de la categoría en NIVELES_LOG.
+    • El muestreo: como mucho MUESTREO_LOG[categoria] registros por segundo
+      de simulación (con --tiempo-virtual, del reloj virtual: un segundo
+      simulado no se queda con el cupo de un segundo de pared); los que
+      sobran se cuentan y se anota cuántos se omitieron.
+
+    Los mensajes usan el estilo de argumentos de logging (``%s``), con el id
+    del agente como primer argumento: "[agente] mensaje". Los argumentos
+    deben ser inmutables (ids, contadores) para que se formateen en el hilo
+    escritor; ManejadorCola compone en el acto si recibe un dict o un JID.
+    """
+
+    def __init__(self, categoria):
+        self.categoria = categoria
+        self.logger = logging.getLogger(f"simulacion.{categoria}")
+        self.niveles = {}        # { agente: nivel } ya resuelto
+        self._niveles_de = None  # NIVELES_LOG con el que se resolvió
+        self.segundo = None
+        self.emitidos = 0
+        self.omitidos = 0
+        self.omitidos_total = 0
+        CANALES.append(self)
+
+    def nivel(self, agente):
+        niveles = _parametros().NIVELES_LOG
+        if niveles is not self._niveles_de:
+            self.niveles, self._niveles_de = {}, niveles
+        nivel = self.niveles.get(agente)
+        if nivel is None:
+            nivel = niveles.get(agente, niveles.get(self.categoria, logging.INFO))
+            if isinstance(nivel, str):
+                nivel = logging.getLevelName(nivel.upper())
+            self.niveles[agente] = nivel
+        return nivel
+
+    def log(self, nivel, agente, msg, *args):
+        config = _config or _parametros()
+        if not config.LOG_RUTA_CALIENTE or nivel < self.nivel(agente):
+            return
+        limite = config.MUESTREO_LOG.get(self.categoria)
+        if limite:
+            segundo = int(segundos())
+            if segundo != self.segundo:
+                if self.omitidos:
+                    self.logger.info(
+                        "[%s] %d registros omitidos por muestreo", self.categoria, self.omitidos
+                    )
+                self.segundo, self.emitidos, self.omitidos = segundo, 0, 0
+            if self.emitidos >= limite:
+                self.omitidos += 1
+                self.omitidos_total += 1
+                return
+            self.emitidos += 1
+        self.logger.log(nivel, "[%s] " + msg, agente, *args)
+
+    def info(self, agente, msg, *args):
+        self.log(logging.INFO, agente, msg, *args)
+
+
+def registrar_omitidos():
+    """Anota cuántos registros ha omitido el muestreo de cada categoría."""
+    for canal in CANALES:
+        if canal.omitidos_total:
+            logging.info(
+                f"Log {canal.categoria}: {canal.omitidos_total} registros omitidos por muestreo"
+            )
+
+
+log_mensajes = CanalLog("mensajes")  # Mensajes recibidos por los supermercados
+log_ofertas = CanalLog("ofertas")    # Ofertas enviadas, publicadas y recibidas
+log_ventas = CanalLog("ventas")      # Compras, ventas y lotes de ventas
+log_surtido = CanalLog("surtido")    # Rotaciones y cambios de variedades
+log_metricas = CanalLog("metricas")  # Métricas entre supermercados inteligentes
@@ -8,6 +8,7 @@ Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICE
 en la raíz del repositorio.
 """
 import nest_asyncio
+import argparse
 import asyncio
 import random
 import math
@@ -26,6 +27,17 @@ from .config import *
 from .Agentes.supermercado_inteligente import SupermercadoInteligente
 from .Agentes.supermercado import SupermercadoAgent
 from .Agentes.cliente import ClienteAgent
+from .Agentes.despacho import resumen_despacho
+from .BDI.Planes import sumar_cuentas
+from .transporte import TRANSPORTES, crear_transporte
+from .particiones import CoordinadorParticiones, aplicar_config, parametros_config
+from .instantaneas import GestorInstantaneas, cargar_instantanea, restaurar_globales
+from .aleatorio import fijar_semilla
+from .eventos import abrir_registro, cerrar_registro, reconstruir, registrar_evento
+from .orquestacion import detener_todos, iniciar_todos
+from .logger import registrar_omitidos
+from .registros import abrir_registros, comprobar_referencia, es_referencia, referencia, trozos_de
+from .reloj import ejecutar, fijar_inicio
 from matplotlib.lines import Line2D
 
 
@@ -44,14 +56,44 @@ if not os.path.exists(capturas_path):
 
 
 
-###############################################################################
-# Agente Supermercado (normal)
-###############################################################################
-async def iniciar_cliente(cliente):
-    await cliente.start()
+async def main(transporte_nombre=TRANSPORTE, procesos=PROCESOS_CLIENTES, semilla=None,
+               reanudar=None):
+    # Reanudación: se continúa con la configuración y la semilla de la instantánea
+    instantanea = None
+    if reanudar:
+        instantanea = cargar_instantanea(reanudar)
+        aplicar_config(instantanea["config"])
+        semilla = instantanea["semilla"]
 
-
-async def main():
+    # Semilla de la simulación y registro de eventos para reproducirla. Con
+    # reloj virtual la hora también es fija: se continúa la de la instantánea
+    semilla = fijar_semilla(semilla)
+    fijar_inicio(
+        instantanea["momento"] if instantanea
+        else datetime.fromisoformat(INICIO_TIEMPO_VIRTUAL)
+    )
+    if REGISTRO_EVENTOS:
+        # Con las decisiones por trozos en disco, el registro solo guarda dónde están
+        abrir_registro(
+            REGISTRO_EVENTOS,
+            instantanea["eventos"] if instantanea else None,
+            mensajes=REGISTRAR_MENSAJES,
+            decisiones=not DIRECTORIO_REGISTROS,
+        )
+    abrir_registros(limpiar=instantanea is None)
+    if instantanea is None:
+        registrar_evento("inicio", semilla=semilla, config=parametros_config())
+    logging.info(f"Semilla de la simulación: {semilla}")
+
+    # Con varios procesos los supermercados viven aquí y los clientes en hijos
+    particiones = None
+    if procesos > 1:
+        particiones = CoordinadorParticiones(procesos)
+        transporte = particiones.transporte
+    else:
+        transporte = crear_transporte(transporte_nombre)
+    inicio = datetime.now()
+    logging.info(f"Transporte de mensajes: {transporte.nombre}")
     contador = 0
     indice_cuenta = 0
     indice_cuenta_cliente = 0
@@ -69,6 +111,7 @@ async def main():
             modo_adaptativo=adaptativo,
             peer_smart_jids=[]   # se rellena justo después
         )
+        transporte.registrar(smart)
         smart_supermercados.append(smart)
 
     # Obtener lista de bare jids de todos los inteligentes
@@ -77,12 +120,10 @@ async def main():
         # La primera vez lo inicializaste vacío,
         # ahora sí le metes la lista real
         s.peer_smart_jids = [jid for jid in smart_jids if jid != s.jid]
+        s.creencias.actualizar("peer_smart_jids", s.peer_smart_jids)
 
-   
-
-    # Arrancar todos los inteligentes y añadir sus jids al vector global
+    # Añadir los jids de los inteligentes al vector global
     for s in smart_supermercados:
-        await s.start()
         supermercados_jids.append(s.jid)
 
     # ——— Crear supermercados normales como antes ———
@@ -95,78 +136,279 @@ async def main():
             # ahora poder smart_supermercados si quieres que reciban todos
             smart_jids ,  # <─ ajusta según convenga
         )
+        transporte.registrar(sup)
         supermercados.append(sup)
         supermercados_jids.append(sup.full_jid)
         contador += 1
         if contador % 20 == 0:
             indice_cuenta = (indice_cuenta + 1) % len(USUARIO_JID_SUPER)
 
-    # Clientes
-    clientes = []
+    # Clientes: (jid, contraseña, id) de cada uno
+    especificaciones = []
     for i in range(NUM_CLIENTES):
-        cli = ClienteAgent(
+        especificaciones.append((
             USUARIO_JID_CLIENTE[indice_cuenta_cliente],
             PASSWORD_CLIENTE[indice_cuenta_cliente],
             f"CLIENTE_{i + 1}",
-            supermercados_jids,
-            possible_products
-        )
-        clientes.append(cli)
+        ))
         contador += 1
         if contador % 20 == 0:
             indice_cuenta_cliente = (
                 indice_cuenta_cliente + 1) % len(USUARIO_JID_CLIENTE)
 
-    # Iniciar agentes
-    
-    for sup in supermercados:
-        await sup.start()
-    tareas = [asyncio.ensure_future(iniciar_cliente(cli)) for cli in clientes]
-    await asyncio.gather(*tareas)
+    clientes = []
+    if particiones is None:
+        for jid, password, cliente_id in especificaciones:
+            cli = ClienteAgent(
+                jid,
+                password,
+                cliente_id,
+                supermercados_jids,
+                possible_products
+            )
+            transporte.registrar(cli)
+            clientes.append(cli)
+
+    # Reanudación: estado de los agentes y estructuras globales
+    agentes = smart_supermercados + supermercados + clientes
+    if instantanea is not None:
+        for agente in agentes:
+            agente.restaurar(instantanea["agentes"][str(agente.jid)])
+        restaurar_globales(instantanea)
+
+    # Iniciar supermercados (inteligentes y normales) en paralelo. Es la
+    # barrera de arranque: ningún cliente arranca hasta que todos responden
+    await iniciar_todos(
+        transporte, smart_supermercados + supermercados,
+        ARRANQUES_SIMULTANEOS, TIMEOUT_ARRANQUE,
+    )
 
-    # Esperar finalización
-    while len(clients_finished) < NUM_CLIENTES:
-        await asyncio.sleep(1)
+    filas_remotas, despacho_remoto, sondeo_remoto, planes_remotos = [], [], [], []
+    if particiones is not None:
+        # Los procesos hijo crean y arrancan sus clientes; se espera a que acaben
+        particiones.lanzar(especificaciones, supermercados_jids)
+        try:
+            filas_remotas, despacho_remoto, sondeo_remoto, planes_remotos = await particiones.esperar()
+        except RuntimeError:
+            # Un proceso hijo murió: se detienen los supermercados antes de salir
+            await detener_todos(transporte, agentes, ARRANQUES_SIMULTANEOS, TIMEOUT_PARADA)
+            cerrar_registro()
+            raise
+    else:
+        await iniciar_todos(transporte, clientes, ARRANQUES_SIMULTANEOS, TIMEOUT_ARRANQUE)
+        if instantanea is not None:
+            for agente in agentes:
+                agente.reanudar()
+
+        # Instantáneas periódicas mientras dura la simulación
+        instantaneas = tarea_instantaneas = None
+        if INTERVALO_INSTANTANEAS:
+            instantaneas = GestorInstantaneas()
+            tarea_instantaneas = asyncio.ensure_future(instantaneas.periodicamente(agentes))
+
+        # Esperar finalización (se avisa al terminar el último cliente)
+        await clients_finished.esperar(NUM_CLIENTES)
+
+        if instantaneas is not None:
+            tarea_instantaneas.cancel()
+            instantaneas.cerrar()
 
     # Detener agentes
-    for smart in smart_supermercados:
-        await smart.stop()
-    for sup in supermercados:
-        await sup.stop()
-    for cli in clientes:
-        await cli.stop()
+    await detener_todos(transporte, agentes, ARRANQUES_SIMULTANEOS, TIMEOUT_PARADA)
+
+    # Contadores de mensajes por tipo (recibidos / procesados / descartados)
+    duracion = max((datetime.now() - inicio).total_seconds(), 1e-9)
+    for tipo, (recibidos, procesados, descartados) in sorted(
+        resumen_despacho(agentes, despacho_remoto).items(), key=lambda item: str(item[0])
+    ):
+        logging.info(
+            f"Despacho {tipo}: {recibidos} recibidos, {procesados} procesados, "
+            f"{descartados} descartados ({procesados / duracion:.1f} msg/s)"
+        )
+    # Ciclo de vida de los planes de los clientes
+    for plan, (iniciados, terminados, fallidos) in sorted(
+        sumar_cuentas([cli.planes.resumen() for cli in clientes] + planes_remotos).items()
+    ):
+        logging.info(
+            f"Plan {plan}: {iniciados} iniciados, {terminados} terminados, {fallidos} fallidos"
+        )
+    registrar_omitidos()
+    sondeo = None
+    if MODO_OFERTAS == "sondeo":
+        sondeo = registrar_resumen_sondeo(
+            [cli.sondeo.resumen() for cli in clientes] + sondeo_remoto
+        )
+    # Estado final para los informes (y para reproducirlos desde el registro)
+    estado = estado_final(smart_supermercados, supermercados, clientes, filas_remotas)
+    registrar_evento("final", estado=estado)
+    cerrar_registro()
+    exportar(estado, decisiones)
+
+    # JIDs de la simulación, para quien la lance desde código (p. ej. barrido.py)
+    return {
+        "inteligentes": [str(smart.jid) for smart in smart_supermercados],
+        "supermercados": [sup.full_jid for sup in supermercados],
+        "sondeo": sondeo,
+    }
+
+
+def registrar_resumen_sondeo(resumenes):
+    """Suma y anota en el log los contadores de sondeo de ofertas de los clientes."""
+    total = {
+        "enviadas": 0, "omitidas": 0, "compras": 0, "sin_sondear": 0,
+        "antiguedad_total": 0.0, "antiguedad_max": 0.0,
+    }
+    for resumen in resumenes:
+        for clave, valor in resumen.items():
+            if clave == "antiguedad_max":
+                total[clave] = max(total[clave], valor)
+            else:
+                total[clave] += valor
+    total["antiguedad_media"] = total.pop("antiguedad_total") / max(total["compras"], 1)
+    peticiones = max(total["enviadas"] + total["omitidas"], 1)
+    logging.info(
+        f"Sondeo de ofertas: {total['enviadas']} peticiones enviadas, "
+        f"{total['omitidas']} omitidas ({100 * total['omitidas'] / peticiones:.1f}% ahorradas); "
+        f"{total['sin_sondear']} de {total['compras']} compras con la oferta de un supermercado "
+        f"no sondeado en ese ciclo; antigüedad de la oferta ganadora: media "
+        f"{total['antiguedad_media']:.1f} s, máxima {total['antiguedad_max']:.1f} s"
+    )
+    return total
+
+
+def estado_final(smart_supermercados, supermercados, clientes, filas_remotas=()):
+    """
+    Datos de la simulación que necesitan los informes, sin objetos agente:
+    se guarda en el registro de eventos y basta para exportar más tarde.
+    """
+    estado = {
+        "inteligentes": [
+            {
+                "jid": str(smart.jid),
+                "fila": smart.fila_informe(),
+                "ventas_recibidas": smart.ventas_recibidas,
+            }
+            for smart in smart_supermercados
+        ],
+        "supermercados": [
+            {
+                "id": sup.supermercado_id,
+                "jid": sup.full_jid,
+                "fila": sup.fila_informe(),
+                "ventas_registradas": sup.ventas_registradas_hist,
+            }
+            for sup in supermercados
+        ],
+        "clientes": [cli.fila_informe() for cli in clientes] + list(filas_remotas),
+        "clientes_ubicaciones": clientes_ubicaciones,
+        "supermercados_ubicaciones": supermercados_ubicaciones,
+        "historial_creencias": historial_creencias,
+        # Registros por trozos: solo dónde están (ver registros.referencia)
+        "cambios_productos_log": referencia(cambios_productos_log),
+        "productos_inteligentes_log": referencia(productos_inteligentes_log),
+        "evaluacion_cambios_log": referencia(evaluacion_cambios_log),
+        "atraccion_eventos_log": referencia(atraccion_eventos_log),
+    }
+    if decisiones.directorio is not None:
+        # Las decisiones no van al registro de eventos (ver abrir_registro)
+        estado["decisiones"] = referencia(decisiones)
+    return estado
+
+
+def tabla_registro(registro):
+    """
+    DataFrame de un registro (RegistroTrozos, lista o referencia del estado
+    final), construido trozo a trozo.
+    """
+    partes = [pd.DataFrame(trozo) for trozo in trozos_de(registro) if trozo]
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+
+def tablas_decisiones(decisiones, columnas, con_huecos):
+    """
+    DataFrames de las decisiones, uno por trozo, con las mismas ``columnas``
+    en todos. Las columnas enteras con huecos (``con_huecos``) en alguna
+    decisión pasan a float en todos los trozos, como en una tabla única.
+    """
+    vacio = True
+    for trozo in trozos_de(decisiones):
+        if not trozo:
+            continue
+        df = pd.DataFrame(trozo).reindex(columns=columnas)
+        for columna in con_huecos:
+            if pd.api.types.is_integer_dtype(df[columna]):
+                df[columna] = df[columna].astype(float)
+        vacio = False
+        yield df
+    if vacio:
+        yield pd.DataFrame(columns=columnas)
+
+
+def exportar(estado, decisiones):
+    """
+    Genera plots, Excel y CSV a partir del estado final (ver estado_final)
+    y del registro de decisiones.
+    """
+    smart_supermercados = estado["inteligentes"]
+    supermercados = estado["supermercados"]
+    clientes_ubicaciones = estado["clientes_ubicaciones"]
+    supermercados_ubicaciones = estado["supermercados_ubicaciones"]
+    historial_creencias = estado["historial_creencias"]
+    cambios_productos_log = estado["cambios_productos_log"]
+    productos_inteligentes_log = estado["productos_inteligentes_log"]
+    evaluacion_cambios_log = estado["evaluacion_cambios_log"]
+    atraccion_eventos_log = estado["atraccion_eventos_log"]
+
     jid_alias = {}
 
     # Supermercados inteligentes
     for idx, smart in enumerate(smart_supermercados, start=1):
-        jid_alias[smart.jid] = f"SUPERMERCADO_SMART_{idx}"
+        jid_alias[smart["jid"]] = f"SUPERMERCADO_SMART_{idx}"
 
     # Supermercados “normales”
     for sup in supermercados:
-        jid_alias[sup.full_jid] = sup.supermercado_id
+        jid_alias[sup["jid"]] = sup["id"]
     # ——— Generar plots de decisiones ———
     jid_alias = {}
     smart_jids = set()
     for idx, smart in enumerate(smart_supermercados, start=1):
-        jid_alias[smart.jid] = f"SUPERMERCADO_SMART_{idx}"
-        smart_jids.add(smart.jid)
+        jid_alias[smart["jid"]] = f"SUPERMERCADO_SMART_{idx}"
+        smart_jids.add(smart["jid"])
     for sup in supermercados:
-        jid_alias[sup.full_jid] = sup.supermercado_id
+        jid_alias[sup["jid"]] = sup["id"]
 
     # ——— Generar plots de decisiones ———
+    # Las decisiones se recorren trozo a trozo: de cada compra solo se guarda
+    # (cliente, supermercado) para los plots y, si fue a un inteligente, el
+    # cliente para el bar plot; el Excel y el CSV se escriben por trozos
     purchase_plots = {}
-    for decision in decisiones:
-        if decision["accion"] in ("compra", "compra_indispensable"):
-            num = decision["numero_compra"]
-            purchase_plots.setdefault(num, []).append(decision)
+    clientes_smart = {}     # { numero_compra: clientes que compraron en un inteligente }
+    columnas = {}           # { columna: decisiones que la tienen }, en orden de aparición
+    con_huecos = set()      # columnas que faltan o son None en alguna decisión
+    total = 0
+    for trozo in trozos_de(decisiones):
+        total += len(trozo)
+        for decision in trozo:
+            for clave, valor in decision.items():
+                columnas[clave] = columnas.get(clave, 0) + 1
+                if valor is None:
+                    con_huecos.add(clave)
+            if decision["accion"] in ("compra", "compra_indispensable"):
+                num = decision["numero_compra"]
+                purchase_plots.setdefault(num, []).append(
+                    (decision["cliente_id"], decision["supermercado_elegido"])
+                )
+                if decision.get("supermercado_jid") in smart_jids:
+                    clientes_smart.setdefault(num, set()).add(decision["cliente_id"])
+    con_huecos.update(c for c, n in columnas.items() if n < total)
 
     for num, decs in purchase_plots.items():
         plt.figure(figsize=(10, 10))
 
         # Dibujado de puntos y flechas
-        for d in decs:
-            cid = d["cliente_id"]
-            sid = d["supermercado_elegido"]
+        for cid, sid in decs:
             if cid in clientes_ubicaciones and sid in supermercados_ubicaciones:
                 c_loc = clientes_ubicaciones[cid]
                 s_loc = supermercados_ubicaciones[sid]
@@ -221,44 +463,18 @@ async def main():
         plt.close()
         logging.info(f"Plot compra #{num} guardado en: {path}")
     # ——— Exportar a Excel ———
-    df_decisiones = pd.DataFrame(decisiones)
-
     # Clientes y supermercados normales
     df_agentes = pd.DataFrame(
-        [{
-            "Tipo": "Cliente",
-            "ID": cli.cliente_id,
-            "Ubicacion": str(cli.ubicacion),
-            "Creencias": str(cli.creencias.data),
-            "Deseos": ", ".join(str(d) for d in cli.desires),
-            "Hora de creacion": cli.creation_time.strftime("%Y-%m-%d %H:%M:%S")
-        } for cli in clientes] +
-        [{
-            "Tipo": "Supermercado",
-            "ID": sup.supermercado_id,
-            "Ubicacion": str(supermercados_ubicaciones[sup.supermercado_id]),
-            "Creencias": str(sup.creencias.data),
-            "Deseos": ", ".join(str(d) for d in sup.desires),
-            "Hora de creacion": sup.creation_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "Ventas registradas": str(sup.ventas_registradas_hist)
-        } for sup in supermercados] +
-        # ahora múltiples inteligentes
-        [{
-            "Tipo": "SupermercadoInteligente",
-            "ID": smart.jid,
-            "Ubicacion": str(smart.creencias.obtener("ubicacion")),
-            "Creencias": str(smart.creencias.data),
-            "Deseos": ", ".join(str(d) for d in smart.desires),
-            "Hora de creacion": smart.creation_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "Ventas recibidas": str(smart.ventas_recibidas)
-        } for smart in smart_supermercados]
+        estado["clientes"] +
+        [sup["fila"] for sup in supermercados] +
+        [smart["fila"] for smart in smart_supermercados]
     )
 
     df_creencias = pd.DataFrame(historial_creencias)
 
     # Ventas registradas normales
     ventas_dict = {
-        sup.supermercado_id: [json.dumps(v) for v in sup.ventas_registradas_hist]
+        sup["id"]: [json.dumps(v) for v in sup["ventas_registradas"]]
         for sup in supermercados
     }
     max_len = max((len(v) for v in ventas_dict.values()), default=0)
@@ -269,20 +485,35 @@ async def main():
     # Ventas recibidas por inteligentes (todos)
     df_inteligentes = pd.concat([
         pd.DataFrame({
-            "SupermercadoInteligente": [smart.jid] * len(smart.ventas_recibidas),
-            "Ventas recibidas": [json.dumps(v) for v in smart.ventas_recibidas]
+            "SupermercadoInteligente": [smart["jid"]] * len(smart["ventas_recibidas"]),
+            "Ventas recibidas": [json.dumps(v) for v in smart["ventas_recibidas"]]
         })
         for smart in smart_supermercados
     ], ignore_index=True)
 
-    df_cambios = pd.DataFrame(cambios_productos_log) if cambios_productos_log else pd.DataFrame()
-    df_prod_int = pd.DataFrame(productos_inteligentes_log) if productos_inteligentes_log else pd.DataFrame()
-    df_eval     = pd.DataFrame(evaluacion_cambios_log)     if evaluacion_cambios_log else pd.DataFrame()
-    df_atraccion = pd.DataFrame(atraccion_eventos_log)
+    df_cambios = tabla_registro(cambios_productos_log)
+    df_prod_int = tabla_registro(productos_inteligentes_log)
+    df_eval     = tabla_registro(evaluacion_cambios_log)
+    df_atraccion = tabla_registro(atraccion_eventos_log)
     
+    csv_folder = os.path.join(os.getcwd(), "csv's")
+    if not os.path.exists(csv_folder):
+        os.makedirs(csv_folder)
+    csv_path_decisiones = os.path.join(csv_folder, "decisiones.csv")
+
     excel_path = os.path.join(os.getcwd(), "Resultados_simulacion.xlsx")
     with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-        df_decisiones.to_excel(writer, sheet_name="Decisiones", index=False)
+        # Decisiones (siempre existe): hoja y CSV trozo a trozo
+        fila = 0
+        for df_trozo in tablas_decisiones(decisiones, list(columnas), con_huecos):
+            df_trozo.to_excel(
+                writer, sheet_name="Decisiones", index=False, startrow=fila, header=fila == 0
+            )
+            df_trozo.to_csv(
+                csv_path_decisiones, index=False, mode="a" if fila else "w", header=fila == 0
+            )
+            fila += len(df_trozo) + (fila == 0)
+        logging.info(f"CSV 'decisiones.csv' guardado en: {csv_path_decisiones}")
         df_agentes.to_excel(writer,   sheet_name="Agentes",      index=False)
         df_ventas.to_excel(writer,    sheet_name="Ventas Registradas",  index=False)
         df_inteligentes.to_excel(writer, sheet_name="Ventas Inteligentes", index=False)
@@ -294,17 +525,12 @@ async def main():
         if not df_atraccion.empty:
             df_atraccion.to_excel(writer, sheet_name="Atraccion_Clientes", index=False)
         # ——— Bar plot para todos los supermercados inteligentes ———
-        df_purchases = df_decisiones[df_decisiones['accion'].isin(['compra', 'compra_indispensable'])]
-
-        # Filtrar solo supermercados inteligentes
-        df_purchases_smart = df_purchases[df_purchases['supermercado_jid'].isin([smart.jid for smart in smart_supermercados])]
-
-        # Contar clientes únicos por ronda
-        counts_total = df_purchases_smart.groupby('numero_compra')['cliente_id'].nunique()
+        # Clientes únicos por ronda en supermercados inteligentes
+        counts_total = {num: len(clientes) for num, clientes in clientes_smart.items()}
 
         # Obtener primera y última ronda
         first_total = counts_total.get(1, 0)
-        last_round_total = int(counts_total.index.max()) if not counts_total.empty else 1
+        last_round_total = int(max(counts_total)) if counts_total else 1
         last_total = counts_total.get(last_round_total, 0)
 
         fig, ax = plt.subplots(figsize=(8, 5))
@@ -331,21 +557,13 @@ async def main():
         plt.close()
 
         logging.info(f"Bar plot total visitas supermercados inteligentes guardado en: {bar_path}")
-        csv_folder = os.path.join(os.getcwd(), "csv's")
-    if not os.path.exists(csv_folder):
-        os.makedirs(csv_folder)
-
-    #Decisiones (siempre existe)
-    csv_path_decisiones = os.path.join(csv_folder, "decisiones.csv")
-    df_decisiones.to_csv(csv_path_decisiones, index=False)
-    logging.info(f"CSV 'decisiones.csv' guardado en: {csv_path_decisiones}")
 
     # Agentes (siempre existe)
     csv_path_agentes = os.path.join(csv_folder, "agentes.csv")
     df_agentes.to_csv(csv_path_agentes, index=False)
     logging.info(f"CSV 'agentes.csv' guardado en: {csv_path_agentes}")
 
-    # Cambios de Creencias (aunque casi siempre vacío, mantenemos la misma lógica que al exportar la hoja)
+    # Cambios de Creencias (vacío salvo con DIARIO_CREENCIAS activado)
     csv_path_creencias = os.path.join(csv_folder, "cambios_de_creencias.csv")
     df_creencias.to_csv(csv_path_creencias, index=False)
     logging.info(f"CSV 'cambios_de_creencias.csv' guardado en: {csv_path_creencias}")
@@ -371,5 +589,86 @@ async def main():
         csv_path_reevaluacion = os.path.join(csv_folder, "reevaluacion.csv")
         df_eval.to_csv(csv_path_reevaluacion, index=False)
         logging.info(f"CSV 'reevaluacion.csv' guardado en: {csv_path_reevaluacion}")
+
+
+def reproducir(ruta):
+    """
+    Regenera los informes de una simulación a partir de su registro de
+    eventos, sin volver a ejecutar los agentes.
+    """
+    inicio, decisiones_registradas, estado = reconstruir(ruta)
+    if estado is None:
+        raise ValueError(f"El registro {ruta} no tiene estado final (¿simulación interrumpida?)")
+    semilla = inicio.get("semilla") if inicio else None
+    # Si se escribieron por trozos, el estado final indica dónde están; se
+    # comprueba que siguen ahí y que no son de otra ejecución antes de exportar
+    decisiones_registradas = estado.get("decisiones", decisiones_registradas)
+    for valor in estado.values():
+        if es_referencia(valor):
+            comprobar_referencia(valor)
+    total = (
+        decisiones_registradas["registros"]
+        if isinstance(decisiones_registradas, dict) else len(decisiones_registradas)
+    )
+    logging.info(f"Reproduciendo {ruta}: semilla {semilla}, {total} decisiones")
+    exportar(estado, decisiones_registradas)
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Simulación de supermercados con agentes BDI")
+    parser.add_argument(
+        "--transporte",
+        choices=sorted(TRANSPORTES),
+        default=TRANSPORTE,
+        help="Transporte de mensajes: 'xmpp' (servidor real) o 'local' (bus en memoria)",
+    )
+    parser.add_argument(
+        "--tiempo-virtual",
+        action="store_true",
+        default=TIEMPO_VIRTUAL,
+        help="Reloj simulado: el tiempo salta al siguiente evento (requiere --transporte local)",
+    )
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=PROCESOS_CLIENTES,
+        help="Número de procesos entre los que repartir los clientes (requiere --transporte local)",
+    )
+    parser.add_argument(
+        "--semilla",
+        type=int,
+        default=SEMILLA,
+        help="Semilla de los generadores aleatorios (por defecto, una al azar que queda en el log)",
+    )
+    parser.add_argument(
+        "--reanudar", "--resume",
+        metavar="RUTA",
+        nargs="?",
+        const=DIRECTORIO_INSTANTANEAS,
+        default=None,
+        help="Continuar desde una instantánea (fichero, o la última de una carpeta; "
+             f"por defecto '{DIRECTORIO_INSTANTANEAS}')",
+    )
+    parser.add_argument(
+        "--reproducir",
+        metavar="RUTA",
+        default=None,
+        help="Regenerar los informes desde un registro de eventos sin ejecutar los agentes",
+    )
+    args = parser.parse_args()
+    if args.reproducir:
+        inicio_reproduccion = datetime.now()
+        reproducir(args.reproducir)
+        logging.info(
+            f"Informes regenerados en {(datetime.now() - inicio_reproduccion).total_seconds():.2f} s"
+        )
+        raise SystemExit
+    if args.tiempo_virtual and args.transporte != "local":
+        parser.error("--tiempo-virtual requiere --transporte local")
+    if args.procesos > 1 and (args.transporte != "local" or args.tiempo_virtual):
+        parser.error("--procesos > 1 requiere --transporte local y reloj real")
+    if args.reanudar and args.procesos > 1:
+        parser.error("--reanudar no admite --procesos > 1")
+    ejecutar(
+        main(args.transporte, args.procesos, args.semilla, args.reanudar),
+        virtual=args.tiempo_virtual,
+    )
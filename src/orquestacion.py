@@ -0,0 +1,134 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import asyncio
+
+from .logger import logging
+
+# -----------------------------------------------------------------------------
+# Arranque, finalización y parada de la simulación
+# -----------------------------------------------------------------------------
+# Con miles de agentes, arrancarlos y pararlos uno a uno (cada start() abre
+# una conexión XMPP) lleva minutos. Aquí se hacen en paralelo con un límite
+# de operaciones simultáneas (semáforo) y un timeout por agente. El fin de la
+# simulación lo señala Finalizados en cuanto termina el último cliente, sin
+# consultar la lista una vez por segundo.
+# Este módulo no importa config: config usa Finalizados.
+
+
+class Finalizados:
+    """
+    Conjunto de clientes que han terminado (``in``, ``add``, ``len``; añadir
+    dos veces el mismo cliente no tiene efecto) y una espera
+    ``await finalizados.esperar(n)`` que se cumple al llegar a ``n`` clientes.
+    ``append`` y ``extend`` se mantienen para quien lo trata como la lista
+    global de antes (p. ej. instantaneas.restaurar_globales).
+    """
+
+    def __init__(self, clientes=()):
+        self._clientes = dict.fromkeys(clientes)   # conserva el orden de llegada
+        self._esperas = []                        # [(n, futuro)]
+
+    def __contains__(self, cliente_id):
+        return cliente_id in self._clientes
+
+    def __len__(self):
+        return len(self._clientes)
+
+    def __iter__(self):
+        return iter(self._clientes)
+
+    def __repr__(self):
+        return f"Finalizados({list(self._clientes)})"
+
+    def __reduce__(self):
+        # Las esperas pertenecen a un bucle de eventos: no se copian
+        return Finalizados, (list(self._clientes),)
+
+    def add(self, cliente_id):
+        self._clientes[cliente_id] = None
+        self._avisar()
+
+    append = add
+
+    def extend(self, clientes):
+        self._clientes.update(dict.fromkeys(clientes))
+        self._avisar()
+
+    def clear(self):
+        self._clientes.clear()
+
+    def _avisar(self):
+        pendientes = []
+        for n, futuro in self._esperas:
+            if futuro.done():
+                continue
+            if len(self._clientes) >= n:
+                futuro.set_result(None)
+            else:
+                pendientes.append((n, futuro))
+        self._esperas = pendientes
+
+    async def esperar(self, n):
+        """Espera a que hayan terminado al menos ``n`` clientes."""
+        if len(self._clientes) >= n:
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperas.append((n, futuro))
+        await futuro
+
+
+async def _en_paralelo(operacion, agentes, limite, timeout, accion):
+    """
+    Aplica ``operacion(agente)`` a todos los agentes con como mucho ``limite``
+    a la vez y ``timeout`` segundos cada una.
+
+    Retorna:
+        list: agentes en los que falló o agotó el tiempo.
+    """
+    semaforo = asyncio.Semaphore(limite)
+
+    async def una(agente):
+        async with semaforo:
+            try:
+                await asyncio.wait_for(operacion(agente), timeout)
+            except Exception as exc:
+                logging.error(f"No se pudo {accion} {agente.jid}: {exc!r}")
+                return agente
+        return None
+
+    resultados = await asyncio.gather(*(una(agente) for agente in agentes))
+    return [agente for agente in resultados if agente is not None]
+
+
+async def iniciar_todos(transporte, agentes, limite, timeout):
+    """
+    Arranca ``agentes`` en paralelo y espera a que todos estén vivos:
+    al volver se les puede enviar mensajes. Lanza RuntimeError si alguno no
+    arrancó (sirve de barrera antes de arrancar a quien dependa de ellos).
+    """
+    fallidos = set(await _en_paralelo(transporte.iniciar, agentes, limite, timeout, "arrancar"))
+    fallidos.update(a for a in agentes if not a.is_alive())
+    if fallidos:
+        raise RuntimeError(
+            f"{len(fallidos)} agentes no arrancaron: "
+            + ", ".join(sorted(str(a.jid) for a in fallidos)[:10])
+        )
+    logging.info(f"{len(agentes)} agentes arrancados")
+
+
+async def detener_todos(transporte, agentes, limite, timeout):
+    """
+    Detiene ``agentes`` en paralelo. Un agente que no se detiene en
+    ``timeout`` segundos se anota y se abandona, sin bloquear al resto.
+    """
+    fallidos = await _en_paralelo(transporte.detener, agentes, limite, timeout, "detener")
+    if fallidos:
+        logging.warning(f"{len(fallidos)} agentes no se detuvieron a tiempo")
+    return fallidos
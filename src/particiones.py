@@ -0,0 +1,296 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import asyncio
+import heapq
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import threading
+
+from . import config
+from .eventos import registrar_decision, registrar_mensaje
+from .logger import logging, registrar_omitidos
+from .orquestacion import detener_todos, iniciar_todos
+from .registros import abrir_registros, carpeta_registros
+from .transporte import TransporteLocal
+
+# -----------------------------------------------------------------------------
+# Simulación repartida en varios procesos
+# -----------------------------------------------------------------------------
+# El proceso principal (partición 0) ejecuta todos los supermercados; los
+# clientes se reparten entre PROCESOS_CLIENTES procesos hijo, cada uno con su
+# propio bucle de eventos y su TransporteParticionado. Un mensaje cuyo destino
+# no vive en la partición se serializa (pickle) y viaja por la cola
+# (multiprocessing) de la partición destino, donde un hilo lector lo entrega
+# en el bus local.
+# Al terminar, cada hijo devuelve sus decisiones, ubicaciones y resúmenes, y
+# el principal los fusiona en las listas globales de config. Si un hijo muere
+# sin enviarlos (excepción, señal), el principal no lo espera indefinidamente:
+# vigila la salida de cada proceso y falla la simulación. Las decisiones de
+# cada hijo se escriben por trozos en su propia carpeta (particion_N dentro de
+# la de los registros, ver registros.carpeta_registros) y el hijo solo envía
+# la referencia.
+#
+# Los clientes solo hablan con supermercados, y todos viven en la partición
+# 0: cada mensaje entre procesos sale o llega al principal, que paga su
+# pickle, su cola y su entrega. Más procesos reparten el trabajo de los
+# clientes, pero el principal acota el caudal de mensajes (ver
+# benchmarks/particiones.py); repartir también los supermercados queda
+# fuera de este esquema.
+#
+# Los hijos no tienen registro de eventos. Con REGISTRAR_MENSAJES, el
+# principal anota como "mensaje" los que recibe (en el despachador de cada
+# supermercado) y los que reenvía a un hijo, así que el registro tiene todos
+# los mensajes de la simulación, aunque los de los clientes con la hora del
+# reenvío y no la de llegada.
+
+COORDINADOR = 0
+
+
+def parametros_config():
+    """Parámetros (MAYÚSCULAS) de config, para replicarlos en otro proceso."""
+    return {k: v for k, v in vars(config).items() if k.isupper()}
+
+
+def aplicar_config(parametros):
+    """
+    Aplica ``parametros`` a config y a los módulos ya cargados del paquete
+    que los importaron por nombre (``from .config import X``).
+    """
+    paquete = __name__.rsplit(".", 1)[0]
+    modulos = [
+        m for nombre, m in list(sys.modules.items())
+        if m is not None and (nombre == paquete or nombre.startswith(paquete + "."))
+    ]
+    for clave, valor in parametros.items():
+        for modulo in modulos:
+            if clave in vars(modulo):
+                setattr(modulo, clave, valor)
+
+
+class TransporteParticionado(TransporteLocal):
+    """
+    Bus en memoria de una partición: entrega en local si el destino vive
+    aquí y, si no, reenvía el mensaje a la cola de su partición.
+    """
+
+    nombre = "particionado"
+
+    def __init__(self, colas, particion_de):
+        super().__init__()
+        self.colas = colas                # { partición: multiprocessing.Queue }
+        self.particion_de = particion_de  # jid -> partición (o None)
+        self.reenviados = 0
+
+    def entregar(self, msg):
+        destino = str(msg.to)
+        if self.resolver(destino) is None:
+            particion = self.particion_de(destino)
+            if particion is not None:
+                if particion != COORDINADOR:
+                    # Su destinatario no registra eventos: se anota al salir
+                    registrar_mensaje(msg)
+                self.colas[particion].put(("msg", msg))
+                self.reenviados += 1
+                return
+        super().entregar(msg)
+
+    def entregar_remoto(self, msg):
+        super().entregar(msg)
+
+    def escuchar(self, cola, al_terminar=None):
+        """
+        Arranca un hilo que lee ``cola`` y entrega cada mensaje en el bucle
+        de eventos actual. Otros avisos se pasan a ``al_terminar``.
+        """
+        bucle = asyncio.get_running_loop()
+
+        def leer():
+            while True:
+                aviso = cola.get()
+                if aviso is None:
+                    return
+                try:
+                    if aviso[0] == "msg":
+                        bucle.call_soon_threadsafe(self.entregar_remoto, aviso[1])
+                    elif al_terminar is not None:
+                        bucle.call_soon_threadsafe(al_terminar, *aviso[1:])
+                except RuntimeError:
+                    # Bucle ya cerrado: la partición ha terminado y lo que
+                    # siga llegando (p. ej. respuestas tardías) se descarta
+                    return
+
+        hilo = threading.Thread(target=leer, daemon=True)
+        hilo.start()
+        return hilo
+
+
+def _proceso_clientes(indice, parametros, clientes, supermercados_jids, colas):
+    """Punto de entrada de un proceso hijo con una parte de los clientes."""
+    aplicar_config(parametros)
+    asyncio.run(_simular_clientes(indice, clientes, supermercados_jids, colas))
+
+
+async def _simular_clientes(indice, especificaciones, supermercados_jids, colas):
+    # Importación diferida: los agentes leen config al importarse
+    from .Agentes.cliente import ClienteAgent
+
+    if carpeta_registros():
+        abrir_registros(os.path.join(carpeta_registros(), f"particion_{indice}"))
+    transporte = TransporteParticionado(colas, lambda jid: COORDINADOR)
+    lector = transporte.escuchar(colas[indice])
+
+    clientes = []
+    for jid, password, cliente_id in especificaciones:
+        cli = ClienteAgent(jid, password, cliente_id, supermercados_jids, config.possible_products)
+        transporte.registrar(cli)
+        clientes.append(cli)
+    await iniciar_todos(transporte, clientes, config.ARRANQUES_SIMULTANEOS, config.TIMEOUT_ARRANQUE)
+
+    # En el hijo solo terminan sus propios clientes
+    await config.clients_finished.esperar(len(clientes))
+    await detener_todos(transporte, clientes, config.ARRANQUES_SIMULTANEOS, config.TIMEOUT_PARADA)
+
+    registrar_omitidos()
+    config.decisiones.vaciar()
+    colas[COORDINADOR].put(("fin", indice, {
+        "decisiones": config.decisiones,
+        "clients_finished": list(config.clients_finished),
+        "clientes_ubicaciones": dict(config.clientes_ubicaciones),
+        "historial_creencias": list(config.historial_creencias),
+        "filas_clientes": [cli.fila_informe() for cli in clientes],
+        "despacho": [cli.despachador.resumen() for cli in clientes],
+        "sondeo": [cli.sondeo.resumen() for cli in clientes],
+        "planes": [cli.planes.resumen() for cli in clientes],
+    }))
+    # Detiene el hilo lector antes de cerrar el bucle (lo que llegue después se descarta)
+    colas[indice].put(None)
+    await asyncio.to_thread(lector.join)
+
+
+class CoordinadorParticiones:
+    """
+    Lado del proceso principal: lanza los procesos de clientes, enruta hacia
+    ellos los mensajes de los supermercados y fusiona sus resultados.
+    """
+
+    def __init__(self, procesos):
+        self.procesos = procesos
+        self.contexto = multiprocessing.get_context("spawn")
+        self.colas = {
+            i: self.contexto.Queue() for i in range(procesos + 1)
+        }
+        self.particion_cliente = {}   # { jid completo del cliente: partición }
+        self.transporte = TransporteParticionado(self.colas, self.particion_cliente.get)
+        self.hijos = {}               # { partición: proceso }
+        self.resultados = {}
+        self._terminado = None
+
+    def repartir(self, especificaciones):
+        """Reparte (jid, password, cliente_id) en ``procesos`` particiones."""
+        reparto = {i: [] for i in range(1, self.procesos + 1)}
+        for n, (jid, password, cliente_id) in enumerate(especificaciones):
+            particion = 1 + n % self.procesos
+            reparto[particion].append((jid, password, cliente_id))
+            self.particion_cliente[f"{jid}/{cliente_id}"] = particion
+        return reparto
+
+    def lanzar(self, especificaciones, supermercados_jids):
+        """Arranca el hilo lector y un proceso por partición de clientes."""
+        self._terminado = asyncio.get_running_loop().create_future()
+        self.transporte.escuchar(self.colas[COORDINADOR], self._fin)
+        parametros = parametros_config()
+        for indice, clientes in self.repartir(especificaciones).items():
+            hijo = self.contexto.Process(
+                target=_proceso_clientes,
+                args=(indice, parametros, clientes, [str(j) for j in supermercados_jids], self.colas),
+                daemon=True,
+            )
+            hijo.start()
+            self.hijos[indice] = hijo
+        logging.info(
+            f"Simulación repartida: {len(especificaciones)} clientes en {self.procesos} procesos"
+        )
+
+    def _fin(self, indice, resultados):
+        self.resultados[indice] = resultados
+        if len(self.resultados) == self.procesos and not self._terminado.done():
+            self._terminado.set_result(None)
+
+    async def _vigilar(self):
+        """
+        Falla la espera si un proceso hijo termina con error (excepción o
+        señal): en ese caso nunca enviará sus resultados.
+        """
+        vivos = dict(self.hijos)
+        while vivos and not self._terminado.done():
+            listos = await asyncio.to_thread(
+                multiprocessing.connection.wait, [hijo.sentinel for hijo in vivos.values()]
+            )
+            for indice, hijo in list(vivos.items()):
+                if hijo.sentinel not in listos:
+                    continue
+                del vivos[indice]
+                hijo.join()
+                # Con código 0 el hijo ya puso sus resultados en la cola
+                if hijo.exitcode != 0 and not self._terminado.done():
+                    self._terminado.set_exception(RuntimeError(
+                        f"La partición {indice} terminó (código {hijo.exitcode}) "
+                        f"sin enviar sus resultados"
+                    ))
+
+    async def esperar(self):
+        """
+        Espera a que terminen todas las particiones y fusiona sus resultados
+        en config. Retorna (filas de clientes, resúmenes de despacho,
+        contadores de sondeo, cuentas de planes). Lanza RuntimeError si algún
+        proceso hijo termina con error; los demás se detienen.
+        """
+        vigilancia = asyncio.ensure_future(self._vigilar())
+        try:
+            await self._terminado
+        except RuntimeError:
+            for hijo in self.hijos.values():
+                if hijo.is_alive():
+                    hijo.terminate()
+            raise
+        finally:
+            vigilancia.cancel()
+            self.colas[COORDINADOR].put(None)
+        for hijo in self.hijos.values():
+            await asyncio.to_thread(hijo.join)
+        # Lo que quede en las colas de hijos ya terminados no se leerá nunca
+        for indice, cola in self.colas.items():
+            if indice != COORDINADOR:
+                cola.cancel_join_thread()
+
+        filas, despacho, sondeo, planes = [], [], [], []
+        decisiones = []
+        for indice in sorted(self.resultados):
+            resultado = self.resultados[indice]
+            decisiones.append(resultado["decisiones"])
+            config.clients_finished.extend(resultado["clients_finished"])
+            config.clientes_ubicaciones.update(resultado["clientes_ubicaciones"])
+            config.historial_creencias.extend(resultado["historial_creencias"])
+            filas.extend(resultado["filas_clientes"])
+            despacho.extend(resultado["despacho"])
+            sondeo.extend(resultado["sondeo"])
+            planes.extend(resultado["planes"])
+        # Los hijos no tienen registro de eventos: sus decisiones (todas las
+        # de la simulación) se anotan aquí, fusionadas por orden de tiempo
+        # (cada hijo ya las anotó en orden) sin cargarlas todas a la vez
+        for decision in heapq.merge(*decisiones, key=lambda d: d.get("timestamp", "")):
+            config.decisiones.append(decision)
+            registrar_decision(decision)
+        logging.info(
+            f"Mensajes entre procesos reenviados por el principal: {self.transporte.reenviados}"
+        )
+        return filas, despacho, sondeo, planes
@@ -0,0 +1,275 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import bisect
+import heapq
+import math
+
+from .config import (
+    WEIGHT_DISTANCE,
+    WEIGHT_ETHICAL,
+    possible_varieties,
+    predefined_ethics,
+)
+
+# -----------------------------------------------------------------------------
+# Puntuación de supermercados por cliente
+# -----------------------------------------------------------------------------
+# La puntuación de un supermercado para un cliente es
+#     peso_etico · Σ_{productos con stock} Σ_criterios pref[c] · valor[p, c]
+#   - peso_distancia · distancia
+# con los pesos normalizados por su suma (WEIGHT_ETHICAL, WEIGHT_DISTANCE).
+# Cada cliente precalcula la parte ética por variedad (TablaVariedades) y
+# mantiene sus ofertas puntuadas en un RankingSupermercados. Si la distancia
+# cuenta, la parte ética está acotada (TablaVariedades.cota) y el ranking no
+# puntúa los supermercados que, ni con la cota, superarían a los mejores.
+# La versión vectorizada con NumPy (todos los clientes contra todos los
+# supermercados a la vez) solo la usa benchmarks/puntuacion.py: está en
+# benchmarks/motor_vectorizado.py, fuera del camino de los agentes.
+
+# Orden fijo de los criterios éticos (el de predefined_ethics)
+CRITERIOS = list(next(iter(predefined_ethics.values())))
+CRITERIO_ID = {criterio: i for i, criterio in enumerate(CRITERIOS)}
+
+
+class TablaVariedades:
+    """
+    Puntuación ética de cada variedad para las preferencias de un cliente:
+    { variedad: Σ_criterios pref[c] · valor[variedad, c] }.
+
+    predefined_ethics es fijo y las preferencias de un cliente no cambian, así
+    que la tabla se calcula una vez y puntuar un supermercado se reduce a
+    sumar una entrada por producto con stock. ``vigente`` indica si sigue
+    valiendo para unas preferencias y el catálogo actual.
+    """
+
+    def __init__(self, valores_eticos):
+        self.valores_eticos = dict(valores_eticos)
+        self.catalogo = predefined_ethics
+        self.variedades = len(predefined_ethics)
+        self.puntuacion = {
+            variedad: self.puntuar_detalle(valores)
+            for variedad, valores in predefined_ethics.items()
+        }
+        # Máxima puntuación ética posible de un supermercado (una variedad
+        # por producto, o ninguna si todas restan); las variedades fuera de
+        # predefined_ethics no traen criterios y puntúan 0
+        self.cota = sum(
+            max([0] + [self.puntuacion[v] for v in variedades if v in self.puntuacion])
+            for variedades in possible_varieties.values()
+        )
+
+    def puntuar_detalle(self, detalle):
+        """Puntuación de un dict de criterios (variedades fuera de la tabla)."""
+        return sum(
+            self.valores_eticos.get(criterio, 0) * valor
+            for criterio, valor in detalle.items()
+            if criterio in CRITERIO_ID
+        )
+
+    def vigente(self, valores_eticos):
+        return (
+            valores_eticos == self.valores_eticos
+            and self.catalogo is predefined_ethics
+            and self.variedades == len(predefined_ethics)
+        )
+
+    def puntuacion_etica(self, productos):
+        """Suma de las puntuaciones de las variedades con stock de una oferta."""
+        total = 0
+        for det in productos.values():
+            if det.get("stock", 0) > 0:
+                puntuacion = self.puntuacion.get(det.get("variedad"))
+                total += self.puntuar_detalle(det) if puntuacion is None else puntuacion
+        return total
+
+
+def _distancia(ubicacion_cliente, data):
+    ubicacion = data.get("ubicacion", (0, 0))
+    return math.hypot(ubicacion_cliente[0] - ubicacion[0], ubicacion_cliente[1] - ubicacion[1])
+
+
+def puntuar_oferta(tabla_variedades, ubicacion_cliente, data, usar_ubicacion=True):
+    """Puntuación de la oferta ``data`` de un supermercado para un cliente."""
+    total = WEIGHT_ETHICAL + WEIGHT_DISTANCE
+    if total <= 0:
+        return 0
+    puntuacion = (WEIGHT_ETHICAL / total) * tabla_variedades.puntuacion_etica(
+        data.get("productos", {})
+    )
+    if WEIGHT_DISTANCE and usar_ubicacion:
+        puntuacion -= (WEIGHT_DISTANCE / total) * _distancia(ubicacion_cliente, data)
+    return puntuacion
+
+
+def cota_oferta(tabla_variedades, ubicacion_cliente, data, usar_ubicacion=True):
+    """
+    Puntuación máxima que puede tener la oferta ``data``, sin mirar sus
+    productos: la cota ética menos la distancia. Sin distancia no acota nada
+    (infinito).
+    """
+    total = WEIGHT_ETHICAL + WEIGHT_DISTANCE
+    if total <= 0 or not WEIGHT_DISTANCE or not usar_ubicacion:
+        return math.inf
+    return (
+        (WEIGHT_ETHICAL / total) * tabla_variedades.cota
+        - (WEIGHT_DISTANCE / total) * _distancia(ubicacion_cliente, data)
+        + 1e-9  # margen por el redondeo de la suma de puntuar_oferta
+    )
+
+
+class RankingSupermercados:
+    """
+    Puntuaciones de las ofertas que conoce un cliente y un montículo de
+    máximos para saber el mejor supermercado sin recorrerlas todas.
+
+    Solo se repuntúan las ofertas marcadas desde la última consulta (llegada,
+    delta o stock gastado en una compra, ``marcar``) y se retiran las que
+    caducan (``quitar``); el coste de decidir depende de cuántas ofertas
+    cambian y no del número de supermercados. Las entradas obsoletas del
+    montículo se descartan al llegar a la cima.
+
+    Si la distancia cuenta, una oferta nueva no se puntúa al llegar: entra en
+    un segundo montículo ordenado por su cota (cota_oferta, que solo depende
+    de dónde está el supermercado) y se puntúa cuando esa cota podría ganar
+    a la mejor puntuada (a la k-ésima en ``mejores(k)``). Los supermercados
+    lejanos que no pueden ganar no se puntúan nunca; como la cota no depende
+    de los productos, sus cambios de oferta tampoco cuestan nada. Sin
+    distancia la cota es infinita y se puntúan todas, como antes.
+    """
+
+    def __init__(self):
+        self.entradas = {}        # { jid: (puntuación, orden de llegada) }
+        self.monticulo = []       # [(-puntuación, orden, jid)]
+        self.sin_puntuar = {}     # { jid: orden de llegada } ofertas podadas
+        self.cotas = []           # [(-cota, orden, jid)] de las sin puntuar
+        self.pendientes = {}      # jids por repuntuar, en orden de llegada
+        self.contador = 0
+        self.tabla = None
+        self.consulta = None      # (tabla, ubicación, ofertas, usar_ubicacion) de la última
+        self.puntuadas = 0        # ofertas puntuadas desde el principio
+
+    def marcar(self, *jids):
+        """La oferta de ``jids`` ha llegado o cambiado: se repuntúa al consultar."""
+        for jid in jids:
+            self.pendientes[jid] = None
+
+    def quitar(self, jid):
+        """La oferta de ``jid`` ha caducado."""
+        self.entradas.pop(jid, None)
+        self.sin_puntuar.pop(jid, None)
+        self.pendientes.pop(jid, None)
+
+    def invalidar(self):
+        """Repuntúa todo en la próxima consulta (p. ej. si cambian las preferencias)."""
+        self.entradas.clear()
+        self.monticulo.clear()
+        self.sin_puntuar.clear()
+        self.cotas.clear()
+        self.pendientes.clear()
+        self.tabla = None
+
+    def conocidas(self):
+        return len(self.entradas) + len(self.sin_puntuar)
+
+    def mejor(self, tabla_variedades, ubicacion_cliente, ofertas, usar_ubicacion=True):
+        """
+        Mejor supermercado de ``ofertas`` (en empate, el que llegó antes,
+        igual que recorrerlas en orden). Retorna su JID, o None si no hay.
+        """
+        if tabla_variedades is not self.tabla or self.conocidas() > len(ofertas):
+            self.invalidar()
+            self.tabla = tabla_variedades
+        self.consulta = (tabla_variedades, ubicacion_cliente, ofertas, usar_ubicacion)
+        if not self.conocidas():
+            self.pendientes = dict.fromkeys(ofertas)
+        for jid in self.pendientes:
+            if jid not in ofertas:
+                self.entradas.pop(jid, None)
+                self.sin_puntuar.pop(jid, None)
+            elif jid in self.entradas:
+                self._puntuar(jid, self.entradas[jid][1])
+            elif jid not in self.sin_puntuar:
+                # Nueva: se puntuará cuando su cota pueda ganar
+                self.contador += 1
+                self.sin_puntuar[jid] = self.contador
+                cota = cota_oferta(tabla_variedades, ubicacion_cliente, ofertas[jid],
+                                   usar_ubicacion)
+                heapq.heappush(self.cotas, (-cota, self.contador, jid))
+        self.pendientes.clear()
+        if self.conocidas() != len(ofertas):
+            # Alguna oferta cambió sin avisar: se reconstruye desde cero
+            self.invalidar()
+            return self.mejor(tabla_variedades, ubicacion_cliente, ofertas, usar_ubicacion)
+
+        self._completar(1)
+        if len(self.monticulo) > 4 * len(self.entradas) + 16:
+            self.monticulo = [(-p, o, j) for j, (p, o) in self.entradas.items()]
+            heapq.heapify(self.monticulo)
+        if len(self.cotas) > 4 * len(self.sin_puntuar) + 16:
+            self.cotas = [(c, o, j) for c, o, j in self.cotas if self.sin_puntuar.get(j) == o]
+            heapq.heapify(self.cotas)
+        cima = self._cima()
+        return self.monticulo[0][2] if cima is not None else None
+
+    def mejores(self, k):
+        """
+        JIDs de los ``k`` supermercados mejor puntuados en la última consulta
+        de ``mejor`` (mismo desempate), de mejor a peor.
+        """
+        if self.consulta is not None:
+            self._completar(k)
+        mejores = heapq.nsmallest(
+            k, self.entradas.items(), key=lambda e: (-e[1][0], e[1][1])
+        )
+        return [jid for jid, _ in mejores]
+
+    def _puntuar(self, jid, orden):
+        tabla_variedades, ubicacion_cliente, ofertas, usar_ubicacion = self.consulta
+        puntuacion = puntuar_oferta(tabla_variedades, ubicacion_cliente, ofertas[jid],
+                                    usar_ubicacion)
+        self.entradas[jid] = (puntuacion, orden)
+        heapq.heappush(self.monticulo, (-puntuacion, orden, jid))
+        self.puntuadas += 1
+        return puntuacion
+
+    def _cima(self):
+        """(-puntuación, orden) de la mejor puntuada, o None; descarta las obsoletas."""
+        while self.monticulo:
+            puntuacion, orden, jid = self.monticulo[0]
+            if self.entradas.get(jid) == (-puntuacion, orden):
+                return puntuacion, orden
+            heapq.heappop(self.monticulo)
+        return None
+
+    def _completar(self, k):
+        """
+        Puntúa, de mayor a menor cota, las ofertas sin puntuar que aún podrían
+        quedar entre las ``k`` mejores; para en la primera que no puede.
+        """
+        ultimas = None
+        if k > 1:
+            ultimas = heapq.nsmallest(k, ((-p, o) for p, o in self.entradas.values()))
+        while self.cotas:
+            cota, orden, jid = self.cotas[0]
+            if self.sin_puntuar.get(jid) != orden:
+                heapq.heappop(self.cotas)   # ya puntuada o retirada
+                continue
+            if ultimas is None:
+                umbral = self._cima()
+            else:
+                umbral = ultimas[-1] if len(ultimas) == k else None
+            if umbral is not None and (cota, orden) > umbral:
+                break
+            heapq.heappop(self.cotas)
+            del self.sin_puntuar[jid]
+            puntuacion = self._puntuar(jid, orden)
+            if ultimas is not None:
+                bisect.insort(ultimas, (-puntuacion, orden))
+                del ultimas[k:]
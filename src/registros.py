@@ -0,0 +1,378 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import heapq
+import itertools
+import os
+import pickle
+import re
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# Registros de la simulación escritos por trozos
+# -----------------------------------------------------------------------------
+# Las listas globales que crecen durante toda la simulación (decisiones y
+# registros de los inteligentes) son RegistroTrozos: cada REGISTROS_TROZO
+# registros, el trozo acumulado se entrega a un único hilo escritor, que lo
+# guarda (pickle) en <DIRECTORIO_REGISTROS>/<registro>/trozo_NNNNN.pkl, y se
+# libera de la memoria. Los informes finales los leen de nuevo trozo a trozo.
+# Los trozos no se modifican una vez escritos: una instantánea solo guarda
+# cuántos había y los registros aún en memoria.
+# Sin carpeta (DIRECTORIO_REGISTROS = None) todo se queda en memoria.
+#
+# Con registro de eventos, los trozos van junto a él, en <registro>.registros
+# (ver carpeta_registros): el estado final del registro solo dice dónde
+# están, y otra simulación con otro registro no debe pisarlos. Cada carpeta
+# de registro lleva además un identificador de la ejecución que la escribió;
+# las referencias lo guardan y trozos_de lo comprueba antes de leer.
+#
+# Cada cliente anota sus decisiones en un búfer propio (BuferRegistros), sin
+# cerrojo; el registro fusiona los búferes en orden (timestamp, secuencia)
+# cuando acumulan un trozo y siempre antes de que alguien lo lea.
+
+# Registros globales de config que se escriben por trozos
+REGISTROS = (
+    "decisiones",
+    "cambios_productos_log",
+    "productos_inteligentes_log",
+    "evaluacion_cambios_log",
+    "atraccion_eventos_log",
+)
+
+# Trozos de un registro en cola del escritor como máximo: si el disco no da
+# abasto, quien añade registros espera (la memoria sigue acotada)
+EN_COLA_MAXIMO = 4
+
+# Registros sin fusionar como máximo si el registro está en memoria
+SIN_FUSIONAR_MAXIMO = 10000
+
+_PATRON = re.compile(r"trozo_(\d+)\.pkl$")
+# Fichero con el identificador de la ejecución dueña de los trozos
+MARCA_EJECUCION = "ejecucion.txt"
+_escritor = None
+# Orden de llegada de los registros de todos los búferes del proceso
+_secuencia = itertools.count()
+
+
+def _escribir(ruta, registros):
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as archivo:
+        pickle.dump(registros, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+
+
+def _leer(ruta):
+    with open(ruta, "rb") as archivo:
+        return pickle.load(archivo)
+
+
+def _leer_marca(directorio):
+    try:
+        with open(os.path.join(directorio, MARCA_EJECUCION)) as archivo:
+            return archivo.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class RegistroTrozos:
+    """
+    Lista de solo añadido (``append``, ``extend``, ``len``, iteración) que
+    vuelca a disco un trozo cada ``por_trozo`` registros una vez abierta con
+    ``abrir``. Los registros no deben modificarse después de añadirlos: se
+    serializan más tarde, en el hilo escritor.
+
+    ``trozos()`` recorre el registro completo como listas de registros, sin
+    cargar más de un trozo a la vez.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.directorio = None   # None: todo en memoria
+        self.por_trozo = None
+        self.ejecucion = None    # identificador de la ejecución dueña de los trozos
+        self.escritos = 0        # trozos entregados al escritor
+        self.total = 0
+        self.pendientes = []     # registros aún no volcados
+        self.bufers = []         # BuferRegistros de los agentes
+        self.sueltos = []        # tandas de búferes de una instantánea, por fusionar
+        self.sin_fusionar = 0
+        self._en_cola = deque()
+
+    def abrir(self, directorio, por_trozo, limpiar=True):
+        """
+        Escribe los trozos en ``directorio``/<nombre>. Con ``limpiar`` (una
+        simulación nueva) borra los trozos de una ejecución anterior y anota
+        un identificador de ejecución nuevo; sin él (reanudación) conserva
+        el que haya.
+        """
+        self.directorio = os.path.abspath(os.path.join(directorio, self.nombre))
+        self.por_trozo = por_trozo
+        os.makedirs(self.directorio, exist_ok=True)
+        self.ejecucion = None if limpiar else _leer_marca(self.directorio)
+        if self.ejecucion is None:
+            self._borrar_desde(1)
+            self.escritos = 0
+            self.ejecucion = uuid.uuid4().hex
+            with open(os.path.join(self.directorio, MARCA_EJECUCION), "w") as archivo:
+                archivo.write(self.ejecucion)
+        self._volcar_si_lleno()
+
+    def append(self, registro):
+        self.pendientes.append(registro)
+        self.total += 1
+        self._volcar_si_lleno()
+
+    def extend(self, registros):
+        for registro in registros:
+            self.append(registro)
+
+    def bufer(self):
+        """Nuevo búfer propio de un agente, que se fusiona en este registro."""
+        bufer = BuferRegistros(self)
+        self.bufers.append(bufer)
+        return bufer
+
+    def fusionar(self):
+        """
+        Pasa al registro lo anotado en los búferes, en orden (timestamp,
+        secuencia): las decisiones de todos los agentes quedan intercaladas
+        como si se hubieran anotado en una única lista.
+        """
+        if not self.sin_fusionar:
+            return
+        tandas, self.sueltos = self.sueltos, []
+        for bufer in self.bufers:
+            if bufer.entradas:
+                tandas.append(bufer.entradas)
+                bufer.entradas = []
+        self.sin_fusionar = 0
+        for _, _, registro in heapq.merge(*tandas):
+            self.append(registro)
+
+    def _descartar_bufers(self):
+        for bufer in self.bufers:
+            bufer.entradas = []
+        self.sueltos = []
+        self.sin_fusionar = 0
+
+    def _volcar_si_lleno(self):
+        if self.directorio is not None and len(self.pendientes) >= self.por_trozo:
+            self._volcar()
+
+    def _volcar(self):
+        global _escritor
+        if _escritor is None:
+            _escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="registros")
+        lote, self.pendientes = self.pendientes, []
+        self.escritos += 1
+        self._en_cola.append(_escritor.submit(_escribir, self._ruta(self.escritos), lote))
+        while self._en_cola and (self._en_cola[0].done() or len(self._en_cola) > EN_COLA_MAXIMO):
+            self._en_cola.popleft().result()
+
+    def _esperar(self):
+        while self._en_cola:
+            self._en_cola.popleft().result()
+
+    def vaciar(self):
+        """Vuelca los registros pendientes como último trozo y espera al escritor."""
+        self.fusionar()
+        if self.directorio is not None and self.pendientes:
+            self._volcar()
+        self._esperar()
+
+    def _ruta(self, numero):
+        return os.path.join(self.directorio, f"trozo_{numero:05d}.pkl")
+
+    def _borrar_desde(self, numero):
+        for archivo in os.listdir(self.directorio):
+            coincidencia = _PATRON.match(archivo)
+            if coincidencia and int(coincidencia.group(1)) >= numero:
+                os.remove(os.path.join(self.directorio, archivo))
+
+    def trozos(self):
+        """Itera el registro como listas de registros, del más antiguo al último."""
+        self.fusionar()
+        self._esperar()
+        for numero in range(1, self.escritos + 1):
+            yield _leer(self._ruta(numero))
+        if self.pendientes:
+            yield list(self.pendientes)
+
+    def restaurar(self, otro):
+        """
+        Vuelve al estado de ``otro`` (el mismo registro leído de una
+        instantánea): descarta los trozos escritos después y lo que haya en
+        los búferes. Los trozos en disco deben ser de la misma ejecución.
+        """
+        if self.directorio is not None and getattr(otro, "ejecucion", None) not in (None, self.ejecucion):
+            raise ValueError(
+                f"Los trozos de {self.directorio} no son de la ejecución de la instantánea"
+            )
+        global _secuencia
+        self._descartar_bufers()
+        self._esperar()
+        self.escritos = otro.escritos
+        self.total = otro.total
+        self.pendientes = list(otro.pendientes)
+        self.sueltos = [list(tanda) for tanda in getattr(otro, "sueltos", [])]
+        self.sin_fusionar = sum(len(tanda) for tanda in self.sueltos)
+        # Los registros nuevos siguen la numeración de llegada de la instantánea
+        _secuencia = itertools.count(max(next(_secuencia), getattr(otro, "secuencia", 0)))
+        if self.directorio is not None:
+            self._borrar_desde(self.escritos + 1)
+            self._volcar_si_lleno()
+
+    def clear(self):
+        self._descartar_bufers()
+        self._esperar()
+        if self.directorio is not None:
+            self._borrar_desde(1)
+        self.escritos = 0
+        self.total = 0
+        self.pendientes = []
+
+    def __iter__(self):
+        for trozo in self.trozos():
+            yield from trozo
+
+    def __len__(self):
+        return self.total + self.sin_fusionar
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getstate__(self):
+        # Los búferes son de agentes vivos: se guardan sus registros como
+        # tandas sin fusionar (fusionar aquí cambiaría dónde se corta cada
+        # fusión y con ello el orden de los registros de igual timestamp) y
+        # la numeración de llegada. Los trozos en cola deben estar en disco
+        # antes de guardar la referencia
+        self._esperar()
+        estado = self.__dict__.copy()
+        estado["sueltos"] = self.sueltos + [list(b.entradas) for b in self.bufers if b.entradas]
+        estado["secuencia"] = next(_secuencia)   # solo cuenta el orden: el hueco no importa
+        estado["bufers"] = []
+        estado["_en_cola"] = deque()
+        return estado
+
+    def __repr__(self):
+        return f"RegistroTrozos({self.nombre!r}, {self.total} registros, {self.escritos} trozos)"
+
+
+class BuferRegistros:
+    """
+    Registros propios de un agente para un RegistroTrozos compartido. Se
+    añaden sin cerrojo, como (timestamp, secuencia, registro); el registro
+    los fusiona con los de los demás agentes (ver RegistroTrozos.fusionar)
+    al acumular un trozo entre todos o cuando alguien lo lee.
+    """
+
+    __slots__ = ("registro", "entradas")
+
+    def __init__(self, registro):
+        self.registro = registro
+        self.entradas = []
+
+    def append(self, entrada):
+        self.entradas.append((entrada.get("timestamp", ""), next(_secuencia), entrada))
+        registro = self.registro
+        registro.sin_fusionar += 1
+        if registro.sin_fusionar >= (registro.por_trozo or SIN_FUSIONAR_MAXIMO):
+            registro.fusionar()
+
+    def __len__(self):
+        return len(self.entradas)
+
+
+def carpeta_registros():
+    """
+    Carpeta de los registros por trozos de esta simulación (None: en
+    memoria). Con registro de eventos es <registro>.registros, junto a él;
+    si no, DIRECTORIO_REGISTROS.
+    """
+    from . import config
+
+    if not config.DIRECTORIO_REGISTROS:
+        return None
+    if config.REGISTRO_EVENTOS:
+        return os.path.splitext(config.REGISTRO_EVENTOS)[0] + ".registros"
+    return config.DIRECTORIO_REGISTROS
+
+
+def abrir_registros(directorio=None, limpiar=True):
+    """
+    Abre los REGISTROS de config en ``directorio`` (por defecto
+    carpeta_registros(); si es None se quedan en memoria).
+    """
+    from . import config
+
+    directorio = directorio or carpeta_registros()
+    if not directorio:
+        return
+    for nombre in REGISTROS:
+        getattr(config, nombre).abrir(directorio, config.REGISTROS_TROZO, limpiar)
+
+
+def referencia(registro):
+    """
+    Cómo se guarda un registro en el estado final: la lista de registros si
+    está en memoria o, si está en disco, dónde están sus trozos.
+    """
+    if registro.directorio is None:
+        return list(registro)
+    registro.vaciar()
+    return {
+        "directorio": registro.directorio,
+        "ejecucion": registro.ejecucion,
+        "trozos": registro.escritos,
+        "registros": len(registro),
+    }
+
+
+def es_referencia(valor):
+    return isinstance(valor, dict) and "directorio" in valor
+
+
+def comprobar_referencia(valor):
+    """
+    Comprueba que los trozos a los que apunta una referencia siguen en disco
+    y son de la ejecución que la guardó (no los ha sobrescrito otra).
+    """
+    directorio = valor["directorio"]
+    if not os.path.isdir(directorio):
+        raise ValueError(f"No existen los trozos de {directorio} (¿se borró la carpeta?)")
+    if _leer_marca(directorio) != valor.get("ejecucion"):
+        raise ValueError(
+            f"Los trozos de {directorio} son de otra ejecución: los sobrescribió una simulación posterior"
+        )
+    faltan = [
+        numero for numero in range(1, valor["trozos"] + 1)
+        if not os.path.exists(os.path.join(directorio, f"trozo_{numero:05d}.pkl"))
+    ]
+    if faltan:
+        raise ValueError(f"Faltan {len(faltan)} trozos en {directorio}")
+
+
+def trozos_de(valor):
+    """
+    Trozos (listas de registros) de un registro del estado final: un
+    RegistroTrozos, una lista o una referencia a trozos en disco (que se
+    comprueba antes de leer, ver comprobar_referencia).
+    """
+    if isinstance(valor, RegistroTrozos):
+        return valor.trozos()
+    if es_referencia(valor):
+        comprobar_referencia(valor)
+        return (
+            _leer(os.path.join(valor["directorio"], f"trozo_{numero:05d}.pkl"))
+            for numero in range(1, valor["trozos"] + 1)
+        )
+    return [valor] if valor else []
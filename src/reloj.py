@@ -0,0 +1,208 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import asyncio
+import datetime
+import heapq
+import itertools
+import selectors
+import time
+from datetime import timedelta
+
+from spade.behaviour import PeriodicBehaviour
+
+# -----------------------------------------------------------------------------
+# Reloj de la simulación
+# -----------------------------------------------------------------------------
+# En modo normal el reloj es el de pared. En modo de tiempo virtual la
+# simulación corre en un BucleVirtual: cuando no queda nada listo para
+# ejecutar, en lugar de dormir hasta el siguiente temporizador el reloj salta
+# directamente a él. Periodos, timeouts (asyncio.sleep, wait_for) y marcas de
+# tiempo (ahora()) leen todos ese reloj, así que una simulación de horas
+# termina en lo que tarda la CPU. El reloj virtual arranca en la hora de pared
+# hasta que main lo fija (fijar_inicio) en INICIO_TIEMPO_VIRTUAL, o en el
+# momento de la instantánea al reanudar. Los temporizadores que vencen en el
+# mismo instante se ejecutan en el orden en que se programaron, así que añadir
+# uno (p. ej. el de las instantáneas) no reordena los de los agentes.
+
+
+class _SelectorVirtual:
+    """
+    Envoltorio del selector real del bucle: si no hay E/S pendiente y el bucle
+    iba a esperar ``timeout`` segundos, avanza el reloj virtual en su lugar.
+    """
+
+    def __init__(self, bucle):
+        self._bucle = bucle
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        eventos = self._selector.select(0)
+        if eventos or timeout == 0:
+            return eventos
+        if timeout is None:
+            # Nada programado: solo puede despertarnos E/S real
+            return self._selector.select(None)
+        self._bucle.avanzar(timeout)
+        return []
+
+    def __getattr__(self, nombre):
+        # register, unregister, modify, get_key, get_map, close…
+        return getattr(self._selector, nombre)
+
+
+class _Temporizador(asyncio.TimerHandle):
+    """TimerHandle que, a igual vencimiento, se ordena por orden de creación."""
+
+    __slots__ = ("_orden",)
+
+    def __init__(self, orden, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._orden = orden
+
+    def __lt__(self, otro):
+        return (self._when, self._orden) < (otro._when, otro._orden)
+
+
+class BucleVirtual(asyncio.SelectorEventLoop):
+    """Bucle de eventos de asyncio con reloj simulado."""
+
+    def __init__(self):
+        self._segundos = 0.0
+        self.inicio = datetime.datetime.now()
+        self._orden = itertools.count()
+        super().__init__(_SelectorVirtual(self))
+
+    def call_at(self, when, callback, *args, context=None, primero=False):
+        # Como BaseEventLoop.call_at, pero el montículo de asyncio no es
+        # estable con vencimientos iguales: se desempata por orden de creación
+        # (``primero``: antes que todos los creados hasta ahora)
+        if when is None:
+            raise TypeError("when cannot be None")
+        self._check_closed()
+        orden = next(self._orden)
+        temporizador = _Temporizador(-orden if primero else orden, when, callback, args, self, context)
+        heapq.heappush(self._scheduled, temporizador)
+        temporizador._scheduled = True
+        return temporizador
+
+    def time(self):
+        return self._segundos
+
+    def avanzar(self, segundos):
+        self._segundos += segundos
+
+
+def _bucle_virtual():
+    try:
+        bucle = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return bucle if isinstance(bucle, BucleVirtual) else None
+
+
+def fijar_inicio(momento):
+    """
+    Con reloj virtual, hace que ahora() sea ``momento`` en este instante (el
+    reloj sigue avanzando desde ahí). Con reloj real no hace nada.
+    """
+    bucle = _bucle_virtual()
+    if bucle is not None:
+        bucle.inicio = momento - timedelta(seconds=bucle.time())
+
+
+def tiempo_virtual():
+    """True si la simulación está corriendo con reloj virtual."""
+    return _bucle_virtual() is not None
+
+
+def ahora():
+    """
+    Fecha y hora actuales de la simulación (sustituye a datetime.now()).
+    """
+    bucle = _bucle_virtual()
+    if bucle is None:
+        return datetime.datetime.now()
+    return bucle.inicio + timedelta(seconds=bucle.time())
+
+
+def segundos():
+    """
+    Segundos del reloj de la simulación (virtual o real) para medir
+    intervalos; fuera del bucle de eventos, time.monotonic().
+    """
+    try:
+        return asyncio.get_running_loop().time()
+    except RuntimeError:
+        return time.monotonic()
+
+
+async def dormir_primero(segundos):
+    """
+    asyncio.sleep(segundos) que, con reloj virtual, despierta antes que
+    cualquier otro temporizador del mismo instante: quien lo espera ve el
+    estado anterior a todo lo programado para ese momento.
+    """
+    bucle = _bucle_virtual()
+    if bucle is None:
+        await asyncio.sleep(segundos)
+        return
+    futuro = bucle.create_future()
+    temporizador = bucle.call_at(bucle.time() + segundos, _despertar, futuro, primero=True)
+    try:
+        await futuro
+    finally:
+        temporizador.cancel()
+
+
+def _despertar(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+async def en_hilo(funcion, *args):
+    """
+    Equivalente a asyncio.to_thread. Con reloj virtual la función se ejecuta
+    en línea: un hilo no avanza el reloj y el bucle saltaría tiempo mientras
+    lo espera.
+    """
+    if tiempo_virtual():
+        return funcion(*args)
+    return await asyncio.to_thread(funcion, *args)
+
+
+def ejecutar(corrutina, virtual=False):
+    """asyncio.run con reloj real o virtual."""
+    with asyncio.Runner(loop_factory=BucleVirtual if virtual else None) as runner:
+        return runner.run(corrutina)
+
+
+class ComportamientoPeriodico(PeriodicBehaviour):
+    """
+    PeriodicBehaviour de SPADE que programa sus activaciones con ahora()
+    en lugar del reloj de pared, para que funcione también en tiempo virtual.
+    """
+
+    def __init__(self, period, start_at=None):
+        super().__init__(period=period, start_at=start_at)
+        if not start_at:
+            self._next_activation = ahora()
+
+    async def _run(self):
+        if ahora() >= self._next_activation:
+            await self.run()
+            if self.period <= timedelta(seconds=0):
+                self._next_activation = ahora()
+            else:
+                while self._next_activation <= ahora():
+                    self._next_activation += self.period
+        else:
+            segundos = (self._next_activation - ahora()).total_seconds()
+            if segundos > 0:
+                await asyncio.sleep(segundos)
@@ -0,0 +1,121 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+from .logger import logging
+
+
+class TransporteXMPP:
+    """
+    Transporte por defecto: cada agente se conecta a su servidor XMPP
+    con su JID y contraseña (comportamiento original de SPADE).
+    """
+
+    nombre = "xmpp"
+
+    def registrar(self, agente):
+        # SPADE ya registra el agente en su Container al construirlo
+        return agente
+
+    async def iniciar(self, agente):
+        await agente.start()
+
+    async def detener(self, agente):
+        await agente.stop()
+
+
+class TransporteLocal:
+    """
+    Bus de mensajes en memoria para ejecutar la simulación sin servidor XMPP.
+
+    Ocupa el lugar del ``Container`` de SPADE en cada agente registrado, de modo
+    que ``behaviour.send(msg)`` entrega el ``spade.message.Message`` directamente
+    en los buzones de los behaviours del agente destino, dentro del mismo bucle
+    de eventos. El código de los agentes no cambia.
+    """
+
+    nombre = "local"
+
+    def __init__(self):
+        self.agentes = {}         # { jid completo (str): agente }
+        self.entregados = 0       # Mensajes depositados en algún buzón
+        self.no_entregados = 0    # Mensajes sin destinatario vivo
+
+    def registrar(self, agente):
+        """Da de alta el agente en el bus y lo desvincula del Container XMPP."""
+        self.agentes[str(agente.jid)] = agente
+        agente.set_container(self)
+        return agente
+
+    def resolver(self, jid):
+        """
+        Busca el agente destino: primero por JID completo y, si no existe,
+        por JID base (los supermercados inteligentes usan JID sin recurso).
+        """
+        agente = self.agentes.get(jid)
+        if agente is None and "/" in jid:
+            agente = self.agentes.get(jid.split("/")[0])
+        return agente
+
+    async def send(self, msg, behaviour):
+        """Punto de entrada que usa ``CyclicBehaviour.send`` de SPADE."""
+        self.entregar(msg)
+
+    def entregar(self, msg):
+        """
+        Entrega el mensaje al ``dispatch`` del agente destino, igual que hace
+        SPADE al recibir por XMPP.
+        """
+        destino = self.resolver(str(msg.to))
+        if destino is None or not destino.is_alive():
+            self.no_entregados += 1
+            logging.warning(f"[TransporteLocal] Sin destinatario para {msg.to}")
+            return
+        if destino.dispatch(msg):
+            self.entregados += 1
+        else:
+            self.no_entregados += 1
+
+    async def iniciar(self, agente):
+        """
+        Equivalente local de ``Agent.start()``: ejecuta ``setup()`` y arranca
+        los behaviours sin abrir conexión XMPP.
+        """
+        if str(agente.jid) not in self.agentes:
+            self.registrar(agente)
+        await agente.setup()
+        agente._alive.set()
+        for behaviour in agente.behaviours:
+            if not behaviour.is_running:
+                behaviour.set_agent(agente)
+                behaviour.start()
+
+    async def detener(self, agente):
+        """Detiene todos los behaviours del agente y lo da de baja del bus."""
+        for behaviour in list(agente.behaviours):
+            behaviour.kill()
+        agente._alive.clear()
+        self.agentes.pop(str(agente.jid), None)
+
+
+TRANSPORTES = {
+    TransporteXMPP.nombre: TransporteXMPP,
+    TransporteLocal.nombre: TransporteLocal,
+}
+
+
+def crear_transporte(nombre):
+    """
+    Devuelve una instancia del transporte indicado ("xmpp" o "local").
+    """
+    try:
+        return TRANSPORTES[nombre]()
+    except KeyError:
+        raise ValueError(
+            f"Transporte desconocido: {nombre!r} (opciones: {', '.join(TRANSPORTES)})"
+        )
@@ -0,0 +1,141 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import json
+
+import pytest
+from spade.message import Message
+
+from src.codificacion import (
+    COMPACTA,
+    METADATO,
+    codificacion_de,
+    codificar,
+    leer_mensaje,
+    preparar_mensaje,
+)
+from src.config import predefined_ethics
+from src.inventario import Inventario
+
+# -----------------------------------------------------------------------------
+# Codificación compacta: ida y vuelta y vuelta al JSON
+# -----------------------------------------------------------------------------
+
+
+def detalle(variedad, stock):
+    """Detalle de producto tal como lo reconstruye el decodificador."""
+    return dict(predefined_ethics[variedad], stock=stock, variedad=variedad)
+
+
+CATALOGO = {
+    "Manzana": detalle("Manzana_2", 7),
+    "Leche": detalle("Leche_1", 0),
+    "Pan": detalle("Pan_3", 12),
+}
+
+VENTA = {
+    "tipo": "venta",
+    "cliente_id": "CLIENTE_3",
+    "accion": "compra_indispensable",
+    "timestamp": "2025-01-01 09:00:05",
+    "productos_comprados": {"Manzana_2": 2, "Pan_3": 1},
+}
+
+MENSAJES = {
+    "peticion": {"tipo": "Peticion_Cliente", "version": 4},
+    "peticion sin versión": {"tipo": "Peticion_Cliente", "version": None},
+    "oferta completa": {
+        "tipo": "Peticion_Cliente", "version": 3,
+        "productos": CATALOGO, "ubicacion": [12.5, 40.25],
+    },
+    "oferta delta": {
+        "tipo": "Peticion_Cliente", "version": 5, "desde": 3, "delta": True,
+        "productos": {"Pan": detalle("Pan_1", 4)},
+    },
+    "sin cambios": {"tipo": "Peticion_Cliente", "version": 5, "sin_cambios": True},
+    "venta": VENTA,
+    "venta a un inteligente": {
+        "tipo": "ventas_super_normal", "supermercado_id": "SUPERMERCADO_1",
+        "venta": {k: v for k, v in VENTA.items() if k != "tipo"},
+    },
+    "lote de ventas": {
+        "tipo": "ventas_super_normal", "supermercado_id": "SUPERMERCADO_2",
+        "ventas": [VENTA, dict(VENTA, cliente_id="CLIENTE_4", accion="compra")],
+        "resumen": {"Manzana_2": 4, "Pan_3": 2},
+    },
+    "métricas": {
+        "tipo": "metricas_smart",
+        "metricas": [
+            {"origen": "SMART_1", "ronda": 2, "num_ventas": 3,
+             "ventas_por_variedad": {"Pan_3": 3}, "version_catalogo": 6,
+             "catalogo": CATALOGO},
+            {"origen": "SMART_2", "ronda": 2, "num_ventas": 0,
+             "ventas_por_variedad": {}, "version_catalogo": 1},
+        ],
+    },
+}
+
+
+def ida_y_vuelta(datos, codificacion=COMPACTA):
+    msg = preparar_mensaje(Message(to="destino@localhost"), datos, codificacion)
+    return msg, leer_mensaje(msg)
+
+
+@pytest.mark.parametrize("nombre", MENSAJES)
+def test_ida_y_vuelta_compacta(nombre):
+    datos = MENSAJES[nombre]
+    msg, leido = ida_y_vuelta(datos)
+    assert codificacion_de(msg) == COMPACTA
+    assert msg.get_metadata("tipo") == datos["tipo"]
+    assert leido == datos
+
+
+def test_inventario_se_codifica_como_su_dict():
+    oferta = dict(MENSAJES["oferta completa"])
+    cuerpo_dict, _ = codificar(oferta, COMPACTA)
+    oferta["productos"] = Inventario.desde_dict(CATALOGO)
+    cuerpo_inventario, codificacion = codificar(oferta, COMPACTA)
+    assert codificacion == COMPACTA
+    assert cuerpo_inventario == cuerpo_dict
+    # En JSON también se serializa como su vista dict
+    assert json.loads(codificar(oferta, "json")[0])["productos"] == CATALOGO
+
+
+@pytest.mark.parametrize("datos", [
+    {"tipo": "Peticion_Cliente", "version": 1,
+     "productos": {"Manzana": dict(detalle("Manzana_1", 1), variedad="Manzana_99")},
+     "ubicacion": [0.0, 0.0]},
+    {"tipo": "venta", "cliente_id": "CLIENTE_1", "accion": "devolucion",
+     "timestamp": "2025-01-01 09:00:00", "productos_comprados": {}},
+    {"tipo": "suscripcion", "cliente": "cliente@localhost"},
+])
+def test_sin_esquema_se_envia_en_json(datos):
+    msg, leido = ida_y_vuelta(datos)
+    assert codificacion_de(msg) == "json"
+    assert msg.get_metadata(METADATO) is None
+    assert json.loads(msg.body) == datos
+    assert leido == datos
+
+
+def test_por_defecto_usa_codificacion_mensajes(monkeypatch):
+    monkeypatch.setattr("src.codificacion.CODIFICACION_MENSAJES", "json")
+    assert codificar(MENSAJES["venta"])[1] == "json"
+    monkeypatch.setattr("src.codificacion.CODIFICACION_MENSAJES", COMPACTA)
+    assert codificar(MENSAJES["venta"])[1] == COMPACTA
+
+
+def test_cuerpo_ilegible_devuelve_none():
+    msg = Message(to="destino@localhost")
+    msg.set_metadata(METADATO, COMPACTA)
+    msg.body = "no es base64"
+    assert leer_mensaje(msg) is None
+    msg.body = "/w=="            # un byte con un código de registro desconocido
+    assert leer_mensaje(msg) is None
+    msg = Message(to="destino@localhost", body="{json roto")
+    assert leer_mensaje(msg) is None
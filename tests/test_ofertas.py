@@ -0,0 +1,115 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import base64
+import copy
+import random
+
+import pytest
+
+from src.Agentes.ofertas import VersionesCatalogo
+from src.codificacion import COMPACTA, codificar, desempaquetar
+from src.config import possible_varieties, predefined_ethics
+
+# -----------------------------------------------------------------------------
+# Catálogos versionados: "sin_cambios", deltas y catálogo completo
+# -----------------------------------------------------------------------------
+
+UBICACION = [10.0, 20.0]
+
+
+def detalle(variedad, stock):
+    return dict(predefined_ethics[variedad], stock=stock, variedad=variedad)
+
+
+def catalogo_inicial():
+    return {producto: detalle(variedades[0], 10) for producto, variedades in possible_varieties.items()}
+
+
+def aplicar(conocido, respuesta):
+    """Lo que hace el cliente con la respuesta (ver ClienteAgent.RecibirMensaje)."""
+    if respuesta.get("sin_cambios") or respuesta.get("delta"):
+        assert conocido is not None
+        assert conocido["version"] == respuesta.get("desde", respuesta["version"])
+        conocido = copy.deepcopy(conocido)
+        conocido["productos"].update(respuesta.get("productos", {}))
+        conocido["version"] = respuesta["version"]
+        return conocido
+    return {
+        "productos": copy.deepcopy(respuesta["productos"]),
+        "version": respuesta["version"],
+    }
+
+
+def por_el_canal(oferta):
+    """La oferta tal como llega al cliente (codificación compacta)."""
+    cuerpo, codificacion = codificar(oferta, COMPACTA)
+    assert codificacion == COMPACTA
+    return desempaquetar(base64.b64decode(cuerpo))
+
+
+def test_respuestas_segun_la_version_del_cliente():
+    versiones = VersionesCatalogo()
+    productos = catalogo_inicial()
+
+    completa = versiones.construir_oferta(productos, UBICACION)
+    assert completa["version"] == 1
+    assert completa["productos"] == productos
+    assert completa["ubicacion"] == UBICACION
+
+    assert versiones.construir_oferta(productos, UBICACION, 1) == {
+        "tipo": "Peticion_Cliente", "version": 1, "sin_cambios": True,
+    }
+
+    productos["Pan"] = detalle("Pan_2", 3)
+    versiones.marcar("Pan")
+    delta = versiones.construir_oferta(productos, UBICACION, 1)
+    assert delta["delta"] and delta["desde"] == 1 and delta["version"] == 2
+    assert delta["productos"] == {"Pan": productos["Pan"]}
+
+    assert versiones.respuestas == {"completa": 1, "delta": 1, "sin_cambios": 1}
+
+
+def test_marcar_sin_productos_no_cambia_la_version():
+    versiones = VersionesCatalogo()
+    versiones.marcar()
+    assert versiones.version == 1
+
+
+@pytest.mark.parametrize("version_cliente", [None, 0, 7, "3"])
+def test_version_desconocida_recibe_el_catalogo_completo(version_cliente):
+    versiones = VersionesCatalogo()
+    versiones.marcar("Pan")
+    versiones.marcar("Leche")
+    productos = catalogo_inicial()
+    respuesta = versiones.construir_oferta(productos, UBICACION, version_cliente)
+    assert respuesta["version"] == 3
+    assert respuesta["productos"] == productos
+    assert "delta" not in respuesta and "sin_cambios" not in respuesta
+
+
+def test_los_deltas_reconstruyen_el_catalogo():
+    """Clientes que preguntan a ritmos distintos acaban con el mismo catálogo."""
+    rng = random.Random(4)
+    versiones = VersionesCatalogo()
+    productos = catalogo_inicial()
+    clientes = [None] * 5
+    for _ in range(200):
+        cambiados = rng.sample(sorted(productos), rng.randint(0, 3))
+        for producto in cambiados:
+            variedad = rng.choice(possible_varieties[producto])
+            productos[producto] = detalle(variedad, rng.randint(0, 20))
+        versiones.marcar(*cambiados)
+        for i, conocido in enumerate(clientes):
+            if rng.random() < 0.3:
+                version = conocido["version"] if conocido else None
+                respuesta = por_el_canal(versiones.construir_oferta(productos, UBICACION, version))
+                clientes[i] = aplicar(conocido, respuesta)
+                assert clientes[i] == {"productos": productos, "version": versiones.version}
+    assert versiones.respuestas["delta"] and versiones.respuestas["sin_cambios"]
@@ -0,0 +1,118 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import copy
+import random
+
+import pytest
+
+from src import puntuacion
+from src.config import possible_varieties, predefined_ethics
+from src.puntuacion import RankingSupermercados, TablaVariedades, puntuar_oferta
+
+# -----------------------------------------------------------------------------
+# Ranking incremental frente a puntuar todas las ofertas
+# -----------------------------------------------------------------------------
+
+CRITERIOS = list(next(iter(predefined_ethics.values())))
+
+
+def oferta_al_azar(rng, ubicacion=None):
+    productos = {}
+    for producto, variedades in possible_varieties.items():
+        if rng.random() < 0.8:
+            variedad = rng.choice(variedades)
+            productos[producto] = dict(
+                predefined_ethics[variedad], variedad=variedad, stock=rng.choice([0, 1, 5, 10])
+            )
+    if ubicacion is None:
+        ubicacion = (rng.uniform(0, 500), rng.uniform(0, 500))
+    return {"productos": productos, "ubicacion": ubicacion}
+
+
+def a_mano(tabla, ubicacion, ofertas, usar_ubicacion=True):
+    """Puntúa todas las ofertas, en orden; en empate gana la primera."""
+    puntuadas = [
+        (puntuar_oferta(tabla, ubicacion, data, usar_ubicacion), -orden, jid)
+        for orden, (jid, data) in enumerate(ofertas.items())
+    ]
+    return [jid for _, _, jid in sorted(puntuadas, reverse=True)]
+
+
+@pytest.fixture(params=[(0.5, 0.5), (0.2, 0.8), (1.0, 0.0), (0.0, 1.0)], ids=str)
+def pesos(request, monkeypatch):
+    etico, distancia = request.param
+    monkeypatch.setattr(puntuacion, "WEIGHT_ETHICAL", etico)
+    monkeypatch.setattr(puntuacion, "WEIGHT_DISTANCE", distancia)
+    return request.param
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_coincide_con_puntuar_todas(pesos, semilla):
+    rng = random.Random(semilla)
+    tabla = TablaVariedades({c: rng.uniform(-1, 1) for c in CRITERIOS})
+    ubicacion = (rng.uniform(0, 500), rng.uniform(0, 500))
+    usar_ubicacion = rng.random() < 0.8
+    ranking = RankingSupermercados()
+    ofertas = {}
+    # Un supermercado no se mueve: sus ofertas nuevas traen la misma ubicación
+    ubicaciones = {}
+    for paso in range(150):
+        operacion = rng.random()
+        if operacion < 0.4 or not ofertas:
+            jid = f"super{rng.randrange(60)}@localhost"
+            ofertas[jid] = oferta_al_azar(rng, ubicaciones.get(jid))
+            ubicaciones[jid] = ofertas[jid]["ubicacion"]
+            ranking.marcar(jid)
+        elif operacion < 0.6:
+            # Empate exacto: copia de otra oferta (gana la que llegó antes)
+            jid = f"copia{paso}@localhost"
+            ofertas[jid] = copy.deepcopy(ofertas[rng.choice(list(ofertas))])
+            ranking.marcar(jid)
+        elif operacion < 0.8:
+            # Compra: se gasta stock de una oferta conocida
+            jid = rng.choice(list(ofertas))
+            for detalle in ofertas[jid]["productos"].values():
+                detalle["stock"] = max(0, detalle["stock"] - 1)
+            ranking.marcar(jid)
+        else:
+            jid = rng.choice(list(ofertas))
+            del ofertas[jid]
+            ranking.quitar(jid)
+
+        esperado = a_mano(tabla, ubicacion, ofertas, usar_ubicacion)
+        mejor = ranking.mejor(tabla, ubicacion, ofertas, usar_ubicacion)
+        assert mejor == (esperado[0] if esperado else None)
+        k = rng.randint(1, 5)
+        assert ranking.mejores(k) == esperado[:k]
+
+
+def test_sin_ofertas():
+    tabla = TablaVariedades({})
+    assert RankingSupermercados().mejor(tabla, (0, 0), {}) is None
+
+
+def test_cambio_de_preferencias_repuntua(pesos):
+    rng = random.Random(1)
+    ofertas = {f"super{i}@localhost": oferta_al_azar(rng) for i in range(20)}
+    ranking = RankingSupermercados()
+    for _ in range(3):
+        tabla = TablaVariedades({c: rng.uniform(-1, 1) for c in CRITERIOS})
+        assert ranking.mejor(tabla, (250, 250), ofertas) == a_mano(tabla, (250, 250), ofertas)[0]
+
+
+def test_la_cota_de_distancia_evita_puntuar_supermercados_lejanos(monkeypatch):
+    monkeypatch.setattr(puntuacion, "WEIGHT_ETHICAL", 0.5)
+    monkeypatch.setattr(puntuacion, "WEIGHT_DISTANCE", 0.5)
+    rng = random.Random(2)
+    tabla = TablaVariedades({c: rng.uniform(0, 1) for c in CRITERIOS})
+    ofertas = {f"super{i}@localhost": oferta_al_azar(rng) for i in range(200)}
+    ranking = RankingSupermercados()
+    assert ranking.mejor(tabla, (250, 250), ofertas) == a_mano(tabla, (250, 250), ofertas)[0]
+    assert ranking.puntuadas < len(ofertas) // 2
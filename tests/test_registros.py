@@ -0,0 +1,197 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import os
+import pickle
+import random
+
+import pytest
+
+from src.registros import RegistroTrozos, referencia, trozos_de
+
+# -----------------------------------------------------------------------------
+# Registros por trozos: escritura, referencias y reanudación
+# -----------------------------------------------------------------------------
+
+
+def registro_en(directorio, por_trozo=3, limpiar=True):
+    registro = RegistroTrozos("decisiones")
+    registro.abrir(str(directorio), por_trozo, limpiar)
+    return registro
+
+
+def decision(n):
+    return {"cliente_id": f"CLIENTE_{n % 4}", "timestamp": f"2025-01-01 09:{n:02d}:00", "n": n}
+
+
+def leer_todo(valor):
+    return [registro for trozo in trozos_de(valor) for registro in trozo]
+
+
+def test_vuelca_trozos_y_los_lee_en_orden(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(10))
+    assert len(registro) == 10
+    assert registro.escritos == 3 and len(registro.pendientes) == 1
+    assert [d["n"] for d in registro] == list(range(10))
+    registro.vaciar()
+    trozos = sorted(f for f in os.listdir(registro.directorio) if f.startswith("trozo_"))
+    assert trozos == [f"trozo_{n:05d}.pkl" for n in range(1, 5)]
+    assert [len(trozo) for trozo in registro.trozos()] == [3, 3, 3, 1]
+
+
+def test_en_memoria_sin_carpeta():
+    registro = RegistroTrozos("decisiones")
+    registro.extend(decision(n) for n in range(5))
+    assert referencia(registro) == [decision(n) for n in range(5)]
+    assert leer_todo(referencia(registro)) == [decision(n) for n in range(5)]
+
+
+def test_referencia_del_estado_final(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(7))
+    ref = referencia(registro)
+    assert ref["trozos"] == 3 and ref["registros"] == 7
+    assert ref["ejecucion"] == registro.ejecucion
+    assert leer_todo(ref) == [decision(n) for n in range(7)]
+
+
+def test_otra_ejecucion_invalida_la_referencia(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(7))
+    ref = referencia(registro)
+    # Otra simulación en la misma carpeta borra los trozos y cambia la marca
+    otra = registro_en(tmp_path)
+    otra.extend(decision(n) for n in range(100, 104))
+    otra.vaciar()
+    with pytest.raises(ValueError, match="otra ejecución"):
+        leer_todo(ref)
+
+
+def test_referencia_sin_carpeta_o_sin_trozos(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(7))
+    ref = referencia(registro)
+    os.remove(os.path.join(ref["directorio"], "trozo_00002.pkl"))
+    with pytest.raises(ValueError, match="Faltan 1 trozos"):
+        leer_todo(ref)
+    with pytest.raises(ValueError, match="No existen"):
+        leer_todo(dict(ref, directorio=str(tmp_path / "no_existe")))
+
+
+def test_restaurar_descarta_lo_escrito_despues(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(5))
+    instantanea = pickle.loads(pickle.dumps(registro))
+    registro.extend(decision(n) for n in range(5, 12))
+    registro.vaciar()
+
+    # Reanudación en otro proceso: misma carpeta, sin limpiar
+    reanudado = registro_en(tmp_path, limpiar=False)
+    assert reanudado.ejecucion == registro.ejecucion
+    reanudado.restaurar(instantanea)
+    reanudado.extend(decision(n) for n in range(50, 53))
+    assert [d["n"] for d in reanudado] == [0, 1, 2, 3, 4, 50, 51, 52]
+    reanudado.vaciar()
+    assert not os.path.exists(os.path.join(reanudado.directorio, "trozo_00004.pkl"))
+
+
+def test_restaurar_instantanea_de_otra_ejecucion(tmp_path):
+    registro = registro_en(tmp_path)
+    registro.extend(decision(n) for n in range(5))
+    instantanea = pickle.loads(pickle.dumps(registro))
+    nuevo = registro_en(tmp_path)
+    with pytest.raises(ValueError, match="no son de la ejecución"):
+        nuevo.restaurar(instantanea)
+
+
+# -----------------------------------------------------------------------------
+# Búferes por agente: fusión en orden (timestamp, llegada)
+# -----------------------------------------------------------------------------
+
+
+def anotar_intercalado(registro, rng, agentes=5, por_agente=40):
+    """
+    Cada agente anota sus decisiones en su búfer con su propio ritmo (sus
+    timestamps no bajan); el orden de llamada entre agentes es aleatorio.
+    Retorna lo anotado en orden de llamada.
+    """
+    bufers = [registro.bufer() for _ in range(agentes)]
+    minutos = [0] * agentes
+    restantes = [por_agente] * agentes
+    anotadas = []
+    while any(restantes):
+        agente = rng.choice([a for a in range(agentes) if restantes[a]])
+        minutos[agente] += rng.choice([0, 0, 1, 2])
+        anotada = {
+            "cliente_id": f"CLIENTE_{agente}",
+            "timestamp": f"2025-01-01 {9 + minutos[agente] // 60:02d}:{minutos[agente] % 60:02d}:00",
+            "n": len(anotadas),
+        }
+        bufers[agente].append(anotada)
+        anotadas.append(anotada)
+        restantes[agente] -= 1
+    return anotadas
+
+
+def orden_esperado(anotadas):
+    # Por timestamp y, a igual timestamp, en el orden en que se anotaron
+    return sorted(anotadas, key=lambda d: (d["timestamp"], d["n"]))
+
+
+@pytest.mark.parametrize("por_trozo", [None, 1, 7, 1000])
+def test_bufers_se_fusionan_en_orden(tmp_path, por_trozo):
+    if por_trozo is None:
+        registro = RegistroTrozos("decisiones")      # en memoria
+    else:
+        registro = registro_en(tmp_path, por_trozo)
+    anotadas = anotar_intercalado(registro, random.Random(por_trozo))
+    assert len(registro) == len(anotadas)
+    leidas = list(registro)
+    assert sorted(d["n"] for d in leidas) == list(range(len(anotadas)))
+    if por_trozo in (None, 1000):
+        # Una sola fusión al leer: el orden global es exacto
+        assert leidas == orden_esperado(anotadas)
+    else:
+        # Cada fusión ordena lo acumulado desde la anterior: el registro
+        # queda en orden por tandas y, dentro de cada agente, en su orden
+        for agente in range(5):
+            propias = [d["n"] for d in leidas if d["cliente_id"] == f"CLIENTE_{agente}"]
+            assert propias == sorted(propias)
+
+
+def test_fusion_al_llenar_un_trozo(tmp_path):
+    registro = registro_en(tmp_path, por_trozo=4)
+    bufer_a, bufer_b = registro.bufer(), registro.bufer()
+    bufer_a.append(decision(3))
+    bufer_b.append(decision(1))
+    bufer_a.append(decision(5))
+    assert registro.escritos == 0 and len(registro) == 3
+    bufer_b.append(decision(2))       # cuarto registro: se fusiona y vuelca
+    assert registro.sin_fusionar == 0 and registro.escritos == 1
+    assert len(bufer_a) == len(bufer_b) == 0
+    assert [d["n"] for d in registro] == [1, 2, 3, 5]
+
+
+def test_la_instantanea_incluye_lo_no_fusionado(tmp_path):
+    registro = registro_en(tmp_path, por_trozo=100)
+    bufer_a, bufer_b = registro.bufer(), registro.bufer()
+    bufer_a.append(decision(2))
+    bufer_b.append(decision(1))
+    copia = pickle.loads(pickle.dumps(registro))
+    # Guardar no fusiona: no cambia cómo sigue la simulación
+    assert registro.sin_fusionar == 2 and len(bufer_a) == len(bufer_b) == 1
+    assert copia.bufers == [] and len(copia) == 2
+
+    # Al reanudar, lo no fusionado se fusiona con lo que llegue después
+    reanudado = registro_en(tmp_path, por_trozo=100, limpiar=False)
+    reanudado.restaurar(copia)
+    reanudado.bufer().append(decision(0))
+    assert len(reanudado) == 3
+    assert [d["n"] for d in reanudado] == [0, 1, 2]
@@ -0,0 +1,144 @@
+"""
+TFG-Agentes-BDI-Supermercado
+
+Copyright (c) 2025 Angel Casado (https://github.com/angelcasaado)
+
+Este archivo forma parte de TFG-Agentes-BDI-Supermercado.
+Se distribuye bajo la licencia MIT. Para más detalles, consulta el archivo LICENSE
+en la raíz del repositorio.
+"""
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from src.instantaneas import cargar_instantanea
+
+# -----------------------------------------------------------------------------
+# Simulaciones completas: misma semilla, instantáneas y reanudación
+# -----------------------------------------------------------------------------
+# Cada simulación corre en su propio proceso (config y registros son globales)
+# y en su propia carpeta, con transporte local y reloj virtual.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIMULAR = """
+import json, sys
+import src.config as config
+for clave, valor in json.loads(sys.argv[1]).items():
+    setattr(config, clave, valor)
+from src.main import ejecutar, main
+ejecutar(main("local", 1, int(sys.argv[2]), sys.argv[3] or None), virtual=True)
+"""
+
+PARAMETROS = {
+    "NUM_CLIENTES": 4,
+    "NUM_SUPERMERCADOS": 3,
+    "NUM_INTELIGENTES": 2,
+    "MAX_PURCHASES": 10,
+    "REGISTRO_EVENTOS": "eventos.jsonl",
+    "REGISTROS_TROZO": 20,
+}
+
+
+def simular(directorio, semilla=7, reanudar=None, **parametros):
+    os.makedirs(directorio, exist_ok=True)
+    resultado = subprocess.run(
+        [sys.executable, "-c", SIMULAR, json.dumps(dict(PARAMETROS, **parametros)),
+         str(semilla), reanudar or ""],
+        cwd=directorio, capture_output=True, text=True, timeout=300,
+        env=dict(os.environ, PYTHONPATH=RAIZ),
+    )
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+
+
+def csvs(directorio):
+    carpeta = os.path.join(directorio, "csv's")
+    contenidos = {}
+    for nombre in sorted(os.listdir(carpeta)):
+        with open(os.path.join(carpeta, nombre), "rb") as archivo:
+            contenidos[nombre] = archivo.read()
+    return contenidos
+
+
+def filas(directorio, nombre):
+    with open(os.path.join(directorio, "csv's", nombre), newline="", encoding="utf-8") as archivo:
+        return list(csv.DictReader(archivo))
+
+
+def eventos(directorio):
+    with open(os.path.join(directorio, "eventos.jsonl"), encoding="utf-8") as archivo:
+        return [json.loads(linea) for linea in archivo]
+
+
+@pytest.fixture(scope="module")
+def ejecuciones(tmp_path_factory):
+    """La misma semilla con instantáneas cada 30 s y sin ellas."""
+    con = tmp_path_factory.mktemp("con_instantaneas")
+    sin = tmp_path_factory.mktemp("sin_instantaneas")
+    simular(con, INTERVALO_INSTANTANEAS=30)
+    simular(sin)
+    return con, sin
+
+
+def test_misma_semilla_mismos_resultados(ejecuciones):
+    # Guardar instantáneas no altera la simulación
+    con, sin = ejecuciones
+    assert os.listdir(con / "instantaneas")
+    assert csvs(con) == csvs(sin)
+
+
+def test_reanudar_desde_una_instantanea(ejecuciones, tmp_path):
+    con, _ = ejecuciones
+    reanudada = tmp_path / "reanudada"
+    shutil.copytree(con, reanudada)
+    ruta = sorted(os.listdir(reanudada / "instantaneas"))[0]
+    momento = cargar_instantanea(str(reanudada / "instantaneas" / ruta))["momento"]
+    simular(reanudada, reanudar=os.path.join("instantaneas", ruta), INTERVALO_INSTANTANEAS=30)
+
+    # El registro de eventos sigue la numeración y se cierra
+    registro = eventos(reanudada)
+    assert [e["seq"] for e in registro] == list(range(1, len(registro) + 1))
+    assert registro[-1]["tipo"] == "final"
+
+    # Lo anterior a la instantánea se conserva tal cual y todos los clientes
+    # terminan. (En el instante de reanudar los comportamientos arrancan de
+    # nuevo y los empates entre agentes pueden ordenarse de otra forma.)
+    limite = momento.strftime("%Y-%m-%d %H:%M:%S")
+    for nombre in ("decisiones.csv", "atraccion_clientes.csv"):
+        original, continuada = filas(con, nombre), filas(reanudada, nombre)
+        antes = [f for f in original if f["timestamp"] < limite]
+        assert antes and continuada[:len(antes)] == antes
+    assert {f["cliente_id"] for f in filas(reanudada, "decisiones.csv")} == \
+        {f["cliente_id"] for f in filas(con, "decisiones.csv")}
+
+
+def reproducir(registro, directorio):
+    os.makedirs(directorio, exist_ok=True)
+    resultado = subprocess.run(
+        [sys.executable, "-m", "src.main", "--reproducir", str(registro)],
+        cwd=directorio, capture_output=True, text=True, timeout=300,
+        env=dict(os.environ, PYTHONPATH=RAIZ),
+    )
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+
+
+def test_reproducir_regenera_los_mismos_csv(ejecuciones, tmp_path):
+    # Registros por trozos: el estado final apunta a la carpeta de trozos
+    _, sin = ejecuciones
+    assert len(os.listdir(sin / "eventos.registros" / "decisiones")) > 2
+    reproducir(sin / "eventos.jsonl", tmp_path)
+    assert csvs(tmp_path) == csvs(sin)
+
+
+def test_reproducir_con_registros_en_memoria(tmp_path):
+    # Sin carpeta de registros el estado final va entero en el registro de eventos
+    simulada = tmp_path / "simulada"
+    simular(simulada, DIRECTORIO_REGISTROS=None)
+    assert not os.path.exists(simulada / "eventos.registros")
+    reproducir(simulada / "eventos.jsonl", tmp_path / "reproducida")
+    assert csvs(tmp_path / "reproducida") == csvs(simulada)